@@ -0,0 +1,17 @@
+"""Dummy settings so benchmarks can import the bot modules without a real .env"""
+import os
+import tempfile
+
+_defaults = {
+    'DISCORD_TOKEN': 'benchmark-token',
+    'CHANNEL_ID': '1',
+    'OPENAI_API_KEY': 'benchmark-key',
+    'ASSISTANT_ID': 'asst_benchmark',
+    'DB_FILE': os.path.join(tempfile.gettempdir(), 'quality_benchmark.db'),
+    'LOG_FILE': os.path.join(tempfile.gettempdir(), 'quality_benchmark.log'),
+    'LOG_LEVEL': 'WARNING',
+    'WARM_STATE_FILE': '',
+}
+
+for _key, _value in _defaults.items():
+    os.environ.setdefault(_key, _value)
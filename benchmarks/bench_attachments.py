@@ -0,0 +1,126 @@
+"""Attachment download benchmark: legacy per-attachment BytesIO vs AttachmentFetcher.
+
+Serves synthetic attachments from a local aiohttp server and simulates several
+concurrent rejected messages, each re-posting N attachments via DM.
+
+Usage:
+    python -m benchmarks.bench_attachments [--dms 4] [--files 4] [--size-mb 8] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import benchmarks._env  # noqa: F401
+import aiohttp
+from aiohttp import web
+
+async def _start_server(size: int, latency: float):
+    payload = b'\0' * size
+
+    async def handler(request):
+        await asyncio.sleep(latency)
+        resp = web.StreamResponse(headers={'Content-Length': str(size)})
+        await resp.prepare(request)
+        view = memoryview(payload)
+        for offset in range(0, size, 256 * 1024):
+            await resp.write(view[offset:offset + 256 * 1024])
+        await resp.write_eof()
+        return resp
+
+    app = web.Application()
+    app.router.add_get('/{name}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+async def _legacy_dm(attachments):
+    """The pre-fetcher implementation: sequential, new session and full buffer per file"""
+    files = []
+    for attachment in attachments:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(attachment.url) as resp:
+                if resp.status == 200:
+                    data = await resp.read()
+                    files.append(io.BytesIO(data))
+    return files
+
+async def _run(variant: str, dms: int, files: int, size: int, latency: float):
+    runner, base_url = await _start_server(size, latency)
+    messages = [
+        [SimpleNamespace(url=f"{base_url}/m{m}_f{f}.png", filename=f"f{f}.png", size=size)
+         for f in range(files)]
+        for m in range(dms)
+    ]
+
+    fetcher = None
+    if variant == 'fetcher':
+        from utils.attachment_fetcher import AttachmentFetcher
+        fetcher = AttachmentFetcher(budget_bytes=files * size)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    if fetcher is None:
+        results = await asyncio.gather(*(_legacy_dm(m) for m in messages))
+        downloaded = sum(len(r) for r in results)
+    else:
+        results = await asyncio.gather(*(fetcher.fetch_all(m) for m in messages))
+        downloaded = sum(len(r) for r in results)
+        for result in results:
+            for _, fp in result:
+                fp.close()
+        await fetcher.close()
+
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await runner.cleanup()
+
+    return {
+        'variant': variant,
+        'downloaded': downloaded,
+        'seconds': round(elapsed, 3),
+        'peak_traced_mb': round(peak / 2**20, 1),
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--variant', choices=['legacy', 'fetcher'])
+    parser.add_argument('--dms', type=int, default=4)
+    parser.add_argument('--files', type=int, default=4)
+    parser.add_argument('--size-mb', type=float, default=8)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    args = parser.parse_args()
+    size = int(args.size_mb * 2**20)
+
+    if args.variant:
+        result = asyncio.run(_run(args.variant, args.dms, args.files, size, args.latency_ms / 1000))
+        print(json.dumps(result))
+        return
+
+    # Each variant runs in a fresh process so max RSS is not shared
+    print(f"{args.dms} concurrent DMs x {args.files} attachments x {args.size_mb} MB")
+    for variant in ('legacy', 'fetcher'):
+        out = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_attachments', '--variant', variant,
+             '--dms', str(args.dms), '--files', str(args.files),
+             '--size-mb', str(args.size_mb), '--latency-ms', str(args.latency_ms)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['variant']:>8}: {r['seconds']:.3f}s, {r['downloaded']} files, "
+              f"peak traced {r['peak_traced_mb']} MB, max RSS {r['max_rss_mb']} MB")
+
+if __name__ == "__main__":
+    main()
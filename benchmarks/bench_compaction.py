@@ -0,0 +1,142 @@
+"""Token savings of input compaction, replayed over message_logs history.
+
+Reads the stored message bodies from a bot database and compares the text
+sent to OpenAI before (verbatim) and after `compact_text`. Tokens are
+counted with tiktoken when it is installed, otherwise estimated. Without a
+database with history, `--synthetic N` replays a generated corpus instead.
+
+Usage:
+    python -m benchmarks.bench_compaction --db discord_moderator.db [--limit 50000]
+    python -m benchmarks.bench_compaction --synthetic 20000
+"""
+import argparse
+import math
+import random
+import re
+import sqlite3
+import time
+
+import benchmarks._env  # noqa: F401
+
+_PIECES = re.compile(r'[A-Za-z]+|\d+|[^\W\d_A-Za-z]+|[^\w\s]')
+
+def _token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding('o200k_base')
+        return (lambda text: len(encoding.encode(text))), 'tiktoken o200k_base'
+    except ImportError:
+        pass
+
+    def estimate(text: str) -> int:
+        # ~4 Latin letters per token; other scripts (Armenian, Cyrillic, emoji) ~1.5 chars per token
+        tokens = 0
+        for piece in _PIECES.findall(text):
+            if piece.isascii():
+                tokens += math.ceil(len(piece) / 4) if piece[0].isalnum() else 1
+            else:
+                tokens += math.ceil(len(piece) / 1.5)
+        return tokens
+    return estimate, 'estimate (install tiktoken for exact counts)'
+
+def _history(path: str, limit: int):
+    from database.db_manager import decode_content
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(message_logs)")}
+    if 'content_id' in columns:
+        query = '''
+        SELECT c.data, m.original_content FROM message_logs m
+        LEFT JOIN contents c ON c.id = m.content_id
+        ORDER BY m.id DESC LIMIT ?
+        '''
+    else:
+        query = "SELECT NULL, original_content FROM message_logs ORDER BY id DESC LIMIT ?"
+    for data, inline in conn.execute(query, (limit,)):
+        text = decode_content(data) if data is not None else inline
+        if text:
+            yield text
+    conn.close()
+
+_WORDS = ("hello everyone can someone help me with the homework deadline is tomorrow "
+          "check this out great job thanks lol ok see you later join our server free nitro").split()
+
+def _synthetic(count: int, seed: int):
+    rng = random.Random(seed)
+    for _ in range(count):
+        words = ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(3, 25)))
+        kind = rng.random()
+        if kind < 0.55:
+            yield words
+        elif kind < 0.65:
+            yield words + ' ' + rng.choice('😂🔥💀😭🙏') * rng.randint(5, 60)
+        elif kind < 0.75:
+            yield (f"{words} https://example.com/p/{rng.randint(1, 999)}?utm_source=discord&utm_medium=social"
+                   f"&utm_campaign=spring&fbclid=IwAR{rng.getrandbits(128):x}")
+        elif kind < 0.80:
+            yield '​'.join(words)
+        elif kind < 0.88:
+            yield '\n'.join([words] * rng.randint(3, 30))
+        elif kind < 0.95:
+            yield rng.choice(('noooo', 'whaaat', 'yesss')) + rng.choice('o!a') * rng.randint(5, 80) + ' ' + words
+        else:
+            # Pasted wall of text
+            yield ' '.join(rng.choice(_WORDS) for _ in range(rng.randint(800, 4000)))
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help="bot database with message_logs history")
+    parser.add_argument('--limit', type=int, default=50000, help="most recent rows to replay")
+    parser.add_argument('--synthetic', type=int, default=0, help="replay N generated messages instead")
+    parser.add_argument('--max-chars', type=int, default=None, help="COMPACT_MAX_CHARS override")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    from utils.text_compaction import compact_text
+    from config.settings import COMPACT_MAX_CHARS
+    max_chars = args.max_chars if args.max_chars is not None else COMPACT_MAX_CHARS
+
+    if args.synthetic:
+        texts, source = _synthetic(args.synthetic, args.seed), f"{args.synthetic} synthetic messages"
+    elif args.db:
+        texts, source = _history(args.db, args.limit), f"message_logs of {args.db}"
+    else:
+        parser.error("pass --db or --synthetic")
+
+    count_tokens, counter = _token_counter()
+    rows = changed = truncated = 0
+    before_tokens = after_tokens = 0
+    distinct_before, distinct_after = set(), set()
+    timings = []
+
+    for text in texts:
+        started = time.perf_counter()
+        compacted = compact_text(text, max_chars)
+        timings.append(time.perf_counter() - started)
+
+        rows += 1
+        changed += compacted != text
+        truncated += 'characters omitted …]' in compacted
+        before_tokens += count_tokens(text)
+        after_tokens += count_tokens(compacted)
+        distinct_before.add(text)
+        distinct_after.add(compacted)
+
+    if not rows:
+        print("No messages to replay")
+        return
+
+    saved = before_tokens - after_tokens
+    print(f"Replayed {rows} messages from {source}; tokens: {counter}; COMPACT_MAX_CHARS={max_chars}")
+    print(f"  tokens before  {before_tokens:>12,}")
+    print(f"  tokens after   {after_tokens:>12,}  (-{saved:,}, {saved / before_tokens * 100:.1f}% saved)")
+    print(f"  changed rows   {changed:>12,}  ({changed / rows * 100:.1f}%), length-capped {truncated:,}")
+    print(f"  distinct texts {len(distinct_before):>12,} -> {len(distinct_after):,} (verdict cache keys)")
+    print(f"  compaction     p50 {_percentile(timings, 0.5) * 1e6:.0f} us, p99 {_percentile(timings, 0.99) * 1e6:.0f} us, "
+          f"max {max(timings) * 1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main()
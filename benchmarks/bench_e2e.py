@@ -0,0 +1,226 @@
+"""End-to-end load test: fake Discord messages through on_message, fully offline.
+
+Starts the stub OpenAI server and the stub webhook receiver as separate
+processes, then for every offered message rate runs a fresh bot process
+(own SQLite file, own peak RSS) that feeds synthetic messages into
+`main.on_message` on a fixed open-loop schedule. Reports throughput,
+per-message latency percentiles, peak RSS, event loop lag and the side
+effects (DMs, deletions, webhook embeds).
+
+Latency is measured from dispatch to the end of the message's moderation,
+so it includes OpenAIService's run polling interval and, for rejected
+messages, the DM coalescing window (DM_COALESCE_WINDOW).
+
+With `--gateway` messages are real discord.py objects built from gateway
+payloads and kept in the client's message cache (`benchmarks/fake_gateway.py`),
+which is what `--profiles default low-memory` compares: peak RSS with the
+default intents and caches versus LOW_MEMORY=true.
+
+Usage:
+    python -m benchmarks.bench_e2e [--rates 10 50 100] [--messages 500]
+        [--latency 0.5 --distribution lognormal] [--error-rate 0.01] [--reject-ratio 0.2]
+    python -m benchmarks.bench_e2e --gateway --profiles default low-memory --messages 5000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import benchmarks._env  # noqa: F401
+
+CHANNEL_ID = 1
+GUILD_ID = 1
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+async def _drive(rate: float, messages: int, users: int, reject_ratio: float,
+                 api_latency: float, seed: int, gateway: bool) -> dict:
+    import main
+    from benchmarks import fake_gateway
+    from benchmarks.fake_discord import FakeAuthor, FakeChannel, FakeGuild, FakeMessage
+    from utils.metrics import MESSAGES_MODERATED
+
+    main.policy_registry.update(CHANNEL_ID, guild_id=str(GUILD_ID), actions='dm,webhook,delete')
+    rng = random.Random(seed)
+
+    if gateway:
+        # The client's loop is normally set at login
+        await main.bot._async_setup_hook()
+        http = fake_gateway.install(main.bot, GUILD_ID, CHANNEL_ID, api_latency)
+        make_message = lambda content, user: fake_gateway.receive(main.bot, fake_gateway.message_payload(
+            CHANNEL_ID, GUILD_ID, 1000 + user, f"user{user}", content))
+    else:
+        channel = FakeChannel(CHANNEL_ID, guild=FakeGuild(GUILD_ID))
+        authors = [FakeAuthor(1000 + i, f"user{i}", api_latency) for i in range(users)]
+        make_message = lambda content, user: FakeMessage(content, authors[user], channel, api_latency)
+        # The logged-in identity process_commands compares authors with
+        main.bot._connection.user = FakeAuthor(1, "Quality")
+    # Background components start exactly as they do after login
+    await main.bot.setup_hook()
+
+    latencies = []
+    sent = []
+
+    async def one(content, user):
+        started = time.perf_counter()
+        message = make_message(content, user)
+        message_id = message.id
+        if not gateway:
+            sent.append(message)
+        await main.on_message(message)
+        # In LOW_MEMORY moderation continues in its own task; nothing here may keep the Message
+        del message
+        task = main.moderation_tasks.get(message_id)
+        if task is not None:
+            await task
+        latencies.append(time.perf_counter() - started)
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(messages):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        spam = 'spam ' if rng.random() < reject_ratio else ''
+        content = f"message {i} {spam}" + "lorem ipsum dolor " * rng.randint(1, 30)
+        tasks.append(asyncio.create_task(one(content, rng.randrange(users))))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    cached = len(main.bot.cached_messages)
+
+    max_lag = main.watchdog.max_lag
+    stalls = len(main.watchdog.stalls)
+    await main.bot.close()
+
+    verdicts = {key[0]: int(value) for key, value in MESSAGES_MODERATED._values.items()}
+    return {
+        'rate': rate,
+        'messages': messages,
+        'throughput': messages / elapsed,
+        'p50_ms': _percentile(latencies, 0.50) * 1000,
+        'p95_ms': _percentile(latencies, 0.95) * 1000,
+        'p99_ms': _percentile(latencies, 0.99) * 1000,
+        'peak_rss_mb': _peak_rss_mb(),
+        'loop_lag_max_ms': max_lag * 1000,
+        'stalls': stalls,
+        'verdicts': verdicts,
+        'dms': http.dms if gateway else sum(len(author.dms) for author in authors),
+        'deleted': http.deleted if gateway else sum(1 for message in sent if message.deleted),
+        'cached_messages': cached,
+    }
+
+def _child(args):
+    result = asyncio.run(_drive(args.rate, args.messages, args.users, args.reject_ratio,
+                                args.discord_latency, args.seed, args.gateway))
+    print(json.dumps(result))
+
+def _webhook_stats(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=5) as resp:
+        return json.load(resp)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rates', type=float, nargs='+', default=[10, 50, 100], help="offered messages/s")
+    parser.add_argument('--messages', type=int, default=500, help="messages per rate")
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--reject-ratio', type=float, default=0.2)
+    parser.add_argument('--latency', type=float, default=0.0, help="stub OpenAI mean run latency (s)")
+    parser.add_argument('--distribution', default='fixed', choices=('fixed', 'uniform', 'exponential', 'lognormal'))
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of OpenAI run creations failing")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="share of OpenAI runs ending as failed")
+    parser.add_argument('--webhook-429-rate', type=float, default=0.0)
+    parser.add_argument('--discord-latency', type=float, default=0.05, help="fake DM/delete API latency (s)")
+    parser.add_argument('--cache', action='store_true', help="keep the verdict cache enabled")
+    parser.add_argument('--gateway', action='store_true',
+                        help="real discord.py messages from gateway payloads, with the message cache")
+    parser.add_argument('--profiles', nargs='+', default=['default'], choices=('default', 'low-memory'),
+                        help="runtime profiles to run at every rate (low-memory sets LOW_MEMORY=true)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--rate', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args)
+        return
+
+    openai_port, webhook_port = _free_port(), _free_port()
+    stubs = [
+        subprocess.Popen([sys.executable, '-m', 'benchmarks.stub_openai', '--port', str(openai_port),
+                          '--latency', str(args.latency), '--distribution', args.distribution,
+                          '--error-rate', str(args.error_rate), '--fail-rate', str(args.fail_rate),
+                          '--seed', str(args.seed)], stdout=subprocess.DEVNULL),
+        subprocess.Popen([sys.executable, '-m', 'benchmarks.stub_webhook', '--port', str(webhook_port),
+                          '--rate-limit-rate', str(args.webhook_429_rate)], stdout=subprocess.DEVNULL),
+    ]
+    # Interpreter start-up can take longer than a second on a cold machine
+    for _ in range(50):
+        try:
+            _webhook_stats(webhook_port)
+            break
+        except OSError:
+            time.sleep(0.2)
+
+    tmp = tempfile.mkdtemp(prefix='quality_e2e_')
+    env = dict(os.environ,
+               OPENAI_BASE_URL=f"http://127.0.0.1:{openai_port}",
+               WEBHOOK_URL=f"http://127.0.0.1:{webhook_port}/webhooks/1/benchmark",
+               CHANNEL_ID=str(CHANNEL_ID), CHANNELS_CONFIG='',
+               CATCHUP_ENABLED='false', METRICS_PORT='0',
+               # A few synthetic users posting at the offered rate would look like a flood/raid
+               FLOOD_USER_MESSAGES='0', RAID_AUTHORS='0')
+    if not args.cache:
+        env['VERDICT_CACHE_TTL'] = '0'
+
+    print(f"{args.messages} messages per rate, OpenAI stub {args.distribution} {args.latency}s "
+          f"(errors {args.error_rate}, failed runs {args.fail_rate}), Discord API {args.discord_latency}s")
+    print(f"{'rate':>6} {'profile':>10} {'msg/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MB':>7} "
+          f"{'cached':>6} {'lag ms':>7} {'stalls':>6} {'DMs':>5} {'del':>5} {'embeds':>6}  verdicts")
+    try:
+        for rate in args.rates:
+            for profile in args.profiles:
+                before = _webhook_stats(webhook_port)
+                child_env = dict(env, DB_FILE=os.path.join(tmp, f"rate_{rate:g}_{profile}.db"),
+                                 LOW_MEMORY='true' if profile == 'low-memory' else 'false')
+                out = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.bench_e2e', '--child', '--rate', str(rate),
+                     '--messages', str(args.messages), '--users', str(args.users),
+                     '--reject-ratio', str(args.reject_ratio), '--discord-latency', str(args.discord_latency),
+                     '--seed', str(args.seed)] + (['--gateway'] if args.gateway else []),
+                    env=child_env, capture_output=True, text=True
+                )
+                if out.returncode != 0:
+                    print(out.stderr, file=sys.stderr)
+                    continue
+                r = json.loads(out.stdout.strip().splitlines()[-1])
+                embeds = _webhook_stats(webhook_port)['embeds'] - before['embeds']
+                verdicts = ' '.join(f"{k}={v}" for k, v in sorted(r['verdicts'].items()))
+                print(f"{rate:>6g} {profile:>10} {r['throughput']:7.1f} {r['p50_ms']:8.1f} {r['p95_ms']:8.1f} "
+                      f"{r['p99_ms']:8.1f} {r['peak_rss_mb']:7.1f} {r['cached_messages']:>6} "
+                      f"{r['loop_lag_max_ms']:7.1f} {r['stalls']:>6} {r['dms']:>5} {r['deleted']:>5} {embeds:>6}  {verdicts}")
+    finally:
+        for stub in stubs:
+            stub.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Per-message logging overhead on the calling thread: legacy sync handlers vs QueueHandler.
+
+Each simulated message emits the same four INFO records on_message does.
+
+Usage:
+    python -m benchmarks.bench_logging [--messages 20000] [--format text|json]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import benchmarks._env  # noqa: F401
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def _legacy_logger(path: str, stream) -> logging.Logger:
+    """The pre-queue setup: FileHandler + StreamHandler on the caller thread"""
+    logger = logging.getLogger('bench.legacy')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    for handler in (logging.FileHandler(path, encoding='utf-8'), logging.StreamHandler(stream)):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+def _run(logger: logging.Logger, messages: int):
+    per_message = []
+    for i in range(messages):
+        extra = {'message_id': 1000 + i, 'channel_id': 1, 'user_id': 42}
+        start = time.perf_counter()
+        logger.info(f"New message from user (ID: 42): {'x' * 100}...", extra=extra)
+        logger.info(f"OpenAI result for message {1000 + i}: approve",
+                    extra={**extra, 'status': 'approve', 'processing_time': 1.5})
+        logger.info(f"Message {1000 + i} approved", extra=extra)
+        logger.info(f"Webhook queued for message {1000 + i}", extra=extra)
+        per_message.append(time.perf_counter() - start)
+    return per_message
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--format', choices=['text', 'json'], default='text')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='quality_log_bench_')
+    os.environ['LOG_FILE'] = os.path.join(tmp, 'queued.log')
+    os.environ['LOG_FORMAT'] = args.format
+    os.environ['LOG_LEVEL'] = 'INFO'
+
+    # Console output of both variants goes to /dev/null
+    real_stderr = sys.stderr
+    devnull = open(os.devnull, 'w')
+    sys.stderr = devnull
+
+    legacy = _run(_legacy_logger(os.path.join(tmp, 'legacy.log'), devnull), args.messages)
+
+    from utils.logger import setup_logger, stop_logging
+    queued = _run(setup_logger('bench.queued'), args.messages)
+    drain_start = time.perf_counter()
+    stop_logging()
+    drain = time.perf_counter() - drain_start
+
+    sys.stderr = real_stderr
+    print(f"{args.messages} messages x 4 INFO records, format={args.format}")
+    for name, samples in (('legacy', legacy), ('queued', queued)):
+        mean_us = sum(samples) / len(samples) * 1e6
+        print(f"{name:>7}: mean {mean_us:7.1f} us/msg, p50 {_percentile(samples, 0.5) * 1e6:7.1f} us, "
+              f"p99 {_percentile(samples, 0.99) * 1e6:7.1f} us")
+    print(f"queued listener drain after run: {drain * 1000:.0f} ms (background thread)")
+
+if __name__ == "__main__":
+    main()
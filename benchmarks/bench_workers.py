@@ -0,0 +1,107 @@
+"""Gateway-side cost of moderation: in-process backend vs WorkerPool.
+
+Drives the moderation backend with synthetic jobs against the stub OpenAI
+server (separate process) and reports throughput and the gateway event
+loop's worst scheduling lag, a proxy for late heartbeats.
+
+Usage:
+    python -m benchmarks.bench_workers [--jobs 500] [--workers 0 2 4] [--latency 0]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import benchmarks._env  # noqa: F401
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+async def _lag_probe(samples: list, interval: float = 0.005):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+async def _run(workers: int, jobs: int):
+    from database.db_manager import DatabaseManager
+    from services.openai_service import OpenAIService
+    from services.verdict_cache import VerdictCache
+    from services.moderation_worker import ModerationJob, LocalModeration, WorkerPool
+
+    db = DatabaseManager()
+    if workers:
+        backend = WorkerPool(workers)
+    else:
+        backend = LocalModeration(db, OpenAIService(), VerdictCache(db))
+    backend.start()
+
+    # Warm up (worker processes spawn and import the bot modules)
+    await asyncio.gather(*(
+        backend.analyze(ModerationJob(-i, 1, 1, 42, 'bench', f"warmup {i}", (), 'asst_bench', None))
+        for i in range(1, max(workers, 1) * 4 + 1)
+    ))
+
+    lags = []
+    probe = asyncio.create_task(_lag_probe(lags))
+
+    async def one(i: int):
+        content = f"message {i} {'spam ' if i % 5 == 0 else ''}" + "lorem ipsum " * 50
+        job = ModerationJob(i, 1, 1, 42, 'bench', content, (), 'asst_bench', None)
+        result, processing_time = await backend.analyze(job)
+        status = result["status"] if result else "error"
+        backend.log_message_event(str(i), '42', 'bench', '1', '1', content, [],
+                                  ai_status=status, action_taken='none',
+                                  processing_time=processing_time)
+        return status
+
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(one(i) for i in range(jobs)))
+    elapsed = time.perf_counter() - start
+
+    probe.cancel()
+    await backend.stop()
+    lags.sort()
+    return {
+        'workers': workers,
+        'jobs_per_sec': jobs / elapsed,
+        'errors': statuses.count('error'),
+        'lag_p99_ms': lags[int(len(lags) * 0.99)] * 1000 if lags else 0.0,
+        'lag_max_ms': lags[-1] * 1000 if lags else 0.0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=500)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 2, 4])
+    parser.add_argument('--latency', type=float, default=0.0, help="stub OpenAI run latency (s)")
+    args = parser.parse_args()
+
+    port = _free_port()
+    stub = subprocess.Popen([sys.executable, '-m', 'benchmarks.stub_openai',
+                             '--port', str(port), '--latency', str(args.latency)],
+                            stdout=subprocess.DEVNULL)
+    time.sleep(1.0)
+
+    os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{port}"
+    os.environ['VERDICT_CACHE_TTL'] = '0'
+    os.environ['DB_FILE'] = os.path.join(tempfile.mkdtemp(prefix='quality_bench_'), 'bench.db')
+
+    try:
+        print(f"{args.jobs} jobs, stub latency {args.latency}s")
+        for workers in args.workers:
+            r = asyncio.run(_run(workers, args.jobs))
+            label = 'in-process' if workers == 0 else f"{workers} workers"
+            print(f"{label:>11}: {r['jobs_per_sec']:7.1f} jobs/s, errors {r['errors']}, "
+                  f"gateway loop lag p99 {r['lag_p99_ms']:6.1f} ms, max {r['lag_max_ms']:6.1f} ms")
+    finally:
+        stub.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Minimal stand-ins for the discord.py objects the moderation path touches.
+
+They carry only what `on_message` / `moderate_message` read (ids, names,
+content, attachments) and fake the outgoing calls (`author.send`,
+`message.delete`) with a configurable Discord API latency.
+"""
+import asyncio
+import itertools
+from typing import List, Optional
+from discord.utils import time_snowflake, utcnow
+
+_message_ids = itertools.count()
+
+class FakeAuthor:
+    def __init__(self, user_id: int, name: str, api_latency: float = 0.0, dms_disabled: bool = False):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.bot = False
+        self.api_latency = api_latency
+        self.dms_disabled = dms_disabled
+        self.dms: List[dict] = []
+
+    async def send(self, content: Optional[str] = None, embeds=None, files=None):
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        self.dms.append({"content": content, "embeds": len(embeds or []), "files": len(files or [])})
+
+class FakeGuild:
+    def __init__(self, guild_id: int, shard_id: int = 0):
+        self.id = guild_id
+        self.shard_id = shard_id
+
+class FakeChannel:
+    def __init__(self, channel_id: int, name: str = "bench", guild: Optional[FakeGuild] = None):
+        self.id = channel_id
+        self.name = name
+        self.guild = guild
+        # Stands in for the message cache: the "partial message" is the fake message itself
+        self.messages = {}
+
+    def get_partial_message(self, message_id: int) -> 'FakeMessage':
+        return self.messages[message_id]
+
+class FakeMessage:
+    def __init__(self, content: str, author: FakeAuthor, channel: FakeChannel, api_latency: float = 0.0):
+        # Real, increasing snowflakes keep high-water marks and log ordering realistic
+        self.id = time_snowflake(utcnow()) + next(_message_ids)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.attachments = []
+        self.embeds = []
+        self.mentions = []
+        self.api_latency = api_latency
+        self.deleted = False
+        channel.messages[self.id] = self
+        # commands.Context reads it; prefix commands are never matched here
+        self._state = None
+
+    async def delete(self):
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        self.deleted = True
@@ -0,0 +1,94 @@
+"""Real discord.py objects built from gateway payloads, with the REST calls faked.
+
+Messages are constructed by discord.py from MESSAGE_CREATE payloads and
+appended to the client's message cache exactly as the gateway parser does,
+so memory includes real `discord.Message`/`Member` objects and the cache
+limits (`max_messages`, member cache flags) of the running profile. DMs and
+deletions go to an in-process stand-in for the HTTP client.
+"""
+import asyncio
+import itertools
+from discord import Message
+from discord.utils import time_snowflake, utcnow
+
+_message_ids = itertools.count()
+
+def _user(user_id: int, name: str, bot: bool = False) -> dict:
+    return {"id": str(user_id), "username": name, "discriminator": "0", "avatar": None,
+            "global_name": None, "bot": bot}
+
+def guild_payload(guild_id: int, channel_id: int) -> dict:
+    everyone = {"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                "hoist": False, "managed": False, "mentionable": False, "flags": 0}
+    return {
+        "id": str(guild_id), "name": "bench", "owner_id": "1", "member_count": 1, "unavailable": False,
+        "large": False, "roles": [everyone], "emojis": [], "stickers": [], "features": [], "members": [],
+        "channels": [{"id": str(channel_id), "type": 0, "name": "bench", "position": 0,
+                      "permission_overwrites": [], "guild_id": str(guild_id)}],
+        "threads": [], "voice_states": [], "presences": [], "stage_instances": [], "guild_scheduled_events": [],
+        "afk_timeout": 300, "verification_level": 0, "default_message_notifications": 0,
+        "explicit_content_filter": 0, "mfa_level": 0, "premium_tier": 0, "nsfw_level": 0,
+        "preferred_locale": "en-US", "system_channel_flags": 0,
+    }
+
+def message_payload(channel_id: int, guild_id: int, user_id: int, name: str, content: str) -> dict:
+    return {
+        "id": str(time_snowflake(utcnow()) + next(_message_ids)), "type": 0,
+        "channel_id": str(channel_id), "guild_id": str(guild_id),
+        "author": _user(user_id, name),
+        "member": {"roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0},
+        "content": content, "timestamp": utcnow().isoformat(), "edited_timestamp": None,
+        "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+        "attachments": [], "embeds": [], "pinned": False,
+    }
+
+class FakeHTTP:
+    """The REST endpoints moderation calls, answered locally after `api_latency`"""
+
+    def __init__(self, bot_user_id: int, api_latency: float = 0.0):
+        self.bot_user = _user(bot_user_id, "Quality", bot=True)
+        self.api_latency = api_latency
+        self.dms = 0
+        self.deleted = 0
+
+    async def _wait(self):
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+    async def start_private_message(self, user_id):
+        await self._wait()
+        return {"id": str(int(user_id) + (1 << 40)), "type": 1, "recipients": [_user(int(user_id), "user")]}
+
+    async def send_message(self, channel_id, *, params):
+        await self._wait()
+        self.dms += 1
+        return {
+            "id": str(time_snowflake(utcnow()) + next(_message_ids)), "type": 0, "channel_id": str(channel_id),
+            "author": self.bot_user, "content": "", "timestamp": utcnow().isoformat(), "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+            "attachments": [], "embeds": [], "pinned": False,
+        }
+
+    async def delete_message(self, channel_id, message_id, *, reason=None):
+        await self._wait()
+        self.deleted += 1
+
+def install(bot, guild_id: int, channel_id: int, api_latency: float = 0.0) -> FakeHTTP:
+    """Guild-ը և channel-ը state-ում ավելացնել, REST կանչերը փոխարինել"""
+    from discord import ClientUser
+    state = bot._connection
+    fake = FakeHTTP(1, api_latency)
+    state.user = ClientUser(state=state, data=fake.bot_user)
+    state._add_guild_from_data(guild_payload(guild_id, channel_id))
+    for name in ('start_private_message', 'send_message', 'delete_message'):
+        setattr(bot.http, name, getattr(fake, name))
+    return fake
+
+def receive(bot, payload: dict) -> Message:
+    """MESSAGE_CREATE-ի մշակումը՝ ինչպես gateway parser-ը (առանց dispatch-ի)"""
+    state = bot._connection
+    channel = state._get_guild(int(payload["guild_id"])).get_channel(int(payload["channel_id"]))
+    message = Message(state=state, channel=channel, data=payload)
+    if state._messages is not None:
+        state._messages.append(message)
+    return message
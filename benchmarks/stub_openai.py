@@ -0,0 +1,181 @@
+"""Local stub of the OpenAI Assistants endpoints used by OpenAIService.
+
+Implements POST /threads/runs, POST /threads, POST /threads/{thread_id}/runs,
+GET /threads/{thread_id}/runs/{run_id} and GET /threads/{thread_id}/messages. A run completes after a latency drawn
+from the configured distribution (`fixed`, `uniform` on [0, 2 * latency],
+`exponential` or `lognormal`, all with mean `latency`). `error_rate` of
+run creations fail with HTTP 500 and `fail_rate` of runs end as "failed".
+The verdict is "reject" when the message contains "spam", otherwise "approve".
+
+Run standalone:
+    python -m benchmarks.stub_openai --port 8081 --latency 0.5 --distribution lognormal
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import random
+import time
+from aiohttp import web
+
+class StubOpenAI:
+    """In-memory fake of threads/runs/messages"""
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'exponential', 'lognormal')
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0,
+                 distribution: str = 'fixed', fail_rate: float = 0.0, sigma: float = 0.5):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {distribution}")
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_rate = fail_rate
+        self.distribution = distribution
+        self.sigma = sigma
+        self.random = random.Random(seed)
+        self.runs = {}
+        self.threads = {}
+        self.ids = itertools.count(1)
+        self.requests = 0
+        # Seconds a cancelled run stays "cancelling"
+        self.cancel_delay = 0.5
+
+    def verdict_for(self, content: str) -> dict:
+        if 'spam' in content.lower():
+            return {"status": "reject", "feedback": "Spam is not allowed in this channel."}
+        return {"status": "approve", "feedback": ""}
+
+    def sample_latency(self) -> float:
+        if self.latency <= 0 or self.distribution == 'fixed':
+            return self.latency
+        if self.distribution == 'uniform':
+            return self.random.uniform(0, 2 * self.latency)
+        if self.distribution == 'exponential':
+            return self.random.expovariate(1 / self.latency)
+        # Long right tail, like real model latency; mu chosen so the mean is `latency`
+        mu = math.log(self.latency) - self.sigma ** 2 / 2
+        return self.random.lognormvariate(mu, self.sigma)
+
+    async def create_run(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.error_rate and self.random.random() < self.error_rate:
+            return web.json_response({"error": {"message": "stub error"}}, status=500)
+
+        payload = await request.json()
+        return self._start_run(payload["thread"]["messages"][0]["content"], next(self.ids))
+
+    async def create_thread(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        n = next(self.ids)
+        self.threads[f"thread_{n}"] = payload["messages"][0]["content"]
+        return web.json_response({"id": f"thread_{n}"})
+
+    async def create_thread_run(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        if self.error_rate and self.random.random() < self.error_rate:
+            return web.json_response({"error": {"message": "stub error"}}, status=500)
+
+        thread_id = request.match_info["thread_id"]
+        content = self.threads.pop(thread_id)
+        return self._start_run(content, int(thread_id.split("_", 1)[1]))
+
+    def _start_run(self, content, n: int) -> web.Response:
+        if isinstance(content, list):
+            # Text and image_url parts; images are not looked at
+            content = " ".join(part.get("text", "") for part in content)
+        thread_id, run_id = f"thread_{n}", f"run_{n}"
+        self.runs[run_id] = {
+            "thread_id": thread_id,
+            "done_at": time.monotonic() + self.sample_latency(),
+            "verdict": self.verdict_for(content),
+            "failed": bool(self.fail_rate) and self.random.random() < self.fail_rate,
+            # Rough token counts: ~4 characters per token plus the assistant's instructions
+            "usage": {"prompt_tokens": 400 + len(content) // 4, "completion_tokens": 20,
+                      "total_tokens": 420 + len(content) // 4},
+        }
+        return web.json_response({"id": run_id, "thread_id": thread_id, "status": "queued"})
+
+    async def get_run(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        run = self.runs[request.match_info["run_id"]]
+        if "cancelled_at" in run:
+            if time.monotonic() < run["cancelled_at"]:
+                return web.json_response({"id": request.match_info["run_id"], "status": "cancelling", "usage": None})
+            self.runs.pop(request.match_info["run_id"])
+            return web.json_response({"id": request.match_info["run_id"], "status": "cancelled",
+                                      "usage": run["usage"]})
+        if time.monotonic() < run["done_at"]:
+            status = "in_progress"
+        elif run["failed"]:
+            status = "failed"
+            self.runs.pop(request.match_info["run_id"])
+        else:
+            status = "completed"
+        body = {"id": request.match_info["run_id"], "status": status}
+        if status != "in_progress":
+            body["usage"] = run["usage"]
+        return web.json_response(body)
+
+    async def cancel_run(self, request: web.Request) -> web.Response:
+        # Like the real API: the run is "cancelling" (no usage yet) until it has stopped
+        self.requests += 1
+        run = self.runs.get(request.match_info["run_id"])
+        if run is None:
+            return web.json_response({"error": {"message": "No run found"}}, status=404)
+        run["cancelled_at"] = time.monotonic() + self.cancel_delay
+        return web.json_response({"id": request.match_info["run_id"], "status": "cancelling", "usage": None})
+
+    async def get_messages(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        thread_id = request.match_info["thread_id"]
+        run_id = "run_" + thread_id.split("_", 1)[1]
+        run = self.runs.pop(run_id)
+        return web.json_response({"data": [{
+            "role": "assistant",
+            "content": [{"text": {"value": json.dumps(run["verdict"])}}]
+        }]})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/threads/runs', self.create_run)
+        app.router.add_post('/threads', self.create_thread)
+        app.router.add_post('/threads/{thread_id}/runs', self.create_thread_run)
+        app.router.add_get('/threads/{thread_id}/runs/{run_id}', self.get_run)
+        app.router.add_post('/threads/{thread_id}/runs/{run_id}/cancel', self.cancel_run)
+        app.router.add_get('/threads/{thread_id}/messages', self.get_messages)
+        return app
+
+async def start_stub(stub: StubOpenAI, port: int = 0):
+    """Stub-ը գործարկել; վերադարձնում է (runner, base_url)"""
+    runner = web.AppRunner(stub.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI Assistants API")
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--distribution', choices=StubOpenAI.DISTRIBUTIONS, default='fixed')
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of run creations failing with 500")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="share of runs ending as failed")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    async def serve():
+        stub = StubOpenAI(args.latency, args.error_rate, args.seed, args.distribution, args.fail_rate)
+        runner, base_url = await start_stub(stub, args.port)
+        print(f"Stub OpenAI listening on {base_url} (set OPENAI_BASE_URL={base_url})")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Local stub of a Discord webhook endpoint.
+
+Accepts POST /webhooks/{id}/{token}, counts messages and embeds, and answers
+`rate_limit_rate` of the requests with a 429 and a `retry_after`, like Discord.
+GET /stats returns the counters as JSON.
+
+Run standalone:
+    python -m benchmarks.stub_webhook --port 8082 --rate-limit-rate 0.05
+"""
+import argparse
+import asyncio
+import random
+from aiohttp import web
+
+class StubWebhook:
+    """Counting webhook receiver"""
+
+    def __init__(self, rate_limit_rate: float = 0.0, retry_after: float = 0.5, seed: int = 0):
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "messages": 0, "embeds": 0, "rate_limited": 0}
+
+    async def receive(self, request: web.Request) -> web.Response:
+        self.stats["requests"] += 1
+        if self.rate_limit_rate and self.random.random() < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return web.json_response(
+                {"message": "You are being rate limited.", "retry_after": self.retry_after, "global": False},
+                status=429
+            )
+
+        payload = await request.json()
+        self.stats["messages"] += 1
+        self.stats["embeds"] += len(payload.get("embeds") or [])
+        return web.Response(status=204, headers={
+            "X-RateLimit-Remaining": "4", "X-RateLimit-Reset-After": "0.1"
+        })
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/webhooks/{webhook_id}/{token}', self.receive)
+        app.router.add_get('/stats', self.get_stats)
+        return app
+
+async def start_stub(stub: StubWebhook, port: int = 0):
+    """Stub-ը գործարկել; վերադարձնում է (runner, webhook_url)"""
+    runner = web.AppRunner(stub.app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/webhooks/1/benchmark"
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Discord webhook receiver")
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=0.5)
+    args = parser.parse_args()
+
+    async def serve():
+        runner, url = await start_stub(StubWebhook(args.rate_limit_rate, args.retry_after), args.port)
+        print(f"Stub webhook listening on {url} (set WEBHOOK_URL={url})")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,68 @@ load_dotenv()
 # Discord Configuration
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN')
 CHANNEL_ID = int(os.getenv('CHANNEL_ID', 0))
+# Low-memory profile: minimal intents, no member cache, LOW_MEMORY_MAX_MESSAGES cached messages (0 = none)
+LOW_MEMORY = os.getenv('LOW_MEMORY', 'false').lower() == 'true'
+LOW_MEMORY_MAX_MESSAGES = int(os.getenv('LOW_MEMORY_MAX_MESSAGES', 100))
+
+# Multi-channel Configuration (JSON file with per-channel policies)
+CHANNELS_CONFIG = os.getenv('CHANNELS_CONFIG')
+POLICY_REFRESH_INTERVAL = float(os.getenv('POLICY_REFRESH_INTERVAL', 60))
 
 # OpenAI Configuration  
 OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
 ASSISTANT_ID = os.getenv('ASSISTANT_ID')
+OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1')
+
+# Input Compaction (normalized, length-capped text is sent to OpenAI and used as the cache key)
+INPUT_COMPACTION = os.getenv('INPUT_COMPACTION', 'true').lower() == 'true'
+COMPACT_MAX_CHARS = int(os.getenv('COMPACT_MAX_CHARS', 2000))
+
+# Image Reposts (perceptual hashes of image attachments; needs Pillow)
+IMAGE_HASHING = os.getenv('IMAGE_HASHING', 'true').lower() == 'true'
+IMAGE_HASH_DISTANCE = int(os.getenv('IMAGE_HASH_DISTANCE', 6))
+IMAGE_HASH_INDEX_SIZE = int(os.getenv('IMAGE_HASH_INDEX_SIZE', 20000))
+IMAGE_HASH_MAX_IMAGES = int(os.getenv('IMAGE_HASH_MAX_IMAGES', 4))
+IMAGE_HASH_MAX_BYTES = int(os.getenv('IMAGE_HASH_MAX_BYTES', 8 * 1024 * 1024))
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', 40_000_000))
+# Verdict for messages without text when no earlier verdict matches: approve | reject | needs_edit
+ATTACHMENT_ONLY_VERDICT = os.getenv('ATTACHMENT_ONLY_VERDICT', 'approve')
+# Send the images of text messages to the Assistant (needs a vision model); only these verdicts
+# are remembered for reposts
+OPENAI_IMAGE_INPUT = os.getenv('OPENAI_IMAGE_INPUT', 'false').lower() == 'true'
+
+# Local Classifier (decides confident cases before OpenAI; trained on earlier verdicts)
+LOCAL_MODEL = os.getenv('LOCAL_MODEL', 'false').lower() == 'true'
+LOCAL_MODEL_PATH = os.getenv('LOCAL_MODEL_PATH', 'local_model.pkl')
+LOCAL_MODEL_LABELS = frozenset(l.strip() for l in os.getenv('LOCAL_MODEL_LABELS', 'approve').split(',') if l.strip())
+LOCAL_MODEL_PRECISION = float(os.getenv('LOCAL_MODEL_PRECISION', 0.98))
+LOCAL_MODEL_MIN_ROWS = int(os.getenv('LOCAL_MODEL_MIN_ROWS', 1000))
+LOCAL_MODEL_MAX_ROWS = int(os.getenv('LOCAL_MODEL_MAX_ROWS', 200000))
+LOCAL_MODEL_RETRAIN_INTERVAL = float(os.getenv('LOCAL_MODEL_RETRAIN_INTERVAL', 6 * 3600))
+LOCAL_MODEL_MIN_NEW_LABELS = int(os.getenv('LOCAL_MODEL_MIN_NEW_LABELS', 500))
+
+# Flood and Raid Guard (0 disables a check; RAID_ACTION: representative | reject)
+FLOOD_WINDOW = int(os.getenv('FLOOD_WINDOW', 10))
+FLOOD_USER_MESSAGES = int(os.getenv('FLOOD_USER_MESSAGES', 8))
+RAID_AUTHORS = int(os.getenv('RAID_AUTHORS', 15))
+RAID_COOLDOWN = float(os.getenv('RAID_COOLDOWN', 60))
+RAID_ACTION = os.getenv('RAID_ACTION', 'representative')
+FLOOD_MAX_TRACKED = int(os.getenv('FLOOD_MAX_TRACKED', 50000))
+
+# OpenAI Cost Configuration (USD per 1M tokens; 0 budget = unlimited)
+OPENAI_PROMPT_PRICE = float(os.getenv('OPENAI_PROMPT_PRICE', 0.15))
+OPENAI_COMPLETION_PRICE = float(os.getenv('OPENAI_COMPLETION_PRICE', 0.60))
+DAILY_BUDGET = float(os.getenv('DAILY_BUDGET', 0))
+MONTHLY_BUDGET = float(os.getenv('MONTHLY_BUDGET', 0))
+BUDGET_SOFT_LIMIT = float(os.getenv('BUDGET_SOFT_LIMIT', 0.8))
+BUDGET_SAMPLE_RATE = float(os.getenv('BUDGET_SAMPLE_RATE', 0.25))
+BUDGET_REFRESH_INTERVAL = float(os.getenv('BUDGET_REFRESH_INTERVAL', 60))
+
+# Shadow Evaluation Configuration (SHADOW_SAMPLE_RATE=0 disables it)
+SHADOW_ASSISTANT_ID = os.getenv('SHADOW_ASSISTANT_ID')
+SHADOW_BASE_URL = os.getenv('SHADOW_BASE_URL')
+SHADOW_API_KEY = os.getenv('SHADOW_API_KEY')
+SHADOW_SAMPLE_RATE = float(os.getenv('SHADOW_SAMPLE_RATE', 0))
 
 # Database Configuration
 DB_FILE = os.getenv('DB_FILE', 'moderation_logs.db')
@@ -18,14 +76,86 @@ DB_FILE = os.getenv('DB_FILE', 'moderation_logs.db')
 # Webhook Configuration
 WEBHOOK_URL = os.getenv('WEBHOOK_URL')
 
+# Sharding Configuration
+SHARD_MODE = os.getenv('SHARD_MODE', 'none')  # none | auto | process
+SHARD_COUNT = int(os.getenv('SHARD_COUNT') or 0) or None  # empty = Discord's recommendation
+SHARD_IDS = os.getenv('SHARD_IDS')  # e.g. "0-3" (set automatically in process mode)
+SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', os.cpu_count() or 1))
+SHARD_METRICS_INTERVAL = float(os.getenv('SHARD_METRICS_INTERVAL', 60))
+
+# Startup Catch-up Configuration
+CATCHUP_ENABLED = os.getenv('CATCHUP_ENABLED', 'true').lower() == 'true'
+CATCHUP_CONCURRENCY = int(os.getenv('CATCHUP_CONCURRENCY', 4))
+CATCHUP_RATE = float(os.getenv('CATCHUP_RATE', 2))
+CATCHUP_MAX_MESSAGES = int(os.getenv('CATCHUP_MAX_MESSAGES', 1000))
+HWM_FLUSH_INTERVAL = float(os.getenv('HWM_FLUSH_INTERVAL', 30))
+
+# Edit Re-moderation Configuration
+EDIT_MODERATION = os.getenv('EDIT_MODERATION', 'true').lower() == 'true'
+# Typo-level edits up to this many characters are not re-moderated (0 = only whitespace,
+# case and punctuation changes are skipped); edits to URLs, invites and mentions never are
+EDIT_MIN_DISTANCE = int(os.getenv('EDIT_MIN_DISTANCE', 0))
+
+# Moderation Worker Configuration (0 = analyse in the gateway process)
+WORKER_PROCESSES = int(os.getenv('WORKER_PROCESSES', 0))
+WORKER_CONCURRENCY = int(os.getenv('WORKER_CONCURRENCY', 16))
+WORKER_TIMEOUT = float(os.getenv('WORKER_TIMEOUT', 120))
+
+# Verdict Cache Configuration (shared by all processes through the database)
+VERDICT_CACHE_TTL = float(os.getenv('VERDICT_CACHE_TTL', 86400))
+VERDICT_CACHE_SIZE = int(os.getenv('VERDICT_CACHE_SIZE', 10000))
+
+# Warm Restart Configuration (empty WARM_STATE_FILE disables snapshots)
+WARM_STATE_FILE = os.getenv('WARM_STATE_FILE', 'warm_state.bin')
+WARM_STATE_INTERVAL = float(os.getenv('WARM_STATE_INTERVAL', 300))
+
+# Webhook Dispatcher Configuration
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', 1000))
+WEBHOOK_FLUSH_INTERVAL = float(os.getenv('WEBHOOK_FLUSH_INTERVAL', 2))
+WEBHOOK_MAX_RETRIES = int(os.getenv('WEBHOOK_MAX_RETRIES', 5))
+WEBHOOK_AGGREGATE_APPROVALS = os.getenv('WEBHOOK_AGGREGATE_APPROVALS', 'false').lower() == 'true'
+WEBHOOK_SUMMARY_INTERVAL = float(os.getenv('WEBHOOK_SUMMARY_INTERVAL', 300))
+# Longest wait for unsent embeds on shutdown (seconds)
+WEBHOOK_DRAIN_TIMEOUT = float(os.getenv('WEBHOOK_DRAIN_TIMEOUT', 10))
+
+# DM Outbox Configuration
+DM_COALESCE_WINDOW = float(os.getenv('DM_COALESCE_WINDOW', 3))
+DM_RATE_PER_SECOND = float(os.getenv('DM_RATE_PER_SECOND', 2))
+DM_MAX_PENDING_USERS = int(os.getenv('DM_MAX_PENDING_USERS', 500))
+
+# Attachment Download Configuration
+ATTACHMENT_CONCURRENCY = int(os.getenv('ATTACHMENT_CONCURRENCY', 4))
+ATTACHMENT_SPOOL_THRESHOLD = int(os.getenv('ATTACHMENT_SPOOL_THRESHOLD', 1024 * 1024))
+ATTACHMENT_MAX_BYTES = int(os.getenv('ATTACHMENT_MAX_BYTES', 25 * 1024 * 1024))
+DM_ATTACHMENT_BUDGET = int(os.getenv('DM_ATTACHMENT_BUDGET', 25 * 1024 * 1024))
+
+# Metrics Configuration (METRICS_PORT=0 disables the endpoint)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+# Latency sketches are written to the latency_sketches table this often (seconds);
+# a crash loses at most this much of the current hour
+LATENCY_FLUSH_INTERVAL = float(os.getenv('LATENCY_FLUSH_INTERVAL', 300))
+
+# Event Loop Watchdog Configuration (WATCHDOG_INTERVAL=0 disables it)
+WATCHDOG_INTERVAL = float(os.getenv('WATCHDOG_INTERVAL', 0.5))
+WATCHDOG_STALL_THRESHOLD = float(os.getenv('WATCHDOG_STALL_THRESHOLD', 1.0))
+
+# Tracing Configuration (per-stage timings in the message_spans table)
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'false').lower() == 'true'
+
 # Logging Configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FILE = os.getenv('LOG_FILE', 'discord_moderator.log')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')  # text | json
+LOG_ROTATION = os.getenv('LOG_ROTATION', 'size')  # size | time | none
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_ROTATION_WHEN = os.getenv('LOG_ROTATION_WHEN', 'midnight')
 
 # Validation
 required_vars = [
     ('DISCORD_TOKEN', DISCORD_TOKEN),
-    ('CHANNEL_ID', CHANNEL_ID),
+    ('CHANNEL_ID or CHANNELS_CONFIG', CHANNEL_ID or CHANNELS_CONFIG),
     ('OPENAI_API_KEY', OPENAI_API_KEY),
     ('ASSISTANT_ID', ASSISTANT_ID)
 ]
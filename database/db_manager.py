@@ -1,12 +1,27 @@
 import sqlite3
 import json
+import hashlib
+import zlib
+import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 from utils.logger import setup_logger
+from utils.metrics import DB_WRITE_LATENCY
+from utils.tracing import traced
 from config.settings import DB_FILE
 
 logger = setup_logger(__name__)
 
+def content_hash(text: str) -> str:
+    """Տեքստի sha256 hash-ը (contents աղյուսակի բանալին)"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def decode_content(data: Optional[bytes]) -> Optional[str]:
+    """contents.data-ն վերադարձնել տեքստի"""
+    if data is None:
+        return None
+    return zlib.decompress(data).decode('utf-8')
+
 class DatabaseManager:
     """Database operations manager"""
     
@@ -14,11 +29,20 @@ class DatabaseManager:
         self.db_file = DB_FILE
         self.init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Կապ database-ի հետ (մի քանի պրոցես կարող են միաժամանակ գրել)"""
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
     def init_database(self):
         """Database-ը և աղյուսակները ստեղծել"""
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         cursor = conn.cursor()
         
+        # WAL lets shard processes and readers work concurrently with one writer
+        cursor.execute("PRAGMA journal_mode=WAL")
+        
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS message_logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -37,37 +61,362 @@ class DatabaseManager:
         )
         ''')
         
+        # Content-addressed storage: each distinct body/feedback is stored once
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT NOT NULL UNIQUE,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL
+        )
+        ''')
+        
+        # Per-channel moderation policy (source of truth; editable at runtime)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS channel_policies (
+            channel_id TEXT PRIMARY KEY,
+            guild_id TEXT,
+            assistant_id TEXT,
+            rules TEXT,
+            webhook_url TEXT,
+            actions TEXT NOT NULL DEFAULT 'dm,webhook',
+            enabled INTEGER NOT NULL DEFAULT 1,
+            updated_at DATETIME NOT NULL
+        )
+        ''')
+        
+        # Last moderated message per channel (startup catch-up starts after it)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS channel_state (
+            channel_id TEXT PRIMARY KEY,
+            last_message_id INTEGER NOT NULL,
+            updated_at DATETIME NOT NULL
+        )
+        ''')
+        
+        # Verdicts shared by all shard processes, keyed by content + policy hash
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS verdict_cache (
+            cache_key TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            feedback TEXT,
+            created_at REAL NOT NULL
+        )
+        ''')
+        
+        # Per-stage timings of traced messages (TRACING_ENABLED)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS message_spans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            offset_ms REAL NOT NULL,
+            duration_ms REAL NOT NULL,
+            created_at DATETIME NOT NULL
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_message_spans_message_id ON message_spans(message_id)")
+        
+        # Primary vs shadow verdicts of sampled messages (SHADOW_SAMPLE_RATE)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS shadow_evaluations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_id TEXT,
+            primary_assistant TEXT,
+            shadow_assistant TEXT,
+            primary_status TEXT NOT NULL,
+            shadow_status TEXT NOT NULL,
+            primary_latency REAL,
+            shadow_latency REAL,
+            created_at DATETIME NOT NULL
+        )
+        ''')
+        
+        # Hourly OpenAI usage per channel and verdict source (budgets and cost reports read this);
+        # tokens that produced no verdict (failed runs, shadow calls) have their own source
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS usage_rollups (
+            hour TEXT NOT NULL,
+            channel_id TEXT NOT NULL,
+            source TEXT NOT NULL DEFAULT '',
+            messages INTEGER NOT NULL DEFAULT 0,
+            openai_calls INTEGER NOT NULL DEFAULT 0,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            cost REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (hour, channel_id, source)
+        )
+        ''')
+        
+        # Hourly latency sketches (utils/latency_sketch.py); several rows per hour are merged on read
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS latency_sketches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hour TEXT NOT NULL,
+            name TEXT NOT NULL,
+            samples INTEGER NOT NULL,
+            data BLOB NOT NULL
+        )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_latency_sketches_hour ON latency_sketches(hour)")
+        
+        self._add_missing_columns(cursor, 'message_logs', {
+            'content_id': 'INTEGER REFERENCES contents(id)',
+            'feedback_id': 'INTEGER REFERENCES contents(id)',
+            # Re-moderated edits point at the first log row of the message
+            'revision_of': 'INTEGER REFERENCES message_logs(id)',
+            # OpenAI usage of this verdict (NULL for cache hits and old rows)
+            'prompt_tokens': 'INTEGER',
+            'completion_tokens': 'INTEGER',
+            'cost': 'REAL',
+            # Where the verdict came from: openai, cache, local_model, image_repost, attachment_policy
+            'verdict_source': 'TEXT'
+        })
+        
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_message_logs_message_id ON message_logs(message_id)")
+        
         conn.commit()
         conn.close()
         logger.info("Database initialized successfully")
     
+    @staticmethod
+    def _add_missing_columns(cursor: sqlite3.Cursor, table: str, columns: Dict[str, str]):
+        """Հին database-ներում բացակայող սյուները ավելացնել"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        
+        for name, definition in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+                logger.info(f"Added column {table}.{name}")
+    
+    @staticmethod
+    def _store_content(cursor: sqlite3.Cursor, text: Optional[str]) -> Optional[int]:
+        """Տեքստը contents-ում պահել (եթե դեռ չկա) և id-ն վերադարձնել (BEGIN IMMEDIATE-ի ներսում)"""
+        if text is None:
+            return None
+        
+        digest = content_hash(text)
+        cursor.execute("SELECT id FROM contents WHERE hash = ?", (digest,))
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+        
+        # Another process may store the same text between the SELECT and here
+        raw = text.encode('utf-8')
+        cursor.execute(
+            "INSERT OR IGNORE INTO contents (hash, data, size) VALUES (?, ?, ?)",
+            (digest, zlib.compress(raw), len(raw))
+        )
+        cursor.execute("SELECT id FROM contents WHERE hash = ?", (digest,))
+        return cursor.fetchone()[0]
+    
+    @traced('db_write')
     def log_message_event(self, message_id: str, user_id: str, username: str, 
                          channel_id: str, server_id: str, original_content: str,
                          attachment_urls: List[str], ai_status: Optional[str] = None,
                          ai_feedback: Optional[str] = None, action_taken: Optional[str] = None,
-                         processing_time: Optional[float] = None):
+                         processing_time: Optional[float] = None, revision_of: Optional[int] = None,
+                         prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None,
+                         cost: Optional[float] = None, verdict_source: Optional[str] = None):
         """Նամակի մանրամասները database-ում պահել"""
-        conn = sqlite3.connect(self.db_file)
+        started = time.perf_counter()
+        now = datetime.now()
+        conn = self._connect()
         cursor = conn.cursor()
+        # Take the write lock before looking up contents, so the orphan sweep in
+        # cleanup_old_logs cannot delete a reused row before this log references it
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        content_id = self._store_content(cursor, original_content)
+        feedback_id = self._store_content(cursor, ai_feedback)
         
         cursor.execute('''
         INSERT INTO message_logs (
             message_id, user_id, username, channel_id, server_id,
-            original_content, attachment_urls, timestamp, ai_status,
-            ai_feedback, action_taken, processing_time
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            content_id, attachment_urls, timestamp, ai_status,
+            feedback_id, action_taken, processing_time, revision_of,
+            prompt_tokens, completion_tokens, cost, verdict_source
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             message_id, user_id, username, channel_id, server_id,
-            original_content, json.dumps(attachment_urls), datetime.now(),
-            ai_status, ai_feedback, action_taken, processing_time
+            content_id, json.dumps(attachment_urls), now,
+            ai_status, feedback_id, action_taken, processing_time, revision_of,
+            prompt_tokens, completion_tokens, cost, verdict_source
         ))
         
+        self._add_usage(cursor, now, channel_id, verdict_source or '', 1, 1 if prompt_tokens is not None else 0,
+                        prompt_tokens or 0, completion_tokens or 0, cost or 0.0)
+        
+        conn.commit()
+        conn.close()
+        DB_WRITE_LATENCY.observe(time.perf_counter() - started)
+    
+    @staticmethod
+    def _add_usage(cursor: sqlite3.Cursor, now: datetime, channel_id: str, source: str, messages: int,
+                   openai_calls: int, prompt_tokens: int, completion_tokens: int, cost: float):
+        cursor.execute('''
+        INSERT INTO usage_rollups (hour, channel_id, source, messages, openai_calls, prompt_tokens, completion_tokens, cost)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (hour, channel_id, source) DO UPDATE SET
+            messages = messages + excluded.messages,
+            openai_calls = openai_calls + excluded.openai_calls,
+            prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+            completion_tokens = completion_tokens + excluded.completion_tokens,
+            cost = cost + excluded.cost
+        ''', (
+            now.strftime('%Y-%m-%d %H:00'), channel_id, source, messages, openai_calls,
+            prompt_tokens, completion_tokens, cost
+        ))
+    
+    def record_usage(self, channel_id: str, prompt_tokens: int, completion_tokens: int, cost: float, source: str):
+        """Verdict չտված OpenAI կանչի token-ները rollup-ում հաշվել (ձախողված run-եր, shadow)"""
+        conn = self._connect()
+        self._add_usage(conn.cursor(), datetime.now(), channel_id, source, 0, 1,
+                        prompt_tokens, completion_tokens, cost)
         conn.commit()
         conn.close()
     
+    def save_message_spans(self, message_id: str, spans: List[Tuple[str, float, float]]):
+        """Trace-ի (stage, offset_ms, duration_ms) տողերը պահել"""
+        if not spans:
+            return
+        now = datetime.now()
+        conn = self._connect()
+        conn.executemany(
+            "INSERT INTO message_spans (message_id, stage, offset_ms, duration_ms, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(message_id, stage, offset, duration, now) for stage, offset, duration in spans]
+        )
+        conn.commit()
+        conn.close()
+    
+    def get_message_spans(self, message_id: str) -> List[Tuple[str, float, float]]:
+        """Նամակի վերջին trace-ի stage-երը"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT stage, offset_ms, duration_ms FROM message_spans
+        WHERE message_id = ? AND created_at = (
+            SELECT MAX(created_at) FROM message_spans WHERE message_id = ?
+        )
+        ORDER BY offset_ms
+        ''', (message_id, message_id))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
+    def get_usage_cost(self, since: datetime) -> float:
+        """`since`-ից հետո OpenAI-ի ծախսը (ժամային rollup-ներից)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(SUM(cost), 0) FROM usage_rollups WHERE hour >= ?",
+                       (since.strftime('%Y-%m-%d %H:00'),))
+        cost = cursor.fetchone()[0]
+        conn.close()
+        return cost
+    
+    def get_usage_report(self, days: int = 1, limit: int = 10) -> Dict[str, List[Tuple]]:
+        """Ծախսն ըստ ալիքների և աղբյուրների (rollup-ներից) և ամենաթանկ օգտատերերը (message_logs-ից)"""
+        since = datetime.now() - timedelta(days=days)
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+        SELECT channel_id, SUM(messages), SUM(openai_calls), SUM(prompt_tokens),
+               SUM(completion_tokens), SUM(cost)
+        FROM usage_rollups WHERE hour >= ?
+        GROUP BY channel_id ORDER BY SUM(cost) DESC LIMIT ?
+        ''', (since.strftime('%Y-%m-%d %H:00'), limit))
+        channels = cursor.fetchall()
+        cursor.execute('''
+        SELECT source, SUM(openai_calls), SUM(prompt_tokens) + SUM(completion_tokens), SUM(cost)
+        FROM usage_rollups WHERE hour >= ? AND openai_calls > 0
+        GROUP BY source ORDER BY SUM(cost) DESC
+        ''', (since.strftime('%Y-%m-%d %H:00'),))
+        sources = cursor.fetchall()
+        cursor.execute('''
+        SELECT username, COUNT(*), SUM(prompt_tokens) + SUM(completion_tokens), SUM(cost)
+        FROM message_logs WHERE timestamp >= ? AND cost IS NOT NULL
+        GROUP BY user_id ORDER BY SUM(cost) DESC LIMIT ?
+        ''', (since, limit))
+        users = cursor.fetchall()
+        conn.close()
+        return {'channels': channels, 'sources': sources, 'users': users}
+    
+    def save_latency_sketches(self, rows: List[Tuple[str, str, int, bytes]]):
+        """(hour, name, samples, data) sketch-երը պահել"""
+        conn = self._connect()
+        conn.executemany("INSERT INTO latency_sketches (hour, name, samples, data) VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+    
+    def get_latency_sketches(self, since_hour: str) -> List[Tuple[str, bytes]]:
+        """`since_hour`-ից սկսած sketch-երը (name, data)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("SELECT name, data FROM latency_sketches WHERE hour >= ?", (since_hour,))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
+    def log_shadow_evaluation(self, message_id: Optional[str], primary_assistant: str,
+                              shadow_assistant: str, primary_status: str, shadow_status: str,
+                              primary_latency: float, shadow_latency: float):
+        """Primary և shadow verdict-ները պահել"""
+        conn = self._connect()
+        conn.execute('''
+        INSERT INTO shadow_evaluations (
+            message_id, primary_assistant, shadow_assistant, primary_status, shadow_status,
+            primary_latency, shadow_latency, created_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (message_id, primary_assistant, shadow_assistant, primary_status, shadow_status,
+              primary_latency, shadow_latency, datetime.now()))
+        conn.commit()
+        conn.close()
+    
+    def get_shadow_report(self, days: int = 7) -> Dict:
+        """Shadow համեմատության ամփոփումը՝ համաձայնություն և latency-ների տարբերություն"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        since = datetime.now() - timedelta(days=days)
+        cursor.execute('''
+        SELECT primary_status, shadow_status, primary_latency, shadow_latency
+        FROM shadow_evaluations WHERE created_at >= ?
+        ''', (since,))
+        rows = cursor.fetchall()
+        conn.close()
+        
+        def percentile(values: List[float], q: float) -> Optional[float]:
+            if not values:
+                return None
+            values = sorted(values)
+            return values[min(len(values) - 1, int(q * len(values)))]
+        
+        pairs: Dict[Tuple[str, str], int] = {}
+        for primary_status, shadow_status, _, _ in rows:
+            pairs[(primary_status, shadow_status)] = pairs.get((primary_status, shadow_status), 0) + 1
+        
+        # Latency is only comparable when both sides produced a verdict
+        timed = [(p, s) for ps, ss, p, s in rows if ps != 'error' and ss != 'error' and p and s]
+        primary_latency = [p for p, _ in timed]
+        shadow_latency = [s for _, s in timed]
+        delta = [s - p for p, s in timed]
+        
+        return {
+            'total': len(rows),
+            'agreement': sum(1 for ps, ss, _, _ in rows if ps == ss) / len(rows) if rows else None,
+            'pairs': pairs,
+            'primary_p50': percentile(primary_latency, 0.5),
+            'primary_p95': percentile(primary_latency, 0.95),
+            'shadow_p50': percentile(shadow_latency, 0.5),
+            'shadow_p95': percentile(shadow_latency, 0.95),
+            'delta_p50': percentile(delta, 0.5),
+            'delta_p95': percentile(delta, 0.95),
+        }
+    
     def cleanup_old_logs(self, days: int = 30):
         """Հին logs-երը ջնջել"""
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cutoff_date = datetime.now() - timedelta(days=days)
@@ -78,6 +427,20 @@ class DatabaseManager:
         )
         
         deleted_rows = cursor.rowcount
+        
+        cursor.execute("DELETE FROM message_spans WHERE created_at < ?", (cutoff_date,))
+        cursor.execute("DELETE FROM shadow_evaluations WHERE created_at < ?", (cutoff_date,))
+        cursor.execute("DELETE FROM latency_sketches WHERE hour < ?", (cutoff_date.strftime('%Y-%m-%d %H:00'),))
+        
+        # Drop contents no longer referenced by any log row
+        cursor.execute('''
+        DELETE FROM contents WHERE id NOT IN (
+            SELECT content_id FROM message_logs WHERE content_id IS NOT NULL
+            UNION
+            SELECT feedback_id FROM message_logs WHERE feedback_id IS NOT NULL
+        )
+        ''')
+        
         conn.commit()
         conn.close()
         
@@ -88,7 +451,7 @@ class DatabaseManager:
     
     def get_user_stats(self, user_id: str, days: int = 30) -> Dict[str, int]:
         """Օգտատիրոջ վիճակագրությունը ստանալ"""
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cutoff_date = datetime.now() - timedelta(days=days)
@@ -127,22 +490,278 @@ class DatabaseManager:
     
     def get_recent_logs(self, limit: int = 10) -> List[Tuple]:
         """Վերջին logs-երը ստանալ"""
-        conn = sqlite3.connect(self.db_file)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
-        SELECT username, ai_status, timestamp, 
-               CASE 
-                   WHEN LENGTH(original_content) > 50 
-                   THEN SUBSTR(original_content, 1, 50) || '...'
-                   ELSE original_content
-               END as short_content
-        FROM message_logs 
-        ORDER BY timestamp DESC 
+        SELECT m.username, m.ai_status, m.timestamp, m.original_content, c.data
+        FROM message_logs m
+        LEFT JOIN contents c ON c.id = m.content_id
+        ORDER BY m.timestamp DESC 
+        LIMIT ?
+        ''', (limit,))
+        
+        rows = cursor.fetchall()
+        conn.close()
+        
+        logs = []
+        for username, status, timestamp, legacy_content, data in rows:
+            content = legacy_content if data is None else decode_content(data)
+            if content is not None and len(content) > 50:
+                content = content[:50] + '...'
+            logs.append((username, status, timestamp, content))
+        
+        return logs
+    
+    # Verdicts given by the Assistant (directly or through the verdict cache); old rows have no source
+    _LABELED_ROWS = """
+        m.ai_status IN ('approve', 'reject', 'needs_edit')
+        AND (m.verdict_source IS NULL OR m.verdict_source IN ('openai', 'cache'))
+    """
+    
+    def get_labeled_messages(self, limit: int = 200000) -> List[Tuple[int, str, str]]:
+        """Assistant-ի verdict ունեցող վերջին նամակները (id, տեքստ, status)՝ հին-նոր հերթականությամբ"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+        SELECT m.id, m.original_content, c.data, m.ai_status
+        FROM message_logs m
+        LEFT JOIN contents c ON c.id = m.content_id
+        WHERE {self._LABELED_ROWS}
+        ORDER BY m.id DESC
         LIMIT ?
         ''', (limit,))
         
-        logs = cursor.fetchall()
+        rows = cursor.fetchall()
+        conn.close()
+        
+        labeled = []
+        for row_id, legacy_content, data, status in reversed(rows):
+            content = legacy_content if data is None else decode_content(data)
+            if content:
+                labeled.append((row_id, content, status))
+        return labeled
+    
+    def count_labeled_messages(self, after_id: int = 0) -> int:
+        """`after_id`-ից հետո ավելացած Assistant-ի verdict-ների քանակը"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM message_logs m WHERE m.id > ? AND {self._LABELED_ROWS}", (after_id,))
+        count = cursor.fetchone()[0]
+        conn.close()
+        return count
+    
+    def get_latest_revision(self, message_id: str) -> Optional[Tuple[int, Optional[str]]]:
+        """Նամակի առաջին log-ի id-ն և վերջին պահված բովանդակությունը"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT m.id, m.revision_of, m.original_content, c.data
+        FROM message_logs m
+        LEFT JOIN contents c ON c.id = m.content_id
+        WHERE m.message_id = ?
+        ORDER BY m.id DESC
+        LIMIT 1
+        ''', (message_id,))
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row is None:
+            return None
+        
+        log_id, revision_of, legacy_content, data = row
+        content = legacy_content if data is None else decode_content(data)
+        return revision_of or log_id, content
+    
+    def is_message_logged(self, message_id: str) -> bool:
+        """Նամակն արդեն մոդերացվե՞լ է"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT 1 FROM message_logs WHERE message_id = ? LIMIT 1", (message_id,))
+        logged = cursor.fetchone() is not None
+        conn.close()
+        
+        return logged
+    
+    def get_high_water_marks(self) -> Dict[int, int]:
+        """Ալիք -> վերջին մոդերացված նամակի ID"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT channel_id, last_message_id FROM channel_state")
+        marks = {int(channel_id): last_id for channel_id, last_id in cursor.fetchall()}
+        conn.close()
+        
+        return marks
+    
+    def save_high_water_marks(self, marks: Dict[int, int]):
+        """High-water mark-երը պահել (միայն աճման դեպքում)"""
+        conn = self._connect()
+        conn.executemany('''
+        INSERT INTO channel_state (channel_id, last_message_id, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT(channel_id) DO UPDATE SET
+            last_message_id = MAX(last_message_id, excluded.last_message_id),
+            updated_at = excluded.updated_at
+        ''', [(str(channel_id), message_id, datetime.now()) for channel_id, message_id in marks.items()])
+        conn.commit()
+        conn.close()
+    
+    def get_cached_verdict(self, cache_key: str, max_age: float) -> Optional[Dict]:
+        """Cache-ից verdict ստանալ, եթե այն հին չէ"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT status, feedback FROM verdict_cache WHERE cache_key = ? AND created_at >= ?",
+            (cache_key, time.time() - max_age)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        
+        if row is None:
+            return None
+        return {"status": row[0], "feedback": row[1] or ""}
+    
+    def put_cached_verdict(self, cache_key: str, status: str, feedback: Optional[str]):
+        """Verdict-ը cache-ում պահել"""
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO verdict_cache (cache_key, status, feedback, created_at) VALUES (?, ?, ?, ?)",
+            (cache_key, status, feedback, time.time())
+        )
+        conn.commit()
+        conn.close()
+    
+    def cleanup_verdict_cache(self, max_age: float) -> int:
+        """Ժամկետանց verdict-ները ջնջել"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("DELETE FROM verdict_cache WHERE created_at < ?", (time.time() - max_age,))
+        deleted_rows = cursor.rowcount
+        conn.commit()
+        conn.close()
+        
+        return deleted_rows
+    
+    def get_channel_policies(self) -> List[Dict]:
+        """Բոլոր ալիքների policy-ները ստանալ"""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM channel_policies")
+        policies = [dict(row) for row in cursor.fetchall()]
         conn.close()
         
-        return logs
\ No newline at end of file
+        return policies
+    
+    def get_policies_version(self) -> Optional[str]:
+        """Policy-ների վերջին փոփոխության ժամանակը (reload-ի որոշման համար)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT MAX(updated_at) || ':' || COUNT(*) FROM channel_policies")
+        version = cursor.fetchone()[0]
+        conn.close()
+        
+        return version
+    
+    def upsert_channel_policy(self, channel_id: str, guild_id: Optional[str] = None,
+                              assistant_id: Optional[str] = None, rules: Optional[str] = None,
+                              webhook_url: Optional[str] = None, actions: Optional[str] = None,
+                              enabled: Optional[bool] = None, overwrite: bool = True) -> bool:
+        """Ալիքի policy-ն ստեղծել կամ թարմացնել (None դաշտերը չեն փոխվում, դատարկ տողը մաքրում է)"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT 1 FROM channel_policies WHERE channel_id = ?", (channel_id,))
+        exists = cursor.fetchone() is not None
+        
+        if exists and not overwrite:
+            conn.close()
+            return False
+        
+        if not exists:
+            cursor.execute(
+                "INSERT INTO channel_policies (channel_id, updated_at) VALUES (?, ?)",
+                (channel_id, datetime.now())
+            )
+        
+        cursor.execute('''
+        UPDATE channel_policies
+        SET guild_id = COALESCE(?, guild_id),
+            assistant_id = COALESCE(?, assistant_id),
+            rules = COALESCE(?, rules),
+            webhook_url = COALESCE(?, webhook_url),
+            actions = COALESCE(?, actions),
+            enabled = COALESCE(?, enabled),
+            updated_at = ?
+        WHERE channel_id = ?
+        ''', (
+            guild_id, assistant_id, rules, webhook_url, actions,
+            None if enabled is None else int(enabled), datetime.now(), channel_id
+        ))
+        
+        conn.commit()
+        conn.close()
+        return True
+    
+    def migrate_contents(self, batch_size: int = 500) -> Dict[str, int]:
+        """Հին inline տեքստերը տեղափոխել contents աղյուսակ և հաշվետվություն վերադարձնել"""
+        conn = self._connect()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT COALESCE(SUM(LENGTH(CAST(original_content AS BLOB))), 0)
+             + COALESCE(SUM(LENGTH(CAST(ai_feedback AS BLOB))), 0)
+        FROM message_logs
+        ''')
+        inline_bytes_before = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM contents")
+        stored_bytes_before = cursor.fetchone()[0]
+        
+        migrated_rows = 0
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute('''
+            SELECT id, original_content, ai_feedback
+            FROM message_logs
+            WHERE original_content IS NOT NULL OR ai_feedback IS NOT NULL
+            LIMIT ?
+            ''', (batch_size,))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            
+            for row_id, original_content, ai_feedback in rows:
+                content_id = self._store_content(cursor, original_content)
+                feedback_id = self._store_content(cursor, ai_feedback)
+                cursor.execute('''
+                UPDATE message_logs
+                SET content_id = COALESCE(?, content_id),
+                    feedback_id = COALESCE(?, feedback_id),
+                    original_content = NULL,
+                    ai_feedback = NULL
+                WHERE id = ?
+                ''', (content_id, feedback_id, row_id))
+            
+            conn.commit()
+            migrated_rows += len(rows)
+        
+        cursor.execute("SELECT COALESCE(SUM(LENGTH(data)), 0), COUNT(*) FROM contents")
+        stored_bytes_after, distinct_contents = cursor.fetchone()
+        conn.close()
+        
+        report = {
+            'migrated_rows': migrated_rows,
+            'distinct_contents': distinct_contents,
+            'inline_bytes_before': inline_bytes_before,
+            'stored_bytes_added': stored_bytes_after - stored_bytes_before,
+            'bytes_saved': inline_bytes_before - (stored_bytes_after - stored_bytes_before)
+        }
+        logger.info(f"Content migration finished: {report}")
+        return report
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""Export message_logs to date-partitioned Parquet or gzip JSONL files for analysis.
+
+Reads the database through a read-only connection, so it can run next to
+the bot: under WAL it never blocks the bot's writes. Rows are streamed in
+batches and each run continues after the last exported row id.
+
+Usage:
+    python -m database.export OUT_DIR [--db FILE] [--format auto|parquet|jsonl] [--batch-size 5000] [--full]
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional: without it exports are gzip JSONL
+    pa = pq = None
+
+STATE_FILE = '_export_state.json'
+
+# (column, pyarrow type name) in export order
+COLUMNS = (
+    ('id', 'int64'), ('message_id', 'string'), ('user_id', 'string'), ('username', 'string'),
+    ('channel_id', 'string'), ('server_id', 'string'), ('content', 'string'),
+    ('attachment_urls', 'list'), ('timestamp', 'string'), ('ai_status', 'string'),
+    ('ai_feedback', 'string'), ('action_taken', 'string'), ('processing_time', 'float64'),
+    ('revision_of', 'int64'), ('prompt_tokens', 'int64'), ('completion_tokens', 'int64'),
+    ('cost', 'float64'), ('verdict_source', 'string'),
+)
+
+_QUERY = '''
+SELECT m.id, m.message_id, m.user_id, m.username, m.channel_id, m.server_id,
+       m.original_content, c.data, m.attachment_urls, m.timestamp, m.ai_status,
+       m.ai_feedback, f.data, m.action_taken, m.processing_time, m.revision_of,
+       m.prompt_tokens, m.completion_tokens, m.cost, m.verdict_source
+FROM message_logs m
+LEFT JOIN contents c ON c.id = m.content_id
+LEFT JOIN contents f ON f.id = m.feedback_id
+WHERE m.id > ? AND m.id <= ?
+ORDER BY m.id
+LIMIT ?
+'''
+
+def decode_content(data: Optional[bytes]) -> Optional[str]:
+    """contents.data-ն տեքստի (db_manager-ի նույնը, առանց bot-ի settings-ի)"""
+    if data is None:
+        return None
+    return zlib.decompress(data).decode('utf-8')
+
+def parquet_available() -> bool:
+    return pq is not None
+
+def connect_readonly(path: str) -> sqlite3.Connection:
+    """Միայն կարդալու կապ (schema չի փոխում, bot-ի գրելը չի արգելափակում)"""
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, timeout=30)
+    conn.execute("PRAGMA query_only=ON")
+    return conn
+
+def _row_dict(row: tuple) -> Dict:
+    (row_id, message_id, user_id, username, channel_id, server_id, legacy_content, content_data,
+     attachment_urls, timestamp, ai_status, legacy_feedback, feedback_data, action_taken,
+     processing_time, revision_of, prompt_tokens, completion_tokens, cost, verdict_source) = row
+    try:
+        attachments = json.loads(attachment_urls) if attachment_urls else []
+    except ValueError:
+        attachments = [attachment_urls]
+    return {
+        'id': row_id, 'message_id': message_id, 'user_id': user_id, 'username': username,
+        'channel_id': channel_id, 'server_id': server_id,
+        'content': legacy_content if content_data is None else decode_content(content_data),
+        'attachment_urls': attachments, 'timestamp': str(timestamp), 'ai_status': ai_status,
+        'ai_feedback': legacy_feedback if feedback_data is None else decode_content(feedback_data),
+        'action_taken': action_taken, 'processing_time': processing_time, 'revision_of': revision_of,
+        'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens, 'cost': cost,
+        'verdict_source': verdict_source,
+    }
+
+def iter_rows(conn: sqlite3.Connection, after_id: int, upto_id: int, batch_size: int = 5000) -> Iterator[List[Dict]]:
+    """`(after_id, upto_id]` տողերը batch-երով (հիշողությունը սահմանափակ է batch-ով)
+
+    Every batch is its own short read, so no snapshot is held for the whole
+    export and the bot's WAL checkpoints keep working.
+    """
+    while after_id < upto_id:
+        cursor = conn.execute(_QUERY, (after_id, upto_id, batch_size))
+        rows = cursor.fetchmany(batch_size)
+        cursor.close()
+        if not rows:
+            return
+        after_id = rows[-1][0]
+        yield [_row_dict(row) for row in rows]
+
+class _JsonlPart:
+    def __init__(self, path: str):
+        self.fp = gzip.open(path, 'wt', encoding='utf-8', compresslevel=6)
+
+    def write(self, rows: List[Dict]):
+        for row in rows:
+            self.fp.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')))
+            self.fp.write('\n')
+
+    def close(self):
+        self.fp.close()
+
+class _ParquetPart:
+    def __init__(self, path: str):
+        types = {'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string(), 'list': pa.list_(pa.string())}
+        self.schema = pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, rows: List[Dict]):
+        # One row group per batch
+        self.writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+class PartitionedWriter:
+    """`date=YYYY-MM-DD/part-<first id>.<ext>` files, one open file per date
+
+    Files are written under a `.tmp` name and renamed on close, so an
+    interrupted run leaves no partial parts behind (the next run redoes it).
+    """
+
+    def __init__(self, out_dir: str, fmt: str):
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.extension = '.parquet' if fmt == 'parquet' else '.jsonl.gz'
+        self._parts: Dict[str, tuple] = {}
+        self.files: List[str] = []
+
+    def write(self, rows: List[Dict]):
+        by_date: Dict[str, List[Dict]] = {}
+        for row in rows:
+            by_date.setdefault(row['timestamp'][:10], []).append(row)
+        for date, date_rows in by_date.items():
+            part = self._parts.get(date)
+            if part is None:
+                directory = os.path.join(self.out_dir, f"date={date}")
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f"part-{date_rows[0]['id']:012d}{self.extension}")
+                writer = _ParquetPart(path + '.tmp') if self.fmt == 'parquet' else _JsonlPart(path + '.tmp')
+                part = self._parts[date] = (path, writer)
+            part[1].write(date_rows)
+
+    def close(self, commit: bool = True):
+        for path, writer in self._parts.values():
+            writer.close()
+            if commit:
+                os.replace(path + '.tmp', path)
+                self.files.append(path)
+            else:
+                os.remove(path + '.tmp')
+        self._parts = {}
+
+def load_state(out_dir: str) -> Dict:
+    try:
+        with open(os.path.join(out_dir, STATE_FILE), encoding='utf-8') as fp:
+            return json.load(fp)
+    except FileNotFoundError:
+        return {'last_id': 0}
+
+def save_state(out_dir: str, state: Dict):
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(path + '.tmp', 'w', encoding='utf-8') as fp:
+        json.dump(state, fp, indent=2)
+    os.replace(path + '.tmp', path)
+
+def clear_partitions(out_dir: str) -> int:
+    """Նախորդ export-ների `date=*` partition-ները ջնջել"""
+    directories = [path for path in glob.glob(os.path.join(out_dir, 'date=*')) if os.path.isdir(path)]
+    for path in directories:
+        shutil.rmtree(path)
+    return len(directories)
+
+def export(db_file: str, out_dir: str, fmt: str = 'auto', batch_size: int = 5000,
+           full: bool = False) -> Dict:
+    """Նոր տողերը արտահանել և state-ը թարմացնել; վերադարձնում է հաշվետվություն"""
+    if fmt == 'auto':
+        fmt = 'parquet' if parquet_available() else 'jsonl'
+    if fmt == 'parquet' and not parquet_available():
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    os.makedirs(out_dir, exist_ok=True)
+    if full:
+        # Reset the state first: if the export is interrupted, the next run starts over too
+        save_state(out_dir, {'last_id': 0})
+        clear_partitions(out_dir)
+    state = load_state(out_dir)
+    after_id = state['last_id']
+
+    started = time.perf_counter()
+    conn = connect_readonly(db_file)
+    try:
+        # Rows inserted while the export runs are left for the next run
+        upto_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM message_logs").fetchone()[0]
+        writer = PartitionedWriter(out_dir, fmt)
+        rows = 0
+        try:
+            for batch in iter_rows(conn, after_id, upto_id, batch_size):
+                writer.write(batch)
+                rows += len(batch)
+                after_id = batch[-1]['id']
+        except BaseException:
+            writer.close(commit=False)
+            raise
+        writer.close()
+    finally:
+        conn.close()
+
+    save_state(out_dir, {'last_id': after_id, 'format': fmt, 'exported_at': time.strftime('%Y-%m-%d %H:%M:%S')})
+    return {'format': fmt, 'rows': rows, 'last_id': after_id, 'files': writer.files,
+            'seconds': time.perf_counter() - started}
+
+def main():
+    parser = argparse.ArgumentParser(description="Export message_logs for analysis")
+    parser.add_argument('out_dir', help="output directory (keeps the export state between runs)")
+    # Only DB_FILE is read from the environment, so exports need no bot credentials
+    parser.add_argument('--db', default=os.getenv('DB_FILE', 'moderation_logs.db'),
+                        help="database file (default: DB_FILE or moderation_logs.db)")
+    parser.add_argument('--format', default='auto', choices=('auto', 'parquet', 'jsonl'),
+                        help="auto = Parquet when pyarrow is installed, gzip JSONL otherwise")
+    parser.add_argument('--batch-size', type=int, default=5000, help="rows read (and held in memory) at a time")
+    parser.add_argument('--full', action='store_true',
+                        help="delete the exported partitions and the saved state, then export every row")
+    args = parser.parse_args()
+
+    report = export(args.db, args.out_dir, args.format, args.batch_size, args.full)
+
+    print(f"Format:        {report['format']}")
+    print(f"Exported rows: {report['rows']} ({report['seconds']:.1f}s)")
+    print(f"Last row id:   {report['last_id']}")
+    print(f"Files:         {len(report['files'])}")
+    for path in report['files']:
+        print(f"  {path}")
+
+if __name__ == "__main__":
+    main()
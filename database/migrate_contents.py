@@ -0,0 +1,47 @@
+"""Move inline message/feedback texts into the content-addressed `contents` table.
+
+Usage:
+    python -m database.migrate_contents [--batch-size 500] [--vacuum]
+"""
+import argparse
+import os
+import sqlite3
+from database.db_manager import DatabaseManager
+
+def _file_size(path: str) -> int:
+    """Database ֆայլի չափը (WAL-ի հետ միասին)"""
+    total = 0
+    for suffix in ('', '-wal'):
+        if os.path.exists(path + suffix):
+            total += os.path.getsize(path + suffix)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate message_logs contents")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--vacuum', action='store_true',
+                        help="VACUUM afterwards so freed pages are returned to the filesystem")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    size_before = _file_size(db.db_file)
+
+    report = db.migrate_contents(args.batch_size)
+
+    if args.vacuum:
+        conn = sqlite3.connect(db.db_file)
+        conn.execute("VACUUM")
+        conn.close()
+
+    size_after = _file_size(db.db_file)
+
+    print(f"Migrated rows:        {report['migrated_rows']}")
+    print(f"Distinct contents:    {report['distinct_contents']}")
+    print(f"Inline text bytes:    {report['inline_bytes_before']}")
+    print(f"Stored (compressed):  {report['stored_bytes_added']}")
+    print(f"Text bytes saved:     {report['bytes_saved']}")
+    print(f"DB file size:         {size_before} -> {size_after}"
+          + ("" if args.vacuum else " (run with --vacuum to reclaim free pages)"))
+
+if __name__ == "__main__":
+    main()
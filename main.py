@@ -1,118 +1,432 @@
+import asyncio
+import signal
+import time
+from functools import partial
 import discord
+from typing import Awaitable, Dict
 from discord.ext import commands
 from utils.logger import setup_logger
-from config.settings import DISCORD_TOKEN, CHANNEL_ID, WEBHOOK_URL
+from config.settings import (
+    DISCORD_TOKEN, SHARD_MODE, SHARD_COUNT, SHARD_IDS, SHARD_PROCESSES, VERDICT_CACHE_TTL,
+    WORKER_PROCESSES, EDIT_MODERATION, EDIT_MIN_DISTANCE, DB_FILE, METRICS_PORT,
+    LOW_MEMORY, LOW_MEMORY_MAX_MESSAGES, WARM_STATE_FILE, IMAGE_HASHING
+)
 from database.db_manager import DatabaseManager
 from services.openai_service import OpenAIService
+from services.policy_service import PolicyRegistry, VALID_ACTIONS, CLEAR_VALUE
+from services.verdict_cache import VerdictCache
+from services.moderation_worker import ModerationJob, LocalModeration, WorkerPool
+from services.backlog_catchup import BacklogCatchup
+from services.budget import BudgetGuard, usage_tokens
+from services.local_classifier import LocalClassifier, ClassifierTrainer
+from services.flood_guard import FloodGuard
 from utils.helpers import MessageHelper, WebhookLogger
+from utils.attachment_fetcher import AttachmentFetcher
+from utils.webhook_dispatcher import WebhookDispatcher
+from utils.dm_outbox import DMOutbox
+from utils.shard_stats import ShardStats
+from utils.shard_launcher import parse_shard_ids, run_shard_processes
+from utils.text_diff import is_trivial_edit
+from utils.command_sync import sync_if_changed
+from utils.tracing import span, trace_message
+from utils.watchdog import LoopWatchdog
+from utils.latency_sketch import LatencyRecorder
+from utils.warm_state import WarmState
+from utils.image_hash import hashing_available
+from utils.metrics import registry as metrics_registry, MetricsServer, MESSAGES_SEEN, MESSAGES_MODERATED
 
 # Setup
+process_started = time.monotonic()
+startup_state = {"done": False, "first_moderated": False}
 logger = setup_logger(__name__)
 db = DatabaseManager()
-openai_service = OpenAIService()
-message_helper = MessageHelper()
-webhook_logger = WebhookLogger()
+policy_registry = PolicyRegistry(db)
+verdict_cache = VerdictCache(db)
+budget = BudgetGuard(db)
+openai_service = OpenAIService(db)
+attachment_fetcher = AttachmentFetcher()
+message_helper = MessageHelper(attachment_fetcher)
+dm_outbox = DMOutbox(message_helper)
+webhook_dispatcher = WebhookDispatcher()
+webhook_logger = WebhookLogger(webhook_dispatcher)
+watchdog = LoopWatchdog()
+local_classifier = LocalClassifier()
+classifier_trainer = ClassifierTrainer(db, local_classifier)
+flood_guard = FloodGuard()
+latency = LatencyRecorder(db)
+# Message id -> moderation running detached from its gateway event (LOW_MEMORY)
+moderation_tasks: Dict[int, asyncio.Task] = {}
+
+# Analysis (and its DB writes) can run in separate worker processes
+if WORKER_PROCESSES > 0:
+    moderation = WorkerPool(WORKER_PROCESSES, verdict_cache=verdict_cache)
+else:
+    moderation = LocalModeration(db, openai_service, verdict_cache, budget, classifier=local_classifier)
+
+# SHARD_MODE=auto shards inside this process; process mode runs one auto-sharded bot per shard range
+BotBase = commands.Bot if SHARD_MODE == 'none' else commands.AutoShardedBot
+
+class QualityBot(BotBase):
+    """Bot with startup/shutdown of shared background resources"""
+    
+    _shutdown_task = None
+    
+    async def setup_hook(self):
+        if IMAGE_HASHING and not hashing_available():
+            logger.warning("IMAGE_HASHING is on but Pillow is not installed (pip install -r requirements.txt); "
+                           "image reposts are not detected")
+        warm_state.restore()
+        watchdog.start()
+        await metrics_server.start()
+        moderation.start()
+        webhook_dispatcher.start()
+        policy_registry.start()
+        shard_stats.start()
+        backlog_catchup.start()
+        latency.start()
+        flood_guard.start()
+        warm_state.start()
+        # systemd and the shard launcher stop the bot with SIGTERM; without this close() never runs
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._on_sigterm)
+        except (NotImplementedError, RuntimeError):  # Windows, or not the main thread
+            pass
+    
+    def _on_sigterm(self):
+        if self._shutdown_task is None:
+            logger.info("SIGTERM received, shutting down")
+            self._shutdown_task = asyncio.create_task(self.close())
+    
+    async def close(self):
+        if moderation_tasks:
+            await asyncio.wait(list(moderation_tasks.values()), timeout=30)
+        await classifier_trainer.stop()
+        await backlog_catchup.stop()
+        await shard_stats.stop()
+        await policy_registry.stop()
+        await dm_outbox.stop()
+        await webhook_dispatcher.stop()
+        await moderation.stop()
+        await latency.stop()
+        await flood_guard.stop()
+        await warm_state.stop()
+        await attachment_fetcher.close()
+        await metrics_server.stop()
+        await watchdog.stop()
+        await super().close()
 
 # Bot setup
-intents = discord.Intents.default()
-intents.message_content = True
-bot = commands.Bot(command_prefix='!', intents=intents)
+bot_options = {}
+if LOW_MEMORY:
+    # Only what moderation reads: guilds/channels and guild message events with their content.
+    # No member cache or chunking; the message cache only serves edit re-moderation
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.message_content = True
+    bot_options.update(max_messages=LOW_MEMORY_MAX_MESSAGES or None,
+                       member_cache_flags=discord.MemberCacheFlags.none(),
+                       chunk_guilds_at_startup=False)
+else:
+    intents = discord.Intents.default()
+    intents.message_content = True
+if SHARD_MODE != 'none':
+    bot_options.update(shard_count=SHARD_COUNT, shard_ids=parse_shard_ids(SHARD_IDS))
+bot = QualityBot(command_prefix='!', intents=intents, **bot_options)
+shard_stats = ShardStats(bot)
+
+# Shard processes share a host, so each one serves metrics on its own port
+first_shard = (parse_shard_ids(SHARD_IDS) or [0])[0] if SHARD_MODE != 'none' else 0
+metrics_server = MetricsServer(port=METRICS_PORT + first_shard if METRICS_PORT else 0)
+
+# In-memory state survives restarts through a snapshot file (one per shard process)
+warm_state = WarmState(f"{WARM_STATE_FILE}.{first_shard}" if WARM_STATE_FILE and SHARD_IDS else WARM_STATE_FILE)
+warm_state.register('FLOD', 2, flood_guard.dump_state, flood_guard.restore_state)
+if isinstance(moderation, LocalModeration):
+    # With WORKER_PROCESSES the caches live in the worker processes and start cold
+    warm_state.register('VCAC', 1, verdict_cache.dump_state, verdict_cache.restore_state)
+    image_index = moderation.image_reposts.index
+    warm_state.register('IMGH', 1, image_index.dump_state, image_index.restore_state)
+
+def collect_component_metrics():
+    """Background կոմպոնենտների վիճակագրությունը metrics-ի համար"""
+    yield ('quality_verdict_cache_lookups_total', 'counter', 'Verdict cache lookups by result',
+           [({'result': result}, count) for result, count in verdict_cache.stats.items()])
+    yield ('quality_dm_total', 'counter', 'Feedback DMs by outcome',
+           [({'outcome': 'sent'}, dm_outbox.stats['delivered'])]
+           + [({'outcome': reason}, count) for reason, count in dm_outbox.dropped.items()])
+    yield ('quality_dm_coalesced_total', 'counter', 'Feedback items merged into an already pending DM',
+           [({}, dm_outbox.stats['coalesced'])])
+    yield ('quality_dm_delivery_seconds', 'gauge', 'Feedback DM delivery time (queued to sent), recent DMs',
+           [({'quantile': str(q)}, value) for q, value in dm_outbox.latency_quantiles((0.5, 0.95, 0.99))])
+    yield ('quality_webhook_embeds_total', 'counter', 'Webhook log embeds by outcome',
+           [({'outcome': 'sent'}, webhook_dispatcher.stats['sent_embeds'])]
+           + [({'outcome': reason}, count) for reason, count in webhook_dispatcher.dropped.items()])
+    yield ('quality_queue_depth', 'gauge', 'Pending items per internal queue', [
+        ({'queue': 'webhook'}, webhook_dispatcher.queue_depth),
+        ({'queue': 'dm_users'}, dm_outbox.pending_users),
+        ({'queue': 'workers'}, getattr(moderation, 'queue_depth', 0)),
+    ])
+    yield ('quality_budget_mode', 'gauge', 'Current OpenAI budget mode (1 = active)',
+           [({'mode': mode}, 1 if budget.current_mode() == mode else 0) for mode in ('full', 'sample', 'prefilter')])
+    yield ('quality_openai_spend_usd', 'gauge', 'OpenAI spend in the current budget period',
+           [({'period': 'day'}, budget.spent_today), ({'period': 'month'}, budget.spent_month)])
+    yield ('quality_raids_active', 'gauge', 'Channels currently in raid mode', [({}, len(flood_guard.raids))])
+    shards = shard_stats.snapshot()
+    yield ('quality_shard_latency_seconds', 'gauge', 'Gateway heartbeat latency per shard',
+           [({'shard': shard['shard_id']}, shard['latency_ms'] / 1000) for shard in shards])
+    yield ('quality_shard_messages_total', 'counter', 'Message events per shard',
+           [({'shard': shard['shard_id']}, shard['events']) for shard in shards])
+
+metrics_registry.register_collector(collect_component_metrics)
 
 @bot.event
 async def on_ready():
-    logger.info(f'{bot.user} բոտը պատրաստ է!')
-    logger.info(f'Հետևում է ալիքին: {CHANNEL_ID}')
+    # on_ready also fires after gateway reconnects; startup work runs once
+    if startup_state["done"]:
+        logger.info("Reconnected - startup work already done")
+        return
+    startup_state["done"] = True
+    
+    logger.info(f'{bot.user} բոտը պատրաստ է! ({time.monotonic() - process_started:.2f}s after start)')
+    logger.info(f'Հետևում է ալիքներին: {policy_registry.channel_ids}')
     
     # Cleanup old logs (1 month)
     db.cleanup_old_logs(30)
+    db.cleanup_verdict_cache(VERDICT_CACHE_TTL)
     
-    # Sync slash commands
+    # Moderate messages posted while the bot was offline (in the background)
+    backlog_catchup.schedule()
+    
+    # Slash commands are global: only the process owning shard 0 syncs them (and retrains the local model)
+    shard_ids = getattr(bot, 'shard_ids', None)
+    if shard_ids is not None and 0 not in shard_ids:
+        return
+    
+    classifier_trainer.start()
+    
+    # Sync slash commands only when their definitions changed
     try:
-        synced = await bot.tree.sync()
-        logger.info(f"Synced {len(synced)} slash command(s)")
+        synced = await sync_if_changed(bot.tree, DB_FILE + '.commands.sha256')
+        if synced is not None:
+            logger.info(f"Synced {synced} slash command(s)")
     except Exception as e:
         logger.error(f"Failed to sync commands: {e}")
 
+@bot.event
+async def on_shard_resumed(shard_id):
+    shard_stats.record_reconnect(shard_id)
+
 @bot.event
 async def on_message(message):
     # Skip bot messages
     if message.author.bot:
         return
     
-    # Only work in specified channel
-    if message.channel.id != CHANNEL_ID:
+    shard_stats.record_event(message.guild.shard_id if message.guild else 0)
+    
+    # Only work in channels with an enabled policy (O(1) lookup)
+    policy = policy_registry.get(message.channel.id)
+    if policy is None:
         return
+    MESSAGES_SEEN.inc()
     
     # Process commands first
     await bot.process_commands(message)
+    shard_stats.record_message(message.guild.shard_id if message.guild else 0)
+    
+    work = _moderate_live(moderate_message(message, policy), message.channel.id, message.id)
+    if LOW_MEMORY:
+        # Returning here ends the gateway event's task, which otherwise keeps the whole Message alive
+        task = asyncio.create_task(work)
+        moderation_tasks[message.id] = task
+        task.add_done_callback(lambda _, message_id=message.id: moderation_tasks.pop(message_id, None))
+    else:
+        await work
+
+async def _moderate_live(work: Awaitable[None], channel_id: int, message_id: int):
+    await work
+    backlog_catchup.record(channel_id, message_id)
+    
+    if not startup_state["first_moderated"]:
+        startup_state["first_moderated"] = True
+        logger.info(f"First message moderated {time.monotonic() - process_started:.2f}s after start")
+
+@bot.event
+async def on_raw_message_edit(payload: discord.RawMessageUpdateEvent):
+    # The raw event fires for every edit; on_message_edit only for messages still in the message cache
+    data = payload.data
+    if not EDIT_MODERATION or data.get('author', {}).get('bot') or 'content' not in data:
+        return
     
-    # Collect attachment URLs
-    attachment_urls = [att.url for att in message.attachments]
+    policy = policy_registry.get(payload.channel_id)
+    if policy is None:
+        return
+    
+    # Embed unfurls and pins also fire edits without a content change
+    content = data['content']
+    if payload.cached_message is not None and payload.cached_message.content == content:
+        return
+    
+    # Compare with what was last moderated, not with the cached message
+    previous = db.get_latest_revision(str(payload.message_id))
+    revision_of = None
+    if previous is not None:
+        revision_of, previous_content = previous
+        if is_trivial_edit(previous_content or "", content, EDIT_MIN_DISTANCE):
+            logger.debug(f"Trivial edit of message {payload.message_id} skipped",
+                         extra={"message_id": payload.message_id})
+            return
+    
+    logger.info(f"Message {payload.message_id} edited - re-moderating", extra={"message_id": payload.message_id})
+    await moderate_message(payload.message, policy, revision_of=revision_of)
+
+def moderate_message(message: discord.Message, policy, revision_of: int = None) -> Awaitable[None]:
+    """Նամակը մոդերացնել և policy-ի գործողությունները կատարել
+
+    `revision_of` links the log row of a re-moderated edit to the message's first log row.
+    Only the compact job, the author and a partial message (for deletion) are kept while
+    the moderation runs, not the Message itself.
+    """
+    return _moderate(ModerationJob.from_message(message, policy), message.author,
+                     message.channel.get_partial_message(message.id), policy, revision_of)
+
+async def _moderate(job: ModerationJob, author, target, policy, revision_of: int = None):
+    started = time.perf_counter()
+    with trace_message(job.message_id) as trace:
+        await _moderate_job(job, author, target, policy, revision_of)
+    latency.record("handling", time.perf_counter() - started)
+    
+    if trace is not None:
+        try:
+            moderation.save_message_spans(str(job.message_id), trace.breakdown())
+        except Exception as e:
+            logger.error(f"Failed to save trace of message {job.message_id}: {e}")
+
+def _log_undelivered_dm(message_id: int, future: asyncio.Future):
+    if not future.cancelled() and not future.result():
+        logger.warning(f"Feedback DM for message {message_id} was not delivered",
+                       extra={"message_id": message_id})
+
+async def _moderate_job(job: ModerationJob, author, target, policy, revision_of: int = None):
+    attachment_urls = job.attachment_urls
     
-    logger.info(f"New message from {message.author.name} (ID: {message.author.id}): {message.content[:100]}...")
+    log_extra = {"message_id": job.message_id, "channel_id": job.channel_id, "user_id": job.user_id}
+    logger.info(f"New message from {job.username} (ID: {job.user_id}): {job.content[:100]}...",
+                extra=log_extra)
     
-    # Send to OpenAI
-    result, processing_time = await openai_service.analyze_message(message.content)
+    # Flood/raid guard, then cache lookup + OpenAI in this process or a worker process
+    result, processing_time = await flood_guard.analyze(job, moderation.analyze, is_edit=revision_of is not None)
+    
+    MESSAGES_MODERATED.inc(status=result.get("status") if result else "error")
+    if result is not None and result.get("source") == "openai":
+        latency.record("openai", processing_time)
     
     if result is None:
-        logger.error("OpenAI API error - logging as failed processing")
-        db.log_message_event(
-            str(message.id), str(message.author.id), message.author.name,
-            str(message.channel.id), str(message.guild.id),
-            message.content, attachment_urls,
-            ai_status="error", action_taken="none", processing_time=processing_time
+        logger.error("OpenAI API error - logging as failed processing",
+                     extra={**log_extra, "processing_time": processing_time})
+        moderation.log_message_event(
+            str(job.message_id), str(job.user_id), job.username,
+            str(job.channel_id), str(job.guild_id),
+            job.content, attachment_urls,
+            ai_status="error", action_taken="none", processing_time=processing_time,
+            revision_of=revision_of
         )
         return
     
     status = result.get("status")
     feedback = result.get("feedback", "")
     
-    logger.info(f"OpenAI result for message {message.id}: {status}")
+    if status == "skipped":
+        logger.info(f"Message {job.message_id} not analysed (budget mode {budget.mode})", extra=log_extra)
+        moderation.log_message_event(
+            str(job.message_id), str(job.user_id), job.username,
+            str(job.channel_id), str(job.guild_id),
+            job.content, attachment_urls,
+            ai_status="skipped", action_taken="none", processing_time=0.0,
+            revision_of=revision_of
+        )
+        return
+    
+    # Token usage and cost of this verdict (absent for cache hits)
+    usage = {}
+    if result.get("usage"):
+        prompt_tokens, completion_tokens = usage_tokens(result["usage"])
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "cost": result.get("cost")}
+    
+    logger.info(f"OpenAI result for message {job.message_id}: {status}",
+                extra={**log_extra, "status": status, "processing_time": processing_time})
     
-    # Handle non-approved messages
     # Handle non-approved messages
     if status != "approve":
-        logger.warning(f"Message {message.id} rejected/needs_edit: {status}")
+        logger.warning(f"Message {job.message_id} rejected/needs_edit: {status}", extra=log_extra)
+        actions = []
         
-        # Send DM
-        dm_sent = await message_helper.send_dm_with_feedback(
-            message.author, feedback, message.content, message.attachments
-        )
+        # Delete message
+        if "delete" in policy.actions:
+            message_deleted = False
+            try:
+                async with span("delete"):
+                    await target.delete()
+                message_deleted = True
+                logger.info(f"Message {job.message_id} deleted successfully", extra=log_extra)
+            except discord.NotFound:
+                logger.warning(f"Message {job.message_id} was already deleted", extra=log_extra)
+            except discord.Forbidden:
+                logger.error(f"No permission to delete message {job.message_id}", extra=log_extra)
+            except Exception as e:
+                logger.error(f"Error deleting message {job.message_id}: {e}", extra=log_extra)
+            actions.append(f"DELETE:{'success' if message_deleted else 'failed'}")
+        
+        # Queue the DM (coalesced with the user's other pending feedback); its
+        # coalesce window and rate limit must not hold back the delete or the log
+        if "dm" in policy.actions:
+            dm_future = dm_outbox.enqueue(author, feedback, job.content, job.attachments)
+            if dm_future is not None:
+                dm_future.add_done_callback(partial(_log_undelivered_dm, job.message_id))
+            actions.append(f"DM:{'queued' if dm_future is not None else 'failed'}")
         
         # Log actions
-        action_taken = f"DM:{'sent' if dm_sent else 'failed'}"
+        action_taken = ", ".join(actions) or "none"
         
         # Send webhook log
-        await webhook_logger.send_log(
-            WEBHOOK_URL, str(message.id), str(message.channel.id),
-            message.author.name, status, feedback, message.content
-        )
+        if "webhook" in policy.actions:
+            await webhook_logger.send_log(
+                policy.webhook_url, str(job.message_id), str(job.channel_id),
+                job.username, status, feedback, job.content
+            )
         
-        db.log_message_event(
-            str(message.id), str(message.author.id), message.author.name,
-            str(message.channel.id), str(message.guild.id),
-            message.content, attachment_urls,
+        moderation.log_message_event(
+            str(job.message_id), str(job.user_id), job.username,
+            str(job.channel_id), str(job.guild_id),
+            job.content, attachment_urls,
             ai_status=status, ai_feedback=feedback,
-            action_taken=action_taken, processing_time=processing_time
+            action_taken=action_taken, processing_time=processing_time,
+            revision_of=revision_of, verdict_source=result.get("source"), **usage
         )
 
     else:
-        logger.info(f"Message {message.id} approved")
+        logger.info(f"Message {job.message_id} approved", extra=log_extra)
         
         # Send webhook log
-        await webhook_logger.send_log(
-            WEBHOOK_URL, str(message.id), str(message.channel.id),
-            message.author.name, status
-        )
+        if "webhook" in policy.actions:
+            await webhook_logger.send_log(
+                policy.webhook_url, str(job.message_id), str(job.channel_id),
+                job.username, status
+            )
         
-        db.log_message_event(
-            str(message.id), str(message.author.id), message.author.name,
-            str(message.channel.id), str(message.guild.id),
-            message.content, attachment_urls,
+        moderation.log_message_event(
+            str(job.message_id), str(job.user_id), job.username,
+            str(job.channel_id), str(job.guild_id),
+            job.content, attachment_urls,
             ai_status=status, ai_feedback=feedback,
-            action_taken="approved", processing_time=processing_time
+            action_taken="approved", processing_time=processing_time,
+            revision_of=revision_of, verdict_source=result.get("source"), **usage
         )
 
+backlog_catchup = BacklogCatchup(bot, db, policy_registry, moderate_message)
+
 # Admin commands - slash commands only for admins
 @bot.tree.command(name="stats", description="Օգտատիրոջ մոդերացիայի վիճակագրությունը")
 @discord.app_commands.describe(
@@ -167,7 +481,7 @@ async def recent_logs(interaction: discord.Interaction, limit: int = 10):
     embed = discord.Embed(title="📋 Վերջին գործողություններ", color=0x0099ff)
     
     for username, status, timestamp, content in logs:
-        status_emoji = {"approve": "✅", "reject": "❌", "needs_edit": "⚠️", "error": "🔴"}.get(status, "❓")
+        status_emoji = {"approve": "✅", "reject": "❌", "needs_edit": "⚠️", "error": "🔴", "skipped": "⏭️"}.get(status, "❓")
         embed.add_field(
             name=f"{status_emoji} {username}",
             value=f"{timestamp}\n{content}",
@@ -176,6 +490,179 @@ async def recent_logs(interaction: discord.Interaction, limit: int = 10):
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
+@bot.tree.command(name="policy", description="Ալիքի մոդերացիայի կարգավորումները")
+@discord.app_commands.describe(
+    channel="Ալիքը (ենթադրությամբ ընթացիկը)",
+    assistant_id="OpenAI Assistant ID",
+    rules="Ալիքի կանոնները (Assistant-ի instructions), '-'՝ մաքրել",
+    webhook_url="Log-երի webhook URL, '-'՝ անջատել",
+    actions="Գործողություններ ստորակետով՝ dm,webhook,delete, '-'՝ ոչ մեկը",
+    enabled="Մոդերացիան միացված է"
+)
+async def channel_policy(interaction: discord.Interaction, channel: discord.TextChannel = None,
+                         assistant_id: str = None, rules: str = None, webhook_url: str = None,
+                         actions: str = None, enabled: bool = None):
+    """Ալիքի policy-ն ցույց տալ կամ փոխել - միայն ադմիններին"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Միայն ադմինները կարող են օգտագործել այս հրամանը:", ephemeral=True)
+        return
+    
+    if channel is None:
+        channel = interaction.channel
+    
+    # '-' stores an empty value, which unlike an omitted option clears the field
+    rules, webhook_url, actions = ('' if value == CLEAR_VALUE else value
+                                   for value in (rules, webhook_url, actions))
+    
+    if actions is not None:
+        requested = {a.strip() for a in actions.split(',') if a.strip()}
+        if not requested <= VALID_ACTIONS:
+            await interaction.response.send_message(
+                f"❌ Անհայտ գործողություն: {', '.join(sorted(requested - VALID_ACTIONS))}", ephemeral=True
+            )
+            return
+        actions = ','.join(sorted(requested))
+    
+    fields = dict(assistant_id=assistant_id, rules=rules, webhook_url=webhook_url,
+                  actions=actions, enabled=enabled)
+    if any(value is not None for value in fields.values()):
+        policy = policy_registry.update(channel.id, guild_id=str(interaction.guild_id), **fields)
+    else:
+        policy = policy_registry.get(channel.id, include_disabled=True)
+    
+    if policy is None:
+        await interaction.response.send_message(f"📋 #{channel.name} ալիքը չի մոդերացվում", ephemeral=True)
+        return
+    
+    embed = discord.Embed(title=f"⚙️ #{channel.name} policy", color=0x0099ff)
+    embed.add_field(name="Միացված", value="✅" if policy.enabled else "❌", inline=True)
+    embed.add_field(name="Գործողություններ", value=", ".join(sorted(policy.actions)) or "-", inline=True)
+    embed.add_field(name="Assistant", value=f"`{policy.assistant_id}`", inline=False)
+    embed.add_field(name="Webhook", value="✅" if policy.webhook_url else "-", inline=True)
+    embed.add_field(name="Կանոններ", value=(policy.rules or "-")[:1024], inline=False)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="shards", description="Shard-երի latency-ն և event-ների հաճախականությունը")
+async def shard_status(interaction: discord.Interaction):
+    """Այս պրոցեսի shard-երի ցուցանիշները - միայն ադմիններին"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Միայն ադմինները կարող են օգտագործել այս հրամանը:", ephemeral=True)
+        return
+    
+    embed = discord.Embed(title="🧩 Shard-եր", color=0x0099ff)
+    
+    for shard in shard_stats.snapshot()[:25]:
+        embed.add_field(
+            name=f"Shard {shard['shard_id']}",
+            value=(f"{shard['latency_ms']} ms\n{shard['events_per_sec']} msg/s\n"
+                   f"{shard['messages']} moderated\n{shard['reconnects']} reconnects"),
+            inline=True
+        )
+    
+    embed.set_footer(text=f"Verdict cache hit rate: {verdict_cache.hit_rate * 100:.1f}%")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="trace", description="Նամակի մոդերացիայի փուլերի ժամանակները")
+@discord.app_commands.describe(message_id="Նամակի ID")
+async def message_trace(interaction: discord.Interaction, message_id: str):
+    """Նամակի trace-ը ցույց տալ - միայն ադմիններին"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Միայն ադմինները կարող են օգտագործել այս հրամանը:", ephemeral=True)
+        return
+    
+    spans = db.get_message_spans(message_id.strip())
+    if not spans:
+        await interaction.response.send_message("📋 Այս նամակի trace չկա (TRACING_ENABLED)", ephemeral=True)
+        return
+    
+    lines = [f"`{offset:8.1f} ms` **{stage}** {duration:.1f} ms" for stage, offset, duration in spans]
+    embed = discord.Embed(title=f"⏱️ Trace {message_id}", description="\n".join(lines)[:4000], color=0x0099ff)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+LATENCY_NAMES = {"openai": "OpenAI", "handling": "Ամբողջ մշակում"}
+
+@bot.tree.command(name="latency", description="Մոդերացիայի latency-ի p50/p95/p99")
+@discord.app_commands.describe(hours="Ժամերի քանակը (ենթադրությամբ 24)")
+async def latency_report(interaction: discord.Interaction, hours: int = 24):
+    """Latency-ի քվանտիլները sketch-երից - միայն ադմիններին"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Միայն ադմինները կարող են օգտագործել այս հրամանը:", ephemeral=True)
+        return
+    
+    sketches = latency.summary(max(1, hours), LATENCY_NAMES)
+    embed = discord.Embed(title="⏱️ Latency", description=f"Վերջին {hours} ժամվա ընթացքում", color=0x0099ff)
+    for name, title in LATENCY_NAMES.items():
+        sketch = sketches[name]
+        if not sketch.count:
+            value = "-"
+        else:
+            p50, p95, p99 = (sketch.quantile(q) for q in (0.5, 0.95, 0.99))
+            value = f"p50 {p50:.2f}s · p95 {p95:.2f}s · p99 {p99:.2f}s\nmax {sketch.max:.2f}s · {sketch.count} նամակ"
+        embed.add_field(name=title, value=value, inline=False)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="usage", description="OpenAI token-ների և ծախսի հաշվետվություն")
+@discord.app_commands.describe(days="Օրերի քանակը (ենթադրությամբ 1)")
+async def usage_report(interaction: discord.Interaction, days: int = 1):
+    """Ծախսն ըստ ալիքների և օգտատերերի - միայն ադմիններին"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Միայն ադմինները կարող են օգտագործել այս հրամանը:", ephemeral=True)
+        return
+    
+    report = db.get_usage_report(days)
+    mode = budget.current_mode()
+    
+    embed = discord.Embed(title="💰 OpenAI ծախս", description=f"Վերջին {days} օրվա ընթացքում", color=0x0099ff)
+    embed.add_field(name="Այսօր", value=f"${budget.spent_today:.2f}" + (f" / ${budget.daily:.2f}" if budget.daily else ""), inline=True)
+    embed.add_field(name="Այս ամիս", value=f"${budget.spent_month:.2f}" + (f" / ${budget.monthly:.2f}" if budget.monthly else ""), inline=True)
+    embed.add_field(name="Ռեժիմ", value=mode, inline=True)
+    
+    channels = [
+        f"<#{channel_id}>: ${cost:.3f} ({calls}/{messages} OpenAI, {prompt + completion} tokens)"
+        for channel_id, messages, calls, prompt, completion, cost in report['channels']
+    ]
+    embed.add_field(name="Ալիքներ", value="\n".join(channels)[:1024] or "-", inline=False)
+    sources = [f"{source or '-'}: ${cost:.3f} ({calls} OpenAI, {tokens} tokens)"
+               for source, calls, tokens, cost in report['sources']]
+    embed.add_field(name="Աղբյուրներ", value="\n".join(sources)[:1024] or "-", inline=False)
+    users = [f"{username}: ${cost:.3f} ({count} msg, {tokens} tokens)" for username, count, tokens, cost in report['users']]
+    embed.add_field(name="Օգտատերեր", value="\n".join(users)[:1024] or "-", inline=False)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="shadow", description="Shadow backend-ի համեմատությունը primary-ի հետ")
+@discord.app_commands.describe(days="Օրերի քանակը (ենթադրությամբ 7)")
+async def shadow_report(interaction: discord.Interaction, days: int = 7):
+    """Shadow evaluation-ի ամփոփումը - միայն ադմիններին"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ Միայն ադմինները կարող են օգտագործել այս հրամանը:", ephemeral=True)
+        return
+    
+    report = db.get_shadow_report(days)
+    if not report['total']:
+        await interaction.response.send_message("📋 Shadow համեմատություններ չկան (SHADOW_SAMPLE_RATE)", ephemeral=True)
+        return
+    
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "-"
+    
+    embed = discord.Embed(title="🔬 Shadow evaluation", description=f"Վերջին {days} օրվա ընթացքում",
+                          color=0x0099ff)
+    embed.add_field(name="Նամակներ", value=report['total'], inline=True)
+    embed.add_field(name="Համաձայնություն", value=f"{report['agreement'] * 100:.1f}%", inline=True)
+    embed.add_field(name="Latency p50 / p95",
+                    value=(f"primary {seconds(report['primary_p50'])} / {seconds(report['primary_p95'])}\n"
+                           f"shadow {seconds(report['shadow_p50'])} / {seconds(report['shadow_p95'])}\n"
+                           f"Δ {seconds(report['delta_p50'])} / {seconds(report['delta_p95'])}"),
+                    inline=False)
+    pairs = sorted(report['pairs'].items(), key=lambda item: -item[1])[:10]
+    embed.add_field(name="primary → shadow",
+                    value="\n".join(f"{p} → {s}: {count}" for (p, s), count in pairs), inline=False)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 # Error handling for slash commands
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
@@ -199,6 +686,9 @@ async def on_command_error(ctx, error):
 
 if __name__ == "__main__":
     try:
-        bot.run(DISCORD_TOKEN)
+        if SHARD_MODE == 'process':
+            run_shard_processes(DISCORD_TOKEN, SHARD_PROCESSES, SHARD_COUNT)
+        else:
+            bot.run(DISCORD_TOKEN)
     except Exception as e:
         logger.error(f"Bot startup error: {e}")
\ No newline at end of file
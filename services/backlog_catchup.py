@@ -0,0 +1,191 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+import discord
+from utils.logger import setup_logger
+from database.db_manager import DatabaseManager
+from services.policy_service import PolicyRegistry
+from config.settings import (
+    CATCHUP_ENABLED, CATCHUP_CONCURRENCY, CATCHUP_RATE, CATCHUP_MAX_MESSAGES, HWM_FLUSH_INTERVAL
+)
+
+logger = setup_logger(__name__)
+
+class BacklogCatchup:
+    """Tracks per-channel high-water marks and moderates messages missed while offline"""
+
+    def __init__(self, bot: discord.Client, db: DatabaseManager, policy_registry: PolicyRegistry,
+                 moderate: Callable[[discord.Message, object], Awaitable[None]],
+                 concurrency: int = CATCHUP_CONCURRENCY, rate: float = CATCHUP_RATE,
+                 max_messages: int = CATCHUP_MAX_MESSAGES, flush_interval: float = HWM_FLUSH_INTERVAL):
+        self.bot = bot
+        self.db = db
+        self.policy_registry = policy_registry
+        self.moderate = moderate
+        self.concurrency = concurrency
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.max_messages = max_messages
+        self.flush_interval = flush_interval
+
+        self._marks: Dict[int, int] = db.get_high_water_marks()
+        self._dirty: Dict[int, int] = {}
+        # Live marks of channels whose backlog is not done yet, applied when it is;
+        # a channel whose backlog failed stays held until the next start retries it
+        self._held: Dict[int, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._catchup_task: Optional[asyncio.Task] = None
+
+    def record(self, channel_id: int, message_id: int):
+        """Մոդերացված նամակի ID-ով high-water mark-ը թարմացնել (միայն հիշողությունում)"""
+        if channel_id in self._held:
+            # Moving the mark past an unfinished backlog would lose it on the next restart
+            self._held[channel_id] = max(self._held[channel_id], message_id)
+            return
+        self._advance(channel_id, message_id)
+
+    def _advance(self, channel_id: int, message_id: int):
+        if message_id > self._marks.get(channel_id, 0):
+            self._marks[channel_id] = message_id
+            self._dirty[channel_id] = message_id
+
+    def flush(self):
+        """Փոփոխված mark-երը DB-ում պահել"""
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        self.db.save_high_water_marks(dirty)
+
+    def start(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        for task in (self._catchup_task, self._flush_task):
+            if task is not None:
+                task.cancel()
+        self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"High-water mark flush failed: {e}")
+
+    def schedule(self):
+        """Catch-up-ը background-ում գործարկել (մեկ անգամ պրոցեսի կյանքում)"""
+        if not CATCHUP_ENABLED or self._catchup_task is not None:
+            return
+        self._held = {channel_id: 0 for channel_id in self.policy_registry.channel_ids if channel_id in self._marks}
+        self._catchup_task = asyncio.create_task(self.catch_up())
+
+    async def catch_up(self):
+        """Բոլոր ալիքներում բաց թողնված նամակները մոդերացնել"""
+        # Anything newer than this arrives through on_message
+        upper = discord.Object(id=discord.utils.time_snowflake(datetime.now(timezone.utc)))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.monotonic()
+        total = 0
+
+        for channel_id in self.policy_registry.channel_ids:
+            channel = self.bot.get_channel(channel_id)
+            if channel is None:
+                # Not visible to this process (other shard range or no access)
+                self._release(channel_id)
+                continue
+
+            after_id = self._marks.get(channel_id)
+            if after_id is None:
+                # First run for this channel: start tracking from now
+                self.record(channel_id, upper.id)
+                continue
+
+            try:
+                count, complete = await self._catch_up_channel(channel, after_id, upper, semaphore)
+                total += count
+            except discord.Forbidden:
+                logger.warning(f"No permission to read history of channel {channel_id}")
+                complete = True  # nothing a restart could retry
+            except Exception as e:
+                logger.error(f"Catch-up failed for channel {channel_id}: {e}")
+                complete = False
+            if complete:
+                self._release(channel_id)
+
+        self.flush()
+        logger.info(f"Backlog catch-up finished: {total} message(s) in {time.monotonic() - started:.1f}s")
+
+    def _release(self, channel_id: int):
+        """Ալիքի backlog-ը ավարտված է. catch-up-ի ընթացքում պահված live mark-ը կիրառել"""
+        held = self._held.pop(channel_id, 0)
+        if held:
+            self._advance(channel_id, held)
+
+    async def _catch_up_channel(self, channel, after_id: int, upper: discord.Object,
+                                semaphore: asyncio.Semaphore) -> Tuple[int, bool]:
+        """Մեկ ալիքի պատմությունը էջ առ էջ անցնել; վերադարձնում է (քանակ, արդյոք ամբողջը հաջողվեց)"""
+        policy = self.policy_registry.get(channel.id)
+        tasks = set()
+        count = 0
+        seen = 0
+        # Messages in history order; the mark only moves over a finished prefix,
+        # so a failed or unfinished message is read again after a restart
+        pending: deque = deque()
+        finished: Set[int] = set()
+
+        def settle():
+            while pending and pending[0] in finished:
+                message_id = pending.popleft()
+                finished.discard(message_id)
+                self._advance(channel.id, message_id)
+
+        async def run(message: discord.Message):
+            try:
+                await self.moderate(message, policy)
+                finished.add(message.id)
+                settle()
+            except Exception as e:
+                logger.error(f"Catch-up moderation failed for message {message.id}: {e}")
+            finally:
+                semaphore.release()
+
+        # One message past the limit tells a truncated history apart from one that fits
+        async for message in channel.history(limit=self.max_messages + 1, after=discord.Object(id=after_id),
+                                             before=upper, oldest_first=True):
+            seen += 1
+            if seen > self.max_messages:
+                logger.warning(
+                    f"Catch-up #{channel.id}: more than CATCHUP_MAX_MESSAGES={self.max_messages} missed messages; "
+                    f"messages {message.id}..{upper.id} ({message.created_at:%Y-%m-%d %H:%M:%S} to "
+                    f"{discord.utils.snowflake_time(upper.id):%Y-%m-%d %H:%M:%S} UTC) are left unmoderated")
+                break
+
+            pending.append(message.id)
+            if message.author.bot or self.db.is_message_logged(str(message.id)):
+                finished.add(message.id)
+                settle()
+                continue
+
+            # Bounded concurrency plus a fixed dispatch rate keep the gateway and the API calm
+            await semaphore.acquire()
+            task = asyncio.create_task(run(message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            count += 1
+
+            if count % 50 == 0:
+                logger.info(f"Catch-up #{channel.id}: {count} message(s) dispatched")
+            if self.interval:
+                await asyncio.sleep(self.interval)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if count:
+            logger.info(f"Catch-up #{channel.id}: {count} missed message(s) moderated")
+        if pending:
+            logger.warning(f"Catch-up #{channel.id}: high-water mark kept before message {pending[0]}, "
+                           f"which failed; it is retried on the next start")
+        return count, not pending
@@ -0,0 +1,114 @@
+import random
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from utils.logger import setup_logger
+from utils.metrics import OPENAI_TOKENS, OPENAI_COST
+from database.db_manager import DatabaseManager
+from config.settings import (
+    OPENAI_PROMPT_PRICE, OPENAI_COMPLETION_PRICE, DAILY_BUDGET, MONTHLY_BUDGET,
+    BUDGET_SOFT_LIMIT, BUDGET_SAMPLE_RATE, BUDGET_REFRESH_INTERVAL
+)
+
+logger = setup_logger(__name__)
+
+# Budget modes, cheapest last
+MODE_FULL = 'full'
+MODE_SAMPLE = 'sample'
+MODE_PREFILTER = 'prefilter'
+
+def estimate_cost(prompt_tokens: int, completion_tokens: int) -> float:
+    """Token-ների արժեքը USD-ով (OPENAI_*_PRICE գները 1M token-ի համար)"""
+    return (prompt_tokens * OPENAI_PROMPT_PRICE + completion_tokens * OPENAI_COMPLETION_PRICE) / 1_000_000
+
+def usage_tokens(usage: Optional[Dict]) -> tuple:
+    """Run-ի `usage`-ից (prompt, completion) token-ներ"""
+    if not usage:
+        return 0, 0
+    return int(usage.get('prompt_tokens') or 0), int(usage.get('completion_tokens') or 0)
+
+class BudgetGuard:
+    """Daily/monthly OpenAI spend limits with cheaper modes near the limit
+
+    Spend comes from the hourly usage rollups (shared by all processes) and
+    is refreshed every `refresh_interval` seconds; this process's own calls
+    are added in between. Below `soft_limit` of a budget every cache miss
+    goes to OpenAI; above it only `sample_rate` of them do; at the budget
+    only the pre-filter (verdict cache) runs.
+    """
+
+    def __init__(self, db: DatabaseManager, daily: float = DAILY_BUDGET, monthly: float = MONTHLY_BUDGET,
+                 soft_limit: float = BUDGET_SOFT_LIMIT, sample_rate: float = BUDGET_SAMPLE_RATE,
+                 refresh_interval: float = BUDGET_REFRESH_INTERVAL):
+        self.db = db
+        self.daily = daily
+        self.monthly = monthly
+        self.soft_limit = soft_limit
+        self.sample_rate = sample_rate
+        self.refresh_interval = refresh_interval
+
+        self.spent_today = 0.0
+        self.spent_month = 0.0
+        self.mode = MODE_FULL
+        self._refreshed_at = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.daily > 0 or self.monthly > 0
+
+    def _refresh(self):
+        now = datetime.now()
+        try:
+            self.spent_today = self.db.get_usage_cost(now.replace(hour=0, minute=0, second=0, microsecond=0))
+            self.spent_month = self.db.get_usage_cost(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0))
+        except Exception as e:
+            logger.error(f"Budget refresh failed: {e}")
+        self._refreshed_at = time.monotonic()
+        self._update_mode()
+
+    def _update_mode(self):
+        usage = max(
+            self.spent_today / self.daily if self.daily > 0 else 0.0,
+            self.spent_month / self.monthly if self.monthly > 0 else 0.0,
+        )
+        if usage >= 1.0:
+            mode = MODE_PREFILTER
+        elif usage >= self.soft_limit:
+            mode = MODE_SAMPLE
+        else:
+            mode = MODE_FULL
+
+        if mode != self.mode:
+            logger.warning(f"Budget mode {self.mode} -> {mode} "
+                           f"(today ${self.spent_today:.4f}/{self.daily}, month ${self.spent_month:.4f}/{self.monthly})")
+            self.mode = mode
+
+    def current_mode(self) -> str:
+        """Ընթացիկ ռեժիմը (ծախսը թարմացվում է `refresh_interval`-ը մեկ)"""
+        if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self._refresh()
+        return self.mode
+
+    def allow(self) -> bool:
+        """Այս cache miss-ը կարո՞ղ է գնալ OpenAI"""
+        if not self.enabled:
+            return True
+        mode = self.current_mode()
+        if mode == MODE_FULL:
+            return True
+        if mode == MODE_SAMPLE:
+            return random.random() < self.sample_rate
+        return False
+
+    def record(self, usage: Optional[Dict]) -> float:
+        """OpenAI կանչի token-ները հաշվել; վերադարձնում է արժեքը"""
+        prompt_tokens, completion_tokens = usage_tokens(usage)
+        cost = estimate_cost(prompt_tokens, completion_tokens)
+        OPENAI_TOKENS.inc(prompt_tokens, kind='prompt')
+        OPENAI_TOKENS.inc(completion_tokens, kind='completion')
+        OPENAI_COST.inc(cost)
+        self.spent_today += cost
+        self.spent_month += cost
+        if self.enabled:
+            self._update_mode()
+        return cost
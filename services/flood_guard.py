@@ -0,0 +1,315 @@
+import asyncio
+import re
+import struct
+import time
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+from utils.logger import setup_logger
+from utils.metrics import FLOOD_DECISIONS, RAIDS
+from utils.text_compaction import compact_text
+from config.settings import (
+    FLOOD_WINDOW, FLOOD_USER_MESSAGES, FLOOD_MAX_TRACKED, RAID_AUTHORS, RAID_COOLDOWN, RAID_ACTION
+)
+
+logger = setup_logger(__name__)
+
+DISCORD_EPOCH_MS = 1420070400000
+# Distinct burst texts remembered per raid; later new texts are analysed on their own
+MAX_BURST_SIGNATURES = 1000
+FLOOD_FEEDBACK = "Դուք չափազանց արագ եք նամակներ ուղարկում: Խնդրում ենք դանդաղեցնել:"
+RAID_FEEDBACK = "Ալիքը ժամանակավորապես սահմանափակված է նամակների զանգվածային հարձակման (raid) պատճառով:"
+
+# Warm state: window seconds, user windows, channel windows, channel authors, raids
+_STATE_HEADER = struct.Struct('<HIIII')
+# key, newest second (+ per-second counts)
+_WINDOW_RECORD = struct.Struct('<QI')
+# channel id, user id, last second the user posted there
+_AUTHOR_RECORD = struct.Struct('<QQI')
+# channel id, started at, raid mode until (epoch seconds), messages
+_RAID_RECORD = struct.Struct('<QddI')
+
+# Parts raiders vary between otherwise identical messages
+_BURST_NOISE = re.compile(r'<[@#][!&]?\d+>|\d+|[?#]\S*')
+
+Analyze = Callable[[object], Awaitable[Tuple[Optional[Dict], float]]]
+
+def snowflake_seconds(snowflake: int) -> float:
+    return ((snowflake >> 22) + DISCORD_EPOCH_MS) / 1000
+
+def burst_signature(content: str, attachments: Sequence[Tuple[str, str, int]] = ()) -> str:
+    """Raid-ի նամակների ընդհանուր բանալին (թվերն ու mention-ները հանված, attachment-ները ներառված)"""
+    signature = _BURST_NOISE.sub('', compact_text(content).lower())
+    # By name and size, so image-only messages group by image instead of all sharing the empty text
+    if attachments:
+        signature += '\0' + '\0'.join(sorted(f"{filename.lower()}:{size}" for _, filename, size in attachments))
+    return signature
+
+class RateWindow:
+    """Event count over the last `len(counts)` seconds, in a ring of per-second slots
+
+    Adding and counting touch at most one slot per elapsed second (bounded
+    by the window length), so both are O(1).
+    """
+
+    __slots__ = ('counts', 'total', 'head')
+
+    def __init__(self, seconds: int):
+        self.counts = array('H', bytes(2 * seconds))
+        self.total = 0
+        self.head = 0
+
+    def _advance(self, second: int):
+        gap = second - self.head
+        if gap <= 0:
+            return
+        size = len(self.counts)
+        if gap >= size:
+            for i in range(size):
+                self.counts[i] = 0
+            self.total = 0
+        else:
+            for s in range(self.head + 1, second + 1):
+                i = s % size
+                self.total -= self.counts[i]
+                self.counts[i] = 0
+        self.head = second
+
+    def add(self, second: int) -> int:
+        """Event գրանցել; վերադարձնում է պատուհանի նոր քանակը"""
+        self._advance(second)
+        # Late events (clock skew, reordering) count in the newest slot
+        i = self.head % len(self.counts)
+        if self.counts[i] < 0xFFFF:
+            self.counts[i] += 1
+            self.total += 1
+        return self.total
+
+    def count(self, second: int) -> int:
+        self._advance(second)
+        return self.total
+
+class _Raid:
+    """Raid mode state of one channel"""
+
+    __slots__ = ('started_at', 'until', 'messages', 'verdicts')
+
+    def __init__(self, now: float, until: float):
+        self.started_at = now
+        self.until = until
+        self.messages = 0
+        # burst signature -> future of the representative analysis
+        self.verdicts: Dict[str, asyncio.Future] = {}
+
+class FloodGuard:
+    """Per-user flood and per-channel raid detection in front of moderation
+
+    Windows are keyed by message creation time (from the snowflake), so
+    messages older than the window (backlog catch-up) are not counted.
+    A user over `user_messages` per window is rejected locally. A channel
+    where `raid_authors` users started posting within one window enters
+    raid mode until `cooldown` seconds pass below that rate: messages are
+    rejected locally (RAID_ACTION=reject) or grouped by burst signature so
+    each distinct text is analysed once (RAID_ACTION=representative).
+    """
+
+    # How often raid deadlines are checked, so raid mode also ends in a channel that went quiet
+    EXPIRE_INTERVAL = 1.0
+
+    def __init__(self, window: int = FLOOD_WINDOW, user_messages: int = FLOOD_USER_MESSAGES,
+                 raid_authors: int = RAID_AUTHORS, cooldown: float = RAID_COOLDOWN,
+                 action: str = RAID_ACTION, max_tracked: int = FLOOD_MAX_TRACKED):
+        self.window = window
+        self.user_messages = user_messages
+        self.raid_authors = raid_authors
+        self.cooldown = cooldown
+        self.action = action
+        self.max_tracked = max_tracked
+
+        self._users: "OrderedDict[int, RateWindow]" = OrderedDict()
+        # channel id -> window of users who posted there for the first time in the window
+        self._channels: "OrderedDict[int, RateWindow]" = OrderedDict()
+        # (channel id, user id) -> last second the user posted in the channel
+        self._authors: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+        self.raids: Dict[int, _Raid] = {}
+        self._expire_task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.user_messages > 0 or self.raid_authors > 0
+
+    def _window_for(self, windows: OrderedDict, key: int) -> RateWindow:
+        window = windows.get(key)
+        if window is None:
+            window = windows[key] = RateWindow(self.window)
+            if len(windows) > self.max_tracked:
+                windows.popitem(last=False)
+        else:
+            windows.move_to_end(key)
+        return window
+
+    def observe(self, user_id: int, channel_id: int, created_at: float, now: float) -> Tuple[bool, Optional[_Raid]]:
+        """Նամակը հաշվել; (օգտատերը flood է անում, ալիքի raid-ը կամ None)"""
+        second = int(created_at)
+        user_count = self._window_for(self._users, user_id).add(second)
+        channel = self._window_for(self._channels, channel_id)
+        # A user's first message in the channel within the window counts as one more active author there
+        last = self._authors.pop((channel_id, user_id), None)
+        self._authors[(channel_id, user_id)] = second if last is None else max(last, second)
+        if len(self._authors) > self.max_tracked:
+            self._authors.popitem(last=False)
+        new_author = last is None or second - last >= self.window
+        authors = channel.add(second) if new_author else channel.count(second)
+
+        raid = self.raids.get(channel_id)
+        if self.raid_authors > 0 and authors >= self.raid_authors:
+            if raid is None:
+                raid = self.raids[channel_id] = _Raid(now, now + self.cooldown)
+                RAIDS.inc()
+                logger.warning(f"Raid mode ON in channel {channel_id}: {authors} new authors "
+                               f"in {self.window}s ({self.action})", extra={"channel_id": channel_id})
+            raid.until = now + self.cooldown
+        elif raid is not None and now >= raid.until:
+            self._end_raid(channel_id, raid, now)
+            raid = None
+
+        flooding = 0 < self.user_messages < user_count
+        return flooding, raid
+
+    def _end_raid(self, channel_id: int, raid: _Raid, now: float):
+        del self.raids[channel_id]
+        logger.warning(f"Raid mode OFF in channel {channel_id} after {now - raid.started_at:.0f}s: "
+                       f"{raid.messages} messages, {len(raid.verdicts)} analysed", extra={"channel_id": channel_id})
+
+    def expire_raids(self):
+        """Լռած ալիքների raid ռեժիմը անջատել"""
+        now = time.monotonic()
+        for channel_id, raid in list(self.raids.items()):
+            if now >= raid.until:
+                self._end_raid(channel_id, raid, now)
+
+    def start(self):
+        if self.raid_authors > 0 and (self._expire_task is None or self._expire_task.done()):
+            self._expire_task = asyncio.create_task(self._expire_loop())
+
+    async def stop(self):
+        if self._expire_task is not None:
+            self._expire_task.cancel()
+            self._expire_task = None
+
+    async def _expire_loop(self):
+        while True:
+            await asyncio.sleep(self.EXPIRE_INTERVAL)
+            self.expire_raids()
+
+    async def analyze(self, job, analyze: Analyze, is_edit: bool = False) -> Tuple[Optional[Dict], float]:
+        """Flood/raid ստուգումից հետո verdict-ը ստանալ `analyze`-ով"""
+        created_at = snowflake_seconds(job.message_id)
+        if not self.enabled or is_edit or time.time() - created_at > self.window:
+            return await analyze(job)
+
+        flooding, raid = self.observe(job.user_id, job.channel_id, created_at, time.monotonic())
+        if flooding:
+            FLOOD_DECISIONS.inc(kind='flood')
+            return {"status": "reject", "feedback": FLOOD_FEEDBACK, "source": "flood"}, 0.0
+        if raid is None:
+            return await analyze(job)
+
+        raid.messages += 1
+        if self.action == 'reject':
+            FLOOD_DECISIONS.inc(kind='raid_reject')
+            return {"status": "reject", "feedback": RAID_FEEDBACK, "source": "raid"}, 0.0
+
+        signature = burst_signature(job.content, job.attachments)
+        if not signature:
+            # No text or attachments to group by (stickers, embeds): analysed on its own
+            return await analyze(job)
+        future = raid.verdicts.get(signature)
+        if future is not None:
+            # Another message of the burst is (or was) the representative: share its verdict
+            result, _ = await asyncio.shield(future)
+            if result is not None:
+                FLOOD_DECISIONS.inc(kind='raid_shared')
+                return {"status": result["status"], "feedback": result.get("feedback", ""), "source": "raid_burst"}, 0.0
+            return await analyze(job)
+
+        future = asyncio.get_running_loop().create_future()
+        if len(raid.verdicts) < MAX_BURST_SIGNATURES:
+            raid.verdicts[signature] = future
+        result, processing_time = None, 0.0
+        try:
+            result, processing_time = await analyze(job)
+        finally:
+            future.set_result((result, processing_time))
+            if result is None:
+                # Let the next message of the burst try again
+                raid.verdicts.pop(signature, None)
+        return result, processing_time
+
+    def dump_state(self) -> bytes:
+        """Պատուհաններն ու raid-երը warm state-ի համար"""
+        # Raid deadlines are monotonic; the snapshot keeps them as wall-clock times
+        offset = time.time() - time.monotonic()
+        parts = [_STATE_HEADER.pack(self.window, len(self._users), len(self._channels),
+                                    len(self._authors), len(self.raids))]
+        for windows in (self._users, self._channels):
+            for key, window in windows.items():
+                parts.append(_WINDOW_RECORD.pack(key, window.head))
+                parts.append(window.counts.tobytes())
+        for (channel_id, user_id), last in self._authors.items():
+            parts.append(_AUTHOR_RECORD.pack(channel_id, user_id, last))
+        for channel_id, raid in self.raids.items():
+            parts.append(_RAID_RECORD.pack(channel_id, raid.started_at + offset, raid.until + offset, raid.messages))
+        return b''.join(parts)
+
+    def restore_state(self, data: memoryview, saved_at: float) -> int:
+        """Դեռ ակտուալ պատուհաններն ու raid-երը վերականգնել"""
+        window, users, channels, authors, raids = _STATE_HEADER.unpack_from(data)
+        offset = _STATE_HEADER.size
+        now = time.time()
+        # Decoded in full first, so a section that fails halfway leaves the guard untouched
+        decoded = ([], [])
+        for records, count in zip(decoded, (users, channels)):
+            for _ in range(count):
+                key, head = _WINDOW_RECORD.unpack_from(data, offset)
+                offset += _WINDOW_RECORD.size
+                if offset + 2 * window > len(data):
+                    raise ValueError("truncated flood guard window")
+                counts = bytes(data[offset:offset + 2 * window])
+                offset += 2 * window
+                # Windows of another FLOOD_WINDOW, or with nothing left in the window, start empty
+                if window != self.window or head <= now - self.window:
+                    continue
+                rate = RateWindow(self.window)
+                rate.counts = array('H')
+                rate.counts.frombytes(counts)
+                rate.total = sum(rate.counts)
+                rate.head = head
+                records.append((key, rate))
+
+        author_records = []
+        for _ in range(authors):
+            channel_id, user_id, last = _AUTHOR_RECORD.unpack_from(data, offset)
+            offset += _AUTHOR_RECORD.size
+            if last > now - self.window:
+                author_records.append(((channel_id, user_id), last))
+
+        offset_monotonic = time.monotonic() - now
+        raid_records = []
+        for _ in range(raids):
+            channel_id, started_at, until, messages = _RAID_RECORD.unpack_from(data, offset)
+            offset += _RAID_RECORD.size
+            if until > now:
+                raid = _Raid(started_at + offset_monotonic, until + offset_monotonic)
+                raid.messages = messages
+                raid_records.append((channel_id, raid))
+
+        for windows, records in ((self._users, decoded[0]), (self._channels, decoded[1]),
+                                 (self._authors, author_records)):
+            windows.update(records)
+            while len(windows) > self.max_tracked:
+                windows.popitem(last=False)
+        self.raids.update(raid_records)
+        if self.raids:
+            logger.warning(f"Raid mode still ON after restart in channels {', '.join(map(str, self.raids))}")
+        return len(self._users) + len(self._channels) + len(self._authors) + len(self.raids)
@@ -0,0 +1,96 @@
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+from utils.logger import setup_logger
+from utils.attachment_fetcher import AttachmentFetcher, AttachmentRef
+from utils.image_hash import PerceptualHashIndex, dhash, hashing_available
+from utils.metrics import IMAGE_HASHES, IMAGE_REPOSTS
+from config.settings import (
+    IMAGE_HASHING, IMAGE_HASH_DISTANCE, IMAGE_HASH_INDEX_SIZE,
+    IMAGE_HASH_MAX_IMAGES, IMAGE_HASH_MAX_BYTES
+)
+
+logger = setup_logger(__name__)
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp')
+# The strictest earlier verdict wins when a message carries several known images
+_STRICTNESS = {"reject": 0, "needs_edit": 1, "approve": 2}
+_WORD = re.compile(r'[^\W_]')
+
+def trivial_caption(text: str) -> bool:
+    """Տեքստը verdict-ի վրա չի ազդում (միայն emoji, կետադրություն, բացատներ)"""
+    return _WORD.search(text) is None
+
+def _hash_file(fp) -> Optional[int]:
+    try:
+        return dhash(fp.read())
+    finally:
+        fp.close()
+
+class ImageRepostDetector:
+    """Reuses earlier verdicts for reposted images
+
+    Up to `max_images` image attachments of `max_bytes` each are downloaded
+    and hashed in a small thread pool, off the event loop. Verdicts are kept
+    per hash in a bounded in-memory index; near-duplicates (re-encoded,
+    resized) match within `max_distance` bits.
+    """
+
+    def __init__(self, max_images: int = IMAGE_HASH_MAX_IMAGES, max_bytes: int = IMAGE_HASH_MAX_BYTES,
+                 index_size: int = IMAGE_HASH_INDEX_SIZE, max_distance: int = IMAGE_HASH_DISTANCE):
+        self.enabled = IMAGE_HASHING and hashing_available()
+        self.max_images = max_images
+        self.index = PerceptualHashIndex(index_size, max_distance)
+        self.fetcher = AttachmentFetcher(concurrency=2, spool_threshold=max_bytes,
+                                         max_file_bytes=max_bytes, budget_bytes=max_bytes * max_images)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @staticmethod
+    def images(attachments: Sequence[Tuple[str, str, int]]) -> List[AttachmentRef]:
+        return [AttachmentRef(*att) for att in attachments if att[1].lower().endswith(IMAGE_EXTENSIONS)]
+
+    async def hash_images(self, attachments: Sequence[Tuple[str, str, int]]) -> List[int]:
+        """Նկար-attachment-ների hash-երը (չհաջողվածները բաց են թողնվում)"""
+        images = self.images(attachments)[:self.max_images]
+        if not self.enabled or not images:
+            return []
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-hash")
+
+        downloaded = await self.fetcher.fetch_all(images)
+        loop = asyncio.get_running_loop()
+        hashes = await asyncio.gather(
+            *(loop.run_in_executor(self._executor, _hash_file, fp) for _, fp in downloaded)
+        )
+        IMAGE_HASHES.inc(len(hashes))
+        return [value for value in hashes if value is not None]
+
+    def lookup(self, hashes: Sequence[int]) -> Optional[Dict]:
+        """Նախկին verdict-ը, եթե բոլոր նկարները (կամ մերժվածներից մեկը) ծանոթ են"""
+        if not hashes:
+            return None
+        found = [self.index.lookup(value) for value in hashes]
+        known = [verdict for verdict in found if verdict is not None]
+        if not known:
+            return None
+        verdict = min(known, key=lambda v: _STRICTNESS.get(v["status"], 0))
+        # An approval only covers the images it was given for
+        if verdict["status"] == "approve" and len(known) < len(found):
+            return None
+        IMAGE_REPOSTS.inc(status=verdict["status"])
+        return verdict
+
+    def remember(self, hashes: Sequence[int], result: Dict):
+        """Նկարները տեսած OpenAI-ի verdict-ը պահել դրանց համար (տեքստի մասին verdict-ները՝ ոչ)"""
+        if result.get("status") not in _STRICTNESS:
+            return
+        verdict = {"status": result["status"], "feedback": result.get("feedback", "")}
+        for value in hashes:
+            self.index.add(value, verdict)
+
+    async def close(self):
+        await self.fetcher.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
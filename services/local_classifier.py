@@ -0,0 +1,321 @@
+"""Local naive Bayes classifier trained on earlier Assistant verdicts.
+
+Messages are turned into hashed word and word-pair counts; a multinomial
+naive Bayes model scores them per verdict. The newest part of the history
+is held out to calibrate a confidence threshold (log-odds margin) at which
+the model agrees with the Assistant at least LOCAL_MODEL_PRECISION of the
+time; only messages above it are decided locally.
+
+Usage:
+    python -m services.local_classifier [--precision 0.98] [--labels approve] [--dry-run]
+"""
+import argparse
+import asyncio
+import math
+import multiprocessing
+import os
+import pickle
+import re
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+from utils.logger import setup_logger, worker_log_queue, init_worker_logging
+from utils.metrics import LOCAL_MODEL_DECISIONS, LOCAL_MODEL_HOLDOUT
+from utils.text_compaction import compact_text
+from utils.spawn import without_main_module
+from database.db_manager import DatabaseManager
+from config.settings import (
+    INPUT_COMPACTION, LOCAL_MODEL, LOCAL_MODEL_PATH, LOCAL_MODEL_LABELS, LOCAL_MODEL_PRECISION,
+    LOCAL_MODEL_MIN_ROWS, LOCAL_MODEL_MAX_ROWS, LOCAL_MODEL_RETRAIN_INTERVAL, LOCAL_MODEL_MIN_NEW_LABELS
+)
+
+logger = setup_logger(__name__)
+
+MODEL_VERSION = 1
+N_FEATURES = 1 << 18
+ALPHA = 0.5
+# Newest fraction of the history used to calibrate the threshold
+HOLDOUT_FRACTION = 0.2
+# Fewer confident held-out decisions than this give no usable precision estimate
+MIN_DECISIONS = 30
+RELOAD_CHECK_INTERVAL = 60
+
+_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+def features(text: str, n_features: int = N_FEATURES) -> Dict[int, int]:
+    """Տեքստի hashed unigram/bigram հաշվարկները"""
+    tokens = _TOKEN.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    grams.append(f"__len{len(tokens).bit_length()}")
+    counts: Dict[int, int] = {}
+    for gram in grams:
+        # crc32, not hash(): feature ids must match across processes
+        index = zlib.crc32(gram.encode('utf-8')) % n_features
+        counts[index] = counts.get(index, 0) + 1
+    return counts
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes over hashed features, with a calibrated threshold"""
+
+    def __init__(self, n_features: int = N_FEATURES):
+        self.n_features = n_features
+        self.labels: Tuple[str, ...] = ()
+        self.class_log_prior: List[float] = []
+        self.feature_log_prob: List[array] = []
+        self.threshold = math.inf
+        self.decided_labels: FrozenSet[str] = frozenset()
+        self.report: Dict = {}
+        self.max_row_id = 0
+
+    def fit(self, samples: Sequence[Dict[int, int]], targets: Sequence[str], alpha: float = ALPHA):
+        self.labels = tuple(sorted(set(targets)))
+        if len(self.labels) < 2:
+            raise ValueError("training data needs at least two different verdicts")
+        index = {label: i for i, label in enumerate(self.labels)}
+
+        counts = [array('f', bytes(4 * self.n_features)) for _ in self.labels]
+        docs = [0] * len(self.labels)
+        for sample, target in zip(samples, targets):
+            row = counts[index[target]]
+            docs[index[target]] += 1
+            for feature, count in sample.items():
+                row[feature] += count
+
+        self.class_log_prior = [math.log(n / len(targets)) for n in docs]
+        self.feature_log_prob = []
+        for row in counts:
+            log_total = math.log(sum(row) + alpha * self.n_features)
+            self.feature_log_prob.append(array('f', (math.log(c + alpha) - log_total for c in row)))
+
+    def predict(self, sample: Dict[int, int]) -> Tuple[str, float]:
+        """(label, margin), margin-ը՝ լավագույն և երկրորդ դասերի log-odds տարբերությունը"""
+        scores = []
+        for prior, log_prob in zip(self.class_log_prior, self.feature_log_prob):
+            scores.append(prior + sum(log_prob[f] * count for f, count in sample.items()))
+        ranked = sorted(range(len(scores)), key=scores.__getitem__, reverse=True)
+        return self.labels[ranked[0]], scores[ranked[0]] - scores[ranked[1]]
+
+    def calibrate(self, samples: Sequence[Dict[int, int]], targets: Sequence[str],
+                  labels: FrozenSet[str], precision: float) -> Dict:
+        """Ամենացածր threshold-ը, որի դեպքում held-out precision-ը ≥ `precision`"""
+        scored = []
+        agree = 0
+        for sample, target in zip(samples, targets):
+            label, margin = self.predict(sample)
+            agree += label == target
+            if label in labels:
+                scored.append((margin, label == target))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        self.threshold = math.inf
+        correct = 0
+        for i, (margin, ok) in enumerate(scored, 1):
+            correct += ok
+            if i >= MIN_DECISIONS and correct / i >= precision:
+                self.threshold = margin
+        self.decided_labels = labels
+
+        decided = [ok for margin, ok in scored if margin >= self.threshold]
+        self.report = {
+            "holdout_rows": len(targets),
+            "holdout_accuracy": agree / len(targets) if targets else 0.0,
+            "target_precision": precision,
+            "threshold": self.threshold,
+            "decided": len(decided),
+            "precision": sum(decided) / len(decided) if decided else None,
+            # Share of held-out messages that would not have gone to the Assistant
+            "coverage": len(decided) / len(targets) if targets else 0.0,
+            "labels": sorted(labels),
+        }
+        return self.report
+
+    def save(self, path: str):
+        state = {"version": MODEL_VERSION, **self.__dict__}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Readers in other processes never see a half-written model
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'NaiveBayesModel':
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.pop("version", None) != MODEL_VERSION:
+            raise ValueError(f"{path} was written by another model version")
+        model = cls(state["n_features"])
+        model.__dict__.update(state)
+        return model
+
+def train(rows: Sequence[Tuple[int, str, str]], labels: FrozenSet[str] = LOCAL_MODEL_LABELS,
+          precision: float = LOCAL_MODEL_PRECISION, min_rows: int = LOCAL_MODEL_MIN_ROWS) -> NaiveBayesModel:
+    """(id, տեքստ, status) տողերից մոդել սովորեցնել և threshold-ը կալիբրացնել"""
+    # One example per distinct (compacted) text with its latest verdict, ordered by last occurrence,
+    # so repeats of a held-out text can't leak into training
+    latest: Dict[str, str] = {}
+    for _, text, status in rows:
+        key = compact_text(text) if INPUT_COMPACTION else text
+        latest.pop(key, None)
+        latest[key] = status
+    if len(latest) < min_rows:
+        raise ValueError(f"{len(latest)} distinct labeled messages, at least {min_rows} needed")
+
+    texts = list(latest)
+    samples = [features(text) for text in texts]
+    targets = [latest[text] for text in texts]
+    split = int(len(samples) * (1 - HOLDOUT_FRACTION))
+
+    model = NaiveBayesModel()
+    model.fit(samples[:split], targets[:split])
+    model.calibrate(samples[split:], targets[split:], labels, precision)
+    model.max_row_id = max(row_id for row_id, _, _ in rows)
+    model.report.update(train_rows=split, trained_at=time.time())
+    return model
+
+def train_and_save(path: str = LOCAL_MODEL_PATH) -> Dict:
+    """Ուսուցումը DB-ի պատմությունից (առանձին պրոցեսում)"""
+    rows = DatabaseManager().get_labeled_messages(LOCAL_MODEL_MAX_ROWS)
+    model = train(rows)
+    model.save(path)
+    return model.report
+
+def format_report(report: Dict) -> str:
+    precision = report["precision"]
+    return (f"trained on {report['train_rows']} messages; held out {report['holdout_rows']} "
+            f"(accuracy {report['holdout_accuracy'] * 100:.1f}%); "
+            f"at threshold {report['threshold']:.2f} for {','.join(report['labels'])}: "
+            f"precision {'n/a' if precision is None else f'{precision * 100:.1f}%'}, "
+            f"{report['coverage'] * 100:.1f}% of API calls avoided")
+
+class LocalClassifier:
+    """Answers the confident cases with the trained model, None otherwise
+
+    The model file is checked for changes every RELOAD_CHECK_INTERVAL
+    seconds, so a retrain in any process reaches every worker.
+    """
+
+    def __init__(self, path: str = LOCAL_MODEL_PATH, enabled: bool = LOCAL_MODEL,
+                 labels: FrozenSet[str] = LOCAL_MODEL_LABELS):
+        self.path = path
+        self.enabled = enabled
+        self.labels = labels
+        self.model: Optional[NaiveBayesModel] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+
+    def reload(self):
+        """Մոդելը ֆայլից կարդալ, եթե փոխվել է"""
+        self._checked_at = time.monotonic()
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            self.model = NaiveBayesModel.load(self.path)
+        except Exception as e:
+            logger.error(f"Could not load local model {self.path}: {e}")
+            return
+        report = self.model.report
+        for measure in ("precision", "coverage", "threshold"):
+            if report.get(measure) is not None and math.isfinite(report[measure]):
+                LOCAL_MODEL_HOLDOUT.set(report[measure], measure=measure)
+        logger.info(f"Local model loaded: {format_report(report)}")
+
+    def predict(self, text: str) -> Optional[Dict]:
+        """Verdict, եթե մոդելը բավական վստահ է"""
+        if not self.enabled:
+            return None
+        if time.monotonic() - self._checked_at >= RELOAD_CHECK_INTERVAL:
+            self.reload()
+        model = self.model
+        if model is None or not text:
+            return None
+
+        label, margin = model.predict(features(text, model.n_features))
+        if margin < model.threshold or label not in self.labels or label not in model.decided_labels:
+            return None
+        LOCAL_MODEL_DECISIONS.inc(status=label)
+        return {"status": label, "feedback": "", "source": "local_model"}
+
+class ClassifierTrainer:
+    """Retrains the local model when enough new verdicts have been logged
+
+    Training is CPU-bound pure Python, so it runs in a spawned process;
+    the classifier picks the new file up afterwards.
+    """
+
+    def __init__(self, db: DatabaseManager, classifier: LocalClassifier,
+                 interval: float = LOCAL_MODEL_RETRAIN_INTERVAL, min_new_labels: int = LOCAL_MODEL_MIN_NEW_LABELS):
+        self.db = db
+        self.classifier = classifier
+        self.interval = interval
+        self.min_new_labels = min_new_labels
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.classifier.enabled and self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._retrain_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def retrain(self) -> Dict:
+        """Մոդելը նորից սովորեցնել առանձին պրոցեսում"""
+        loop = asyncio.get_running_loop()
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=ctx, initializer=init_worker_logging,
+                                 initargs=(worker_log_queue(ctx),)) as executor:
+            # The process is started by this submit
+            with without_main_module():
+                future = loop.run_in_executor(executor, train_and_save, self.classifier.path)
+            report = await future
+        self.classifier.reload()
+        return report
+
+    async def _retrain_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                model = self.classifier.model
+                new_labels = self.db.count_labeled_messages(model.max_row_id if model else 0)
+                if new_labels < self.min_new_labels:
+                    continue
+                logger.info(f"Retraining local model on {new_labels} new verdicts")
+                report = await self.retrain()
+                logger.info(f"Local model retrained: {format_report(report)}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Local model retraining failed: {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local classifier on message_logs verdicts")
+    parser.add_argument('--output', default=LOCAL_MODEL_PATH)
+    parser.add_argument('--precision', type=float, default=LOCAL_MODEL_PRECISION,
+                        help="held-out precision the threshold must reach")
+    parser.add_argument('--labels', default=','.join(sorted(LOCAL_MODEL_LABELS)),
+                        help="verdicts the model may give (comma separated)")
+    parser.add_argument('--limit', type=int, default=LOCAL_MODEL_MAX_ROWS, help="most recent verdicts to use")
+    parser.add_argument('--dry-run', action='store_true', help="report only, don't write the model")
+    args = parser.parse_args()
+
+    labels = frozenset(label.strip() for label in args.labels.split(',') if label.strip())
+    started = time.perf_counter()
+    rows = DatabaseManager().get_labeled_messages(args.limit)
+    model = train(rows, labels, args.precision)
+    print(f"Trained in {time.perf_counter() - started:.1f}s: {format_report(model.report)}")
+    if model.threshold == math.inf:
+        print(f"No threshold reaches {args.precision * 100:.1f}% precision; the model would decide nothing")
+    if not args.dry_run:
+        model.save(args.output)
+        print(f"Saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+import asyncio
+import itertools
+import multiprocessing
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+from utils.logger import setup_logger, worker_log_queue, init_worker_logging
+from utils.metrics import registry as metrics_registry, WORKER_RESTARTS
+from utils.spawn import without_main_module
+from utils.tracing import span, trace_message, merge_spans
+from database.db_manager import DatabaseManager
+from services.openai_service import OpenAIService
+from services.verdict_cache import VerdictCache, verdict_cache_key
+from services.budget import BudgetGuard, usage_tokens
+from services.image_reposts import ImageRepostDetector, trivial_caption
+from services.local_classifier import LocalClassifier
+from utils.text_compaction import compact_text
+from utils.attachment_fetcher import AttachmentRef
+from config.settings import (
+    WORKER_CONCURRENCY, WORKER_TIMEOUT, INPUT_COMPACTION, ATTACHMENT_ONLY_VERDICT, OPENAI_IMAGE_INPUT
+)
+
+logger = setup_logger(__name__)
+
+class ModerationJob:
+    """Compact record of what moderation needs from a Discord message"""
+
+    __slots__ = ('message_id', 'channel_id', 'guild_id', 'user_id', 'username',
+                 'content', 'attachments', 'assistant_id', 'rules')
+
+    def __init__(self, message_id: int, channel_id: int, guild_id: int, user_id: int,
+                 username: str, content: str, attachments: Tuple[Tuple[str, str, int], ...],
+                 assistant_id: str, rules: Optional[str]):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.user_id = user_id
+        self.username = username
+        self.content = content
+        # AttachmentRef (url, filename, size) per attachment
+        self.attachments = attachments
+        self.assistant_id = assistant_id
+        self.rules = rules
+
+    @classmethod
+    def from_message(cls, message, policy) -> 'ModerationJob':
+        """discord.Message-ից job ստեղծել"""
+        return cls(
+            message.id, message.channel.id, message.guild.id if message.guild else 0,
+            message.author.id, message.author.name, message.content,
+            tuple(AttachmentRef(att.url, att.filename, att.size) for att in message.attachments),
+            policy.assistant_id, policy.rules
+        )
+
+    @property
+    def attachment_urls(self):
+        return [url for url, _, _ in self.attachments]
+
+    def to_tuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    @classmethod
+    def from_tuple(cls, values: tuple) -> 'ModerationJob':
+        return cls(*values)
+
+class LocalModeration:
+    """In-process moderation backend (default)"""
+
+    def __init__(self, db: DatabaseManager, openai_service: OpenAIService, verdict_cache: VerdictCache,
+                 budget: Optional[BudgetGuard] = None, image_reposts: Optional[ImageRepostDetector] = None,
+                 classifier: Optional[LocalClassifier] = None):
+        self.db = db
+        self.openai_service = openai_service
+        self.verdict_cache = verdict_cache
+        self.budget = budget or BudgetGuard(db)
+        self.image_reposts = image_reposts or ImageRepostDetector()
+        self.classifier = classifier or LocalClassifier()
+        openai_service.usage_sink = self.charge_usage
+
+    async def analyze(self, job: ModerationJob) -> Tuple[Optional[Dict], float]:
+        """Verdict-ը cache-ից կամ OpenAI-ից ստանալ"""
+        # The compacted text is what OpenAI sees, so texts that compact alike share a verdict
+        content = compact_text(job.content) if INPUT_COMPACTION else job.content
+
+        if not content.strip():
+            # Nothing for the Assistant to read: reuse a reposted image's verdict or apply the policy.
+            # Until the index has learned a verdict there is nothing to match, so nothing is downloaded
+            if not self.image_reposts.index:
+                return {"status": ATTACHMENT_ONLY_VERDICT, "feedback": "", "source": "attachment_policy"}, 0.0
+            with span("image_hash"):
+                hashes = await self.image_reposts.hash_images(job.attachments)
+            result = self.image_reposts.lookup(hashes)
+            if result is not None:
+                logger.info(f"Image repost in message {job.message_id}: earlier verdict {result['status']}",
+                            extra={"message_id": job.message_id})
+                return {**result, "source": "image_repost"}, 0.0
+            return {"status": ATTACHMENT_ONLY_VERDICT, "feedback": "", "source": "attachment_policy"}, 0.0
+
+        # The cache and the local model judge text alone, so messages whose images the Assistant sees skip them
+        images = self.image_reposts.images(job.attachments)[:self.image_reposts.max_images] if OPENAI_IMAGE_INPUT else []
+        cache_key = verdict_cache_key(content, job.assistant_id, job.rules)
+        if not images:
+            with span("verdict_cache"):
+                result = self.verdict_cache.get(cache_key)
+            if result is not None:
+                logger.info(f"Verdict cache hit for message {job.message_id}",
+                            extra={"message_id": job.message_id})
+                return {**result, "source": "cache"}, 0.0
+
+            # Confident cases are decided by the model trained on earlier verdicts (not cached, not trained on)
+            with span("local_model"):
+                result = self.classifier.predict(content)
+            if result is not None:
+                logger.info(f"Local model verdict for message {job.message_id}: {result['status']}",
+                            extra={"message_id": job.message_id})
+                return result, 0.0
+
+        # Near the OpenAI budget only a sample (or none) of the cache misses are analysed
+        if not self.budget.allow():
+            logger.info(f"Budget mode {self.budget.mode}: message {job.message_id} not sent to OpenAI",
+                        extra={"message_id": job.message_id})
+            return {"status": "skipped", "feedback": ""}, 0.0
+
+        # A verdict is remembered for the images only when the Assistant saw them and the text around
+        # them says nothing (a verdict on "buy my spam" is about the text); they are hashed alongside the call
+        hashing = (asyncio.ensure_future(self.image_reposts.hash_images(images))
+                   if images and trivial_caption(content) else None)
+        result, processing_time = await self.openai_service.analyze_message(
+            content, job.assistant_id, job.rules, message_id=job.message_id, channel_id=job.channel_id,
+            image_urls=[image.url for image in images]
+        )
+        if result is not None:
+            result["source"] = "openai"
+            result["cost"] = self.budget.record(result.get("usage"))
+            if hashing is not None:
+                self.image_reposts.remember(await hashing, result)
+            elif not images:
+                self.verdict_cache.put(cache_key, result)
+        elif hashing is not None:
+            hashing.cancel()
+        return result, processing_time
+
+    def charge_usage(self, usage: Dict, source: str, channel_id: Optional[int]):
+        """Verdict չտված OpenAI token-ները budget-ում և rollup-ում հաշվել"""
+        cost = self.budget.record(usage)
+        prompt_tokens, completion_tokens = usage_tokens(usage)
+        self.db.record_usage(str(channel_id or 0), prompt_tokens, completion_tokens, cost, source)
+
+    def log_message_event(self, *args, **kwargs):
+        self.db.log_message_event(*args, **kwargs)
+
+    def save_message_spans(self, message_id: str, spans):
+        self.db.save_message_spans(message_id, spans)
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        await self.openai_service.stop()
+        await self.image_reposts.close()
+
+def _worker_main(job_queue: multiprocessing.Queue, result_queue: multiprocessing.Queue, concurrency: int,
+                 log_queue: multiprocessing.Queue):
+    """Worker պրոցեսի մուտքի կետ"""
+    init_worker_logging(log_queue)
+    asyncio.run(_worker_loop(job_queue, result_queue, concurrency))
+
+def _drain_metrics(verdict_cache: VerdictCache) -> tuple:
+    """Worker-ի metrics-ի աճը վերջին ուղարկումից ի վեր (ծնողը դրանք է ցուցադրում)"""
+    cache_stats = dict(verdict_cache.stats)
+    for name in verdict_cache.stats:
+        verdict_cache.stats[name] = 0
+    return metrics_registry.drain(), cache_stats
+
+async def _worker_loop(job_queue, result_queue, concurrency: int):
+    db = DatabaseManager()
+    backend = LocalModeration(db, OpenAIService(db), VerdictCache(db))
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def run_job(job_id: int, job_values: tuple):
+        job = ModerationJob.from_tuple(job_values)
+        # Stages timed here are sent back and merged into the gateway's trace
+        with trace_message(job.message_id) as trace:
+            try:
+                async with semaphore:
+                    result, processing_time = await backend.analyze(job)
+            except Exception as e:
+                logger.error(f"Worker analysis error: {e}")
+                result, processing_time = None, 0.0
+        spans = [s for s in trace.spans if s[0] != 'total'] if trace is not None else []
+        result_queue.put((job_id, result, processing_time, spans, _drain_metrics(backend.verdict_cache)))
+
+    while True:
+        item = await loop.run_in_executor(None, job_queue.get)
+        if item is None:
+            break
+
+        # Jobs wait for the semaphore in their own task, so DB writes queued behind them run at once
+        kind = item[0]
+        if kind == "analyze":
+            task = asyncio.create_task(run_job(item[1], item[2]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        elif kind == "log":
+            try:
+                db.log_message_event(*item[1], **item[2])
+            except Exception as e:
+                logger.error(f"Worker DB log error: {e}")
+        elif kind == "spans":
+            try:
+                db.save_message_spans(item[1], item[2])
+            except Exception as e:
+                logger.error(f"Worker DB spans error: {e}")
+        elif kind == "usage":
+            try:
+                db.record_usage(*item[1])
+            except Exception as e:
+                logger.error(f"Worker DB usage error: {e}")
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await backend.stop()
+    # Whatever was counted after the last job (DB writes of late log events)
+    result_queue.put((None, None, 0.0, [], _drain_metrics(backend.verdict_cache)))
+
+class _Worker:
+    """One worker process, its own job queue and the jobs it has not answered yet"""
+
+    __slots__ = ('process', 'queue', 'pending')
+
+    def __init__(self, process, queue):
+        self.process = process
+        self.queue = queue
+        self.pending: Set[int] = set()
+
+class WorkerPool:
+    """Moderation backend that runs analysis and DB writes in worker processes
+
+    The gateway process only pickles compact job tuples onto a multiprocessing
+    queue and resolves futures when verdicts come back. Every worker has its
+    own queue, so a dead worker's jobs are known: the supervisor fails them
+    and starts a replacement on a fresh queue.
+    """
+
+    SUPERVISE_INTERVAL = 2.0
+    # Late verdicts of at most this many timed-out jobs are still charged
+    MAX_TIMED_OUT = 10_000
+
+    def __init__(self, processes: int, concurrency: int = WORKER_CONCURRENCY,
+                 timeout: float = WORKER_TIMEOUT, verdict_cache: Optional[VerdictCache] = None):
+        self.processes = processes
+        # Workers' cache lookups are added to this (the gateway's) cache stats for /metrics
+        self.verdict_cache = verdict_cache
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._ctx = multiprocessing.get_context('spawn')
+        self._result_queue = self._ctx.Queue()
+        self._log_queue = None
+        self._workers = []
+        self._pending: Dict[int, asyncio.Future] = {}
+        # Jobs the gateway stopped waiting for: job id -> channel id, for charging a late verdict's tokens
+        self._timed_out: "OrderedDict[int, int]" = OrderedDict()
+        self._job_ids = itertools.count()
+        self._reader: Optional[threading.Thread] = None
+        self._supervisor: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def start(self):
+        """Worker պրոցեսները, պատասխանների thread-ը և supervisor-ը գործարկել"""
+        if self._workers:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._log_queue = worker_log_queue(self._ctx)
+        self._workers = [self._spawn(i) for i in range(self.processes)]
+        self._reader = threading.Thread(target=self._read_results, name="worker-results", daemon=True)
+        self._reader.start()
+        self._supervisor = asyncio.create_task(self._supervise())
+        logger.info(f"Started {self.processes} moderation worker process(es)")
+
+    def _spawn(self, index: int) -> _Worker:
+        queue = self._ctx.Queue()
+        process = self._ctx.Process(
+            target=_worker_main, name=f"moderation-worker-{index}",
+            args=(queue, self._result_queue, self.concurrency, self._log_queue), daemon=True
+        )
+        with without_main_module():
+            process.start()
+        return _Worker(process, queue)
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(self.SUPERVISE_INTERVAL)
+            try:
+                self.check_workers()
+            except Exception as e:
+                logger.error(f"Worker supervision failed: {e}")
+
+    def check_workers(self) -> int:
+        """Մահացած worker-ների job-երը ձախողել և worker-ները վերագործարկել"""
+        restarted = 0
+        for index, worker in enumerate(self._workers):
+            if worker.process.is_alive():
+                continue
+            logger.error(f"Moderation worker {worker.process.name} died (exit code {worker.process.exitcode}); "
+                         f"failing {len(worker.pending)} job(s) and restarting it")
+            for job_id in worker.pending:
+                self._timed_out.pop(job_id, None)
+                future = self._pending.pop(job_id, None)
+                if future is not None and not future.done():
+                    future.set_result((None, 0.0, []))
+            # Its queue may have died holding the queue's lock, so the replacement gets a new one;
+            # DB writes still queued there are lost
+            worker.queue.cancel_join_thread()
+            worker.queue.close()
+            self._workers[index] = self._spawn(index)
+            WORKER_RESTARTS.inc()
+            restarted += 1
+        return restarted
+
+    def _least_loaded(self) -> _Worker:
+        return min(self._workers, key=lambda worker: len(worker.pending))
+
+    def _read_results(self):
+        while True:
+            item = self._result_queue.get()
+            if item is None:
+                break
+            self._loop.call_soon_threadsafe(self._resolve, item)
+
+    def _resolve(self, item: tuple):
+        job_id, result, processing_time, spans, (metrics, cache_stats) = item
+        metrics_registry.merge(metrics)
+        if self.verdict_cache is not None:
+            for name, count in cache_stats.items():
+                self.verdict_cache.stats[name] = self.verdict_cache.stats.get(name, 0) + count
+        if job_id is None:
+            return
+        for worker in self._workers:
+            worker.pending.discard(job_id)
+        future = self._pending.pop(job_id, None)
+        if future is not None and not future.done():
+            future.set_result((result, processing_time, spans))
+        channel_id = self._timed_out.pop(job_id, None)
+        if channel_id is not None and result is not None and result.get("usage"):
+            # The verdict came after the gateway gave up: no log row carries these tokens
+            prompt_tokens, completion_tokens = usage_tokens(result["usage"])
+            self._least_loaded().queue.put(("usage", (str(channel_id), prompt_tokens, completion_tokens,
+                                                      result.get("cost") or 0.0, 'worker_timeout')))
+
+    async def analyze(self, job: ModerationJob) -> Tuple[Optional[Dict], float]:
+        """Job-ը ամենաքիչ զբաղված worker-ին ուղարկել և verdict-ին սպասել"""
+        job_id = next(self._job_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[job_id] = future
+        worker = self._least_loaded()
+        worker.pending.add(job_id)
+        worker.queue.put(("analyze", job_id, job.to_tuple()))
+
+        try:
+            with span("worker_roundtrip"):
+                result, processing_time, spans = await asyncio.wait_for(future, timeout=self.timeout)
+            merge_spans(spans)
+            return result, processing_time
+        except asyncio.TimeoutError:
+            self._pending.pop(job_id, None)
+            self._timed_out[job_id] = job.channel_id
+            if len(self._timed_out) > self.MAX_TIMED_OUT:
+                self._timed_out.popitem(last=False)
+            logger.error(f"Worker timeout for message {job.message_id}")
+            return None, 0.0
+
+    def log_message_event(self, *args, **kwargs):
+        """DB գրառումը worker-ին փոխանցել"""
+        self._least_loaded().queue.put(("log", args, kwargs))
+
+    def save_message_spans(self, message_id: str, spans):
+        """Trace-ի պահպանումը worker-ին փոխանցել"""
+        self._least_loaded().queue.put(("spans", message_id, spans))
+
+    async def stop(self):
+        """Worker-ներին ավարտի ազդանշան ուղարկել և սպասել"""
+        if not self._workers:
+            return
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+            self._supervisor = None
+        for worker in self._workers:
+            worker.queue.put(None)
+        loop = asyncio.get_running_loop()
+        for worker in self._workers:
+            await loop.run_in_executor(None, worker.process.join, 30)
+        self._result_queue.put(None)
+        self._workers = []
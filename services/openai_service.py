@@ -1,22 +1,137 @@
 import aiohttp
 import json
 import asyncio
-from typing import Optional, Tuple, Dict
+import contextvars
+import random
+from typing import Callable, Optional, Sequence, Tuple, Dict
 from utils.logger import setup_logger
-from config.settings import OPENAI_API_KEY, ASSISTANT_ID
+from utils.metrics import OPENAI_LATENCY, OPENAI_POLLS, OPENAI_ERRORS
+from utils.tracing import span, traced
+from config.settings import (
+    OPENAI_API_KEY, ASSISTANT_ID, OPENAI_BASE_URL,
+    SHADOW_ASSISTANT_ID, SHADOW_BASE_URL, SHADOW_API_KEY, SHADOW_SAMPLE_RATE
+)
 
 logger = setup_logger(__name__)
 
 class OpenAIService:
     """OpenAI API service"""
     
-    def __init__(self):
-        self.api_key = OPENAI_API_KEY
-        self.assistant_id = ASSISTANT_ID
-        self.base_url = "https://api.openai.com/v1"
+    # Shadow calls beyond this are skipped instead of piling up
+    MAX_PENDING_SHADOWS = 100
+    # After a cancel the run is "cancelling" (usage not reported yet) until it reaches one of these
+    TERMINAL_STATUSES = frozenset({'cancelled', 'failed', 'expired', 'completed', 'incomplete'})
+    CANCEL_POLLS = 5
+    CANCEL_POLL_INTERVAL = 1.0
     
-    async def analyze_message(self, message_content: str) -> Tuple[Optional[Dict], float]:
-        """OpenAI Assistant-ին նամակ ուղարկել և պատասխանը ստանալ"""
+    def __init__(self, db=None, api_key: str = OPENAI_API_KEY, base_url: str = OPENAI_BASE_URL,
+                 assistant_id: str = ASSISTANT_ID, record_metrics: bool = True):
+        self.api_key = api_key
+        self.assistant_id = assistant_id
+        self.base_url = base_url
+        self.record_metrics = record_metrics
+        
+        # Tokens that bought no verdict for the caller (failed, unreadable and timed-out
+        # runs, shadow calls) are reported here as (usage, source, channel_id)
+        self.usage_sink: Optional[Callable[[Dict, str, Optional[int]], None]] = None
+        
+        # Shadow evaluation: a sample of messages also goes to a second assistant/backend
+        self.db = db
+        self.shadow: Optional['OpenAIService'] = None
+        self._shadow_tasks = set()
+        if db is not None and SHADOW_SAMPLE_RATE > 0 and (SHADOW_ASSISTANT_ID or SHADOW_BASE_URL):
+            self.shadow = OpenAIService(
+                api_key=SHADOW_API_KEY or api_key, base_url=SHADOW_BASE_URL or base_url,
+                assistant_id=SHADOW_ASSISTANT_ID or assistant_id, record_metrics=False
+            )
+            # Everything the shadow backend spends, failed runs included, is shadow spend
+            self.shadow.usage_sink = lambda usage, source, channel_id: self._spent(usage, 'shadow', channel_id)
+    
+    async def analyze_message(self, message_content: str, assistant_id: Optional[str] = None,
+                              instructions: Optional[str] = None,
+                              message_id: Optional[int] = None, channel_id: Optional[int] = None,
+                              image_urls: Sequence[str] = ()) -> Tuple[Optional[Dict], float]:
+        """OpenAI Assistant-ին նամակ ուղարկել և պատասխանը ստանալ
+
+        `assistant_id` and `instructions` come from the channel policy; when
+        set, `instructions` are appended to the assistant's own instructions
+        (which define the JSON verdict format). `image_urls` are sent with
+        the text as image inputs.
+        Sampled messages are also sent to the shadow backend concurrently;
+        its verdict is only recorded, never acted on or waited for.
+        """
+        if (self.shadow is None or random.random() >= SHADOW_SAMPLE_RATE
+                or len(self._shadow_tasks) >= self.MAX_PENDING_SHADOWS):
+            return await self._analyze(message_content, assistant_id, instructions, channel_id, image_urls)
+        
+        primary = asyncio.get_running_loop().create_future()
+        # A fresh context keeps shadow stages out of the message's trace
+        task = contextvars.Context().run(asyncio.create_task, self._run_shadow(
+            primary, message_content, assistant_id or self.assistant_id, instructions, message_id, channel_id,
+            image_urls
+        ))
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+        
+        try:
+            result = await self._analyze(message_content, assistant_id, instructions, channel_id, image_urls)
+        except BaseException:
+            primary.cancel()
+            raise
+        primary.set_result(result)
+        return result
+    
+    async def stop(self):
+        """Ընթացիկ shadow կանչերը չեղարկել"""
+        for task in list(self._shadow_tasks):
+            task.cancel()
+        if self._shadow_tasks:
+            await asyncio.gather(*self._shadow_tasks, return_exceptions=True)
+    
+    async def _run_shadow(self, primary: asyncio.Future, message_content: str, assistant_id: str,
+                          instructions: Optional[str], message_id: Optional[int], channel_id: Optional[int],
+                          image_urls: Sequence[str]):
+        """Shadow backend-ի verdict-ը ստանալ և primary-ի հետ համեմատման համար պահել"""
+        # Without a dedicated shadow assistant the same assistant runs on the shadow backend
+        shadow_assistant = SHADOW_ASSISTANT_ID or assistant_id
+        try:
+            shadow_result, shadow_time = await self.shadow._analyze(
+                message_content, shadow_assistant, instructions, channel_id, image_urls
+            )
+            if shadow_result is not None:
+                self._spent(shadow_result.get("usage"), 'shadow', channel_id)
+            primary_result, primary_time = await primary
+        except asyncio.CancelledError:
+            return
+        except Exception as e:
+            logger.error(f"Shadow evaluation failed: {e}")
+            return
+        
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.db.log_shadow_evaluation,
+                str(message_id) if message_id is not None else None,
+                assistant_id, shadow_assistant,
+                primary_result.get("status") if primary_result else "error",
+                shadow_result.get("status") if shadow_result else "error",
+                primary_time, shadow_time
+            )
+        except Exception as e:
+            logger.error(f"Failed to store shadow evaluation: {e}")
+    
+    def _spent(self, usage: Optional[Dict], source: str, channel_id: Optional[int]):
+        """Verdict չտված run-ի token-ները usage_sink-ին փոխանցել"""
+        if not usage or self.usage_sink is None:
+            return
+        try:
+            self.usage_sink(usage, source, channel_id)
+        except Exception as e:
+            logger.error(f"Failed to charge {source} usage: {e}")
+    
+    async def _analyze(self, message_content: str, assistant_id: Optional[str] = None,
+                       instructions: Optional[str] = None, channel_id: Optional[int] = None,
+                       image_urls: Sequence[str] = ()) -> Tuple[Optional[Dict], float]:
+        """Մեկ Assistant run՝ ստեղծում, սպասում, պատասխան"""
         start_time = asyncio.get_event_loop().time()
         
         async with aiohttp.ClientSession() as session:
@@ -27,31 +142,59 @@ class OpenAIService:
                     "OpenAI-Beta": "assistants=v2"
                 }
                 
+                content = message_content
+                if image_urls:
+                    content = [{"type": "text", "text": message_content}] + [
+                        {"type": "image_url", "image_url": {"url": url}} for url in image_urls
+                    ]
+                thread = {
+                    "messages": [
+                        {
+                            "role": "user",
+                            "content": content
+                        }
+                    ]
+                }
                 payload = {
-                    "assistant_id": self.assistant_id,
-                    "thread": {
-                        "messages": [
-                            {
-                                "role": "user",
-                                "content": message_content
-                            }
-                        ]
-                    },
+                    "assistant_id": assistant_id or self.assistant_id,
                     "temperature": 0.4,
                     "top_p": 0.8
                 }
                 
                 logger.info(f"Sending request to OpenAI for content: {message_content[:100]}...")
                 
+                if instructions:
+                    # `instructions` would replace the assistant's prompt (and its JSON verdict format);
+                    # additional_instructions is only accepted on runs of an existing thread
+                    async with span("openai_create_thread"), session.post(
+                        f"{self.base_url}/threads",
+                        headers=headers,
+                        json=thread
+                    ) as resp:
+                        if resp.status != 200:
+                            error_text = await resp.text()
+                            logger.error(f"OpenAI API Error: {resp.status} - {error_text}")
+                            if self.record_metrics:
+                                OPENAI_ERRORS.inc()
+                            return None, 0
+                        thread_data = await resp.json()
+                    run_url = f"{self.base_url}/threads/{thread_data['id']}/runs"
+                    payload["additional_instructions"] = instructions
+                else:
+                    run_url = f"{self.base_url}/threads/runs"
+                    payload["thread"] = thread
+                
                 # Create run
-                async with session.post(
-                    f"{self.base_url}/threads/runs",
+                async with span("openai_create_run"), session.post(
+                    run_url,
                     headers=headers,
                     json=payload
                 ) as resp:
                     if resp.status != 200:
                         error_text = await resp.text()
                         logger.error(f"OpenAI API Error: {resp.status} - {error_text}")
+                        if self.record_metrics:
+                            OPENAI_ERRORS.inc()
                         return None, 0
                     
                     run_data = await resp.json()
@@ -60,21 +203,29 @@ class OpenAIService:
                     logger.info(f"Created run {run_id} in thread {thread_id}")
                 
                 # Wait for completion
-                result = await self._wait_for_completion(session, headers, thread_id, run_id)
+                result = await self._wait_for_completion(session, headers, thread_id, run_id, channel_id)
                 processing_time = asyncio.get_event_loop().time() - start_time
                 
                 if result:
                     logger.info(f"OpenAI response received in {processing_time:.2f}s")
+                    if self.record_metrics:
+                        OPENAI_LATENCY.observe(processing_time)
                     return result, processing_time
                 else:
+                    if self.record_metrics:
+                        OPENAI_ERRORS.inc()
                     return None, processing_time
                     
             except Exception as e:
                 logger.error(f"OpenAI API unexpected error: {e}")
+                if self.record_metrics:
+                    OPENAI_ERRORS.inc()
                 return None, 0
     
+    @traced("openai_wait")
     async def _wait_for_completion(self, session: aiohttp.ClientSession, headers: Dict, 
-                                  thread_id: str, run_id: str, max_polls: int = 30) -> Optional[Dict]:
+                                  thread_id: str, run_id: str, channel_id: Optional[int] = None,
+                                  max_polls: int = 30) -> Optional[Dict]:
         """Run-ի ավարտը սպասել"""
         poll_count = 0
         
@@ -90,17 +241,51 @@ class OpenAIService:
                 
                 logger.debug(f"Run status check #{poll_count}: {status}")
                 
+                if status in ("completed", "failed") and self.record_metrics:
+                    OPENAI_POLLS.observe(poll_count)
+                
                 if status == "completed":
-                    return await self._get_assistant_response(session, headers, thread_id)
+                    result = await self._get_assistant_response(session, headers, thread_id)
+                    # Token usage of the run, for cost accounting
+                    if not isinstance(result, dict):
+                        self._spent(run_status.get("usage"), 'openai_failed', channel_id)
+                    elif run_status.get("usage"):
+                        result["usage"] = run_status["usage"]
+                    return result
                 elif status == "failed":
                     logger.error(f"OpenAI run failed: {run_status}")
+                    self._spent(run_status.get("usage"), 'openai_failed', channel_id)
                     return None
                 
                 await asyncio.sleep(2)
         
+        if self.record_metrics:
+            OPENAI_POLLS.observe(poll_count)
         logger.error("OpenAI run timeout after maximum polls")
+        # Cancelling stops further spend; the run reports its usage only once it has stopped
+        try:
+            async with session.post(
+                f"{self.base_url}/threads/{thread_id}/runs/{run_id}/cancel",
+                headers=headers
+            ) as resp:
+                run_status = await resp.json() if resp.status == 200 else {}
+            for _ in range(self.CANCEL_POLLS):
+                if run_status.get("status") in self.TERMINAL_STATUSES:
+                    break
+                await asyncio.sleep(self.CANCEL_POLL_INTERVAL)
+                async with session.get(
+                    f"{self.base_url}/threads/{thread_id}/runs/{run_id}",
+                    headers=headers
+                ) as resp:
+                    run_status = await resp.json() if resp.status == 200 else {}
+            if run_status.get("status") not in self.TERMINAL_STATUSES:
+                logger.warning(f"Run {run_id} still {run_status.get('status')!r} after cancel; its tokens are not charged")
+            self._spent(run_status.get("usage"), 'openai_timeout', channel_id)
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+            logger.error(f"Failed to cancel timed-out run {run_id}: {e!r}")
         return None
     
+    @traced("openai_fetch_response")
     async def _get_assistant_response(self, session: aiohttp.ClientSession, 
                                     headers: Dict, thread_id: str) -> Optional[Dict]:
         """Assistant-ի պատասխանը ստանալ"""
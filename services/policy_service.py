@@ -0,0 +1,157 @@
+import asyncio
+import json
+from typing import Dict, FrozenSet, Optional
+from utils.logger import setup_logger
+from database.db_manager import DatabaseManager
+from config.settings import (
+    CHANNEL_ID, CHANNELS_CONFIG, ASSISTANT_ID, WEBHOOK_URL, POLICY_REFRESH_INTERVAL
+)
+
+logger = setup_logger(__name__)
+
+VALID_ACTIONS = frozenset({'dm', 'webhook', 'delete'})
+DEFAULT_ACTIONS = 'dm,webhook'
+# /policy value that clears a field (Discord does not send empty string options)
+CLEAR_VALUE = '-'
+
+class ChannelPolicy:
+    """Moderation settings of one channel"""
+
+    __slots__ = ('channel_id', 'guild_id', 'assistant_id', 'rules', 'webhook_url', 'actions', 'enabled')
+
+    def __init__(self, channel_id: int, guild_id: Optional[int], assistant_id: str,
+                 rules: Optional[str], webhook_url: Optional[str],
+                 actions: FrozenSet[str], enabled: bool):
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.assistant_id = assistant_id
+        self.rules = rules
+        self.webhook_url = webhook_url
+        self.actions = actions
+        self.enabled = enabled
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'ChannelPolicy':
+        """DB տողից policy ստեղծել՝ լռելյայն արժեքներով"""
+        # NULL means "use the default", an empty string means "none"
+        actions = row.get('actions')
+        webhook_url = row.get('webhook_url')
+        actions = frozenset(
+            a.strip() for a in (DEFAULT_ACTIONS if actions is None else actions).split(',')
+        ) & VALID_ACTIONS
+        return cls(
+            channel_id=int(row['channel_id']),
+            guild_id=int(row['guild_id']) if row.get('guild_id') else None,
+            assistant_id=row.get('assistant_id') or ASSISTANT_ID,
+            rules=row.get('rules') or None,
+            webhook_url=WEBHOOK_URL if webhook_url is None else webhook_url or None,
+            actions=actions,
+            enabled=bool(row.get('enabled', 1))
+        )
+
+class PolicyRegistry:
+    """channel_id -> ChannelPolicy map backed by the channel_policies table"""
+
+    def __init__(self, db: DatabaseManager, refresh_interval: float = POLICY_REFRESH_INTERVAL):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self._policies: Dict[int, ChannelPolicy] = {}
+        self._version: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.seed()
+        self.reload()
+
+    def get(self, channel_id: int, include_disabled: bool = False) -> Optional[ChannelPolicy]:
+        """Ալիքի policy-ն (None եթե ալիքը չի մոդերացվում)"""
+        policy = self._policies.get(channel_id)
+        if policy is None or not (policy.enabled or include_disabled):
+            return None
+        return policy
+
+    @property
+    def channel_ids(self):
+        return [cid for cid, policy in self._policies.items() if policy.enabled]
+
+    def seed(self):
+        """CHANNEL_ID-ն և CHANNELS_CONFIG ֆայլը DB-ում գրանցել (առկա policy-ները չեն փոխվում)"""
+        if CHANNEL_ID:
+            self.db.upsert_channel_policy(str(CHANNEL_ID), actions=DEFAULT_ACTIONS, overwrite=False)
+        if CHANNELS_CONFIG:
+            self.import_file(CHANNELS_CONFIG, overwrite=False)
+
+    def import_file(self, path: str, overwrite: bool = True) -> int:
+        """JSON ֆայլից policy-ները ներմուծել"""
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+
+        imported = 0
+        for entry in config.get('channels', []):
+            actions = entry.get('actions')
+            if isinstance(actions, list):
+                actions = ','.join(actions)
+            if self.db.upsert_channel_policy(
+                str(entry['channel_id']),
+                guild_id=str(entry['guild_id']) if entry.get('guild_id') else None,
+                assistant_id=entry.get('assistant_id'),
+                rules=entry.get('rules'),
+                webhook_url=entry.get('webhook_url'),
+                actions=DEFAULT_ACTIONS if actions is None else actions,
+                enabled=entry.get('enabled', True),
+                overwrite=overwrite
+            ):
+                imported += 1
+
+        logger.info(f"Imported {imported} channel policies from {path}")
+        return imported
+
+    def reload(self, force: bool = True) -> bool:
+        """Policy-ները DB-ից կարդալ, եթե փոխվել են"""
+        version = self.db.get_policies_version()
+        if not force and version == self._version:
+            return False
+
+        policies = {}
+        for row in self.db.get_channel_policies():
+            policy = ChannelPolicy.from_row(row)
+            policies[policy.channel_id] = policy
+
+        # Swap atomically so lookups never see a half-built map
+        self._policies = policies
+        self._version = version
+        logger.info(f"Loaded {len(self.channel_ids)} enabled channel policies")
+        return True
+
+    def update(self, channel_id: int, **fields) -> ChannelPolicy:
+        """Policy-ն փոխել DB-ում և անմիջապես կիրառել"""
+        self.db.upsert_channel_policy(str(channel_id), **fields)
+        self.reload()
+        return self._policies[channel_id]
+
+    def start(self):
+        """Պարբերական reload-ը գործարկել (այլ պրոցեսների փոփոխությունների համար)"""
+        if self.refresh_interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                self.reload(force=False)
+            except Exception as e:
+                logger.error(f"Policy reload failed: {e}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import channel policies into the database")
+    parser.add_argument('path', help="JSON file with a top-level 'channels' list")
+    args = parser.parse_args()
+
+    # Unlike startup seeding, an explicit import overwrites existing policies
+    PolicyRegistry(DatabaseManager(), refresh_interval=0).import_file(args.path, overwrite=True)
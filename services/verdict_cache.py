@@ -0,0 +1,111 @@
+import hashlib
+import struct
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from utils.logger import setup_logger
+from database.db_manager import DatabaseManager
+from config.settings import VERDICT_CACHE_SIZE, VERDICT_CACHE_TTL
+
+logger = setup_logger(__name__)
+
+STATUSES = ("approve", "reject", "needs_edit")
+# Warm state record: sha256 key, stored at, status index, feedback length (+ feedback bytes)
+_RECORD = struct.Struct('<32sdBI')
+
+def verdict_cache_key(content: str, assistant_id: str, instructions: Optional[str] = None) -> str:
+    """Cache-ի բանալին՝ բովանդակություն + assistant + կանոններ"""
+    digest = hashlib.sha256()
+    for part in (assistant_id or '', instructions or '', content or ''):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class VerdictCache:
+    """Two-level verdict cache: per-process LRU in front of the shared SQLite table"""
+
+    def __init__(self, db: DatabaseManager, max_size: int = VERDICT_CACHE_SIZE,
+                 ttl: float = VERDICT_CACHE_TTL):
+        self.db = db
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.stats = {"memory_hits": 0, "shared_hits": 0, "misses": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Verdict-ը գտնել (նախ հիշողությունում, հետո ընդհանուր DB-ում)"""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            stored_at, verdict = entry
+            if time.time() - stored_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return verdict
+            del self._entries[key]
+
+        verdict = self.db.get_cached_verdict(key, self.ttl)
+        if verdict is not None:
+            self.stats["shared_hits"] += 1
+            self._remember(key, verdict)
+            return verdict
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, verdict: Dict):
+        """Վերջնական verdict-ը պահել երկու մակարդակում"""
+        if not self.enabled or verdict.get("status") not in STATUSES:
+            return
+        verdict = {"status": verdict["status"], "feedback": verdict.get("feedback", "")}
+        self._remember(key, verdict)
+        self.db.put_cached_verdict(key, verdict["status"], verdict.get("feedback"))
+
+    def _remember(self, key: str, verdict: Dict):
+        self._entries[key] = (time.time(), verdict)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def dump_state(self) -> bytes:
+        """Հիշողության LRU-ն warm state-ի համար (հնից նոր)"""
+        parts = []
+        for key, (stored_at, verdict) in self._entries.items():
+            feedback = (verdict.get("feedback") or "").encode('utf-8')
+            parts.append(_RECORD.pack(bytes.fromhex(key), stored_at, STATUSES.index(verdict["status"]), len(feedback)))
+            parts.append(feedback)
+        return b''.join(parts)
+
+    def restore_state(self, data: memoryview, saved_at: float) -> int:
+        """Warm state-ի LRU-ն վերականգնել (ժամկետանցները բաց են թողնվում)"""
+        if not self.enabled:
+            return 0
+        now = time.time()
+        offset = 0
+        # Decoded in full first, so a section that fails halfway leaves the cache untouched
+        entries = []
+        while offset < len(data):
+            digest, stored_at, status, length = _RECORD.unpack_from(data, offset)
+            offset += _RECORD.size
+            if offset + length > len(data):
+                raise ValueError("truncated verdict cache record")
+            feedback = bytes(data[offset:offset + length]).decode('utf-8')
+            offset += length
+            if now - stored_at < self.ttl:
+                entries.append((digest.hex(), (stored_at, {"status": STATUSES[status], "feedback": feedback})))
+        self._entries.update(entries)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["shared_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
@@ -0,0 +1,20 @@
+"""Dummy settings so the bot modules import without a real .env"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_defaults = {
+    'DISCORD_TOKEN': 'test-token',
+    'CHANNEL_ID': '1',
+    'OPENAI_API_KEY': 'test-key',
+    'ASSISTANT_ID': 'asst_test',
+    'DB_FILE': os.path.join(tempfile.gettempdir(), 'quality_test.db'),
+    'LOG_FILE': os.path.join(tempfile.gettempdir(), 'quality_test.log'),
+    'LOG_LEVEL': 'WARNING',
+    'WARM_STATE_FILE': '',
+}
+
+for _key, _value in _defaults.items():
+    os.environ.setdefault(_key, _value)
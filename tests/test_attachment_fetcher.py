@@ -0,0 +1,68 @@
+import asyncio
+from aiohttp import web
+from utils.attachment_fetcher import AttachmentFetcher, AttachmentRef
+
+async def _serve(files, active):
+    """Serves `files[name]`; `active` tracks concurrent downloads"""
+    async def download(request):
+        name = request.match_info['name']
+        if name not in files:
+            return web.Response(status=404)
+        active['now'] += 1
+        active['max'] = max(active['max'], active['now'])
+        try:
+            await asyncio.sleep(0.02)
+            return web.Response(body=files[name])
+        finally:
+            active['now'] -= 1
+
+    app = web.Application()
+    app.router.add_get('/{name}', download)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+def _fetch(files, refs, **kwargs):
+    active = {'now': 0, 'max': 0}
+
+    async def run():
+        runner, base = await _serve(files, active)
+        fetcher = AttachmentFetcher(**kwargs)
+        try:
+            downloaded = await fetcher.fetch_all([
+                AttachmentRef(f"{base}/{name}", name, size) for name, size in refs
+            ])
+            result = [(name, fp._rolled, fp.read()) for name, fp in downloaded]
+            for _, fp in downloaded:
+                fp.close()
+            return result
+        finally:
+            await fetcher.close()
+            await runner.cleanup()
+    return asyncio.run(run()), active['max']
+
+def test_downloads_in_parallel_up_to_the_cap_and_keeps_order():
+    files = {f"{i}.png": bytes([i]) * 100 for i in range(6)}
+    result, concurrent = _fetch(files, [(name, 100) for name in files], concurrency=2,
+                                spool_threshold=1000, max_file_bytes=1000, budget_bytes=10_000)
+    assert [(name, data) for name, _, data in result] == list(files.items())
+    assert concurrent == 2
+
+def test_large_files_spool_to_disk():
+    files = {'small.png': b'a' * 10, 'big.png': b'b' * 5000}
+    result, _ = _fetch(files, [('small.png', 10), ('big.png', 5000)], spool_threshold=1000,
+                       max_file_bytes=10_000, budget_bytes=100_000)
+    assert [(name, rolled) for name, rolled, _ in result] == [('small.png', False), ('big.png', True)]
+
+def test_size_caps_and_failures_skip_attachments():
+    files = {'ok.png': b'x' * 100, 'huge.png': b'x' * 2000, 'lying.png': b'x' * 900, 'late.png': b'x' * 400}
+    result, _ = _fetch(files, [
+        ('ok.png', 100),
+        ('huge.png', 2000),     # over the per-file cap
+        ('lying.png', 100),     # sends more than Discord reported
+        ('missing.png', 100),   # 404
+        ('late.png', 400),      # over what is left of the DM budget
+    ], max_file_bytes=1000, budget_bytes=500, spool_threshold=1000)
+    assert [name for name, _, _ in result] == ['ok.png']
@@ -0,0 +1,79 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from services.backlog_catchup import BacklogCatchup
+
+class _Db:
+    def __init__(self, marks):
+        self.marks = dict(marks)
+
+    def get_high_water_marks(self):
+        return dict(self.marks)
+
+    def save_high_water_marks(self, marks):
+        self.marks.update(marks)
+
+    def is_message_logged(self, message_id):
+        return False
+
+class _Channel:
+    def __init__(self, channel_id, message_ids):
+        self.id = channel_id
+        self.messages = [SimpleNamespace(id=i, author=SimpleNamespace(bot=False),
+                                         created_at=datetime.now(timezone.utc)) for i in message_ids]
+
+    async def history(self, limit, after, before, oldest_first):
+        for message in [m for m in self.messages if after.id < m.id < before.id][:limit]:
+            yield message
+
+def _catchup(channel, marks, moderate, max_messages=100):
+    bot = SimpleNamespace(get_channel=lambda channel_id: channel if channel_id == channel.id else None)
+    registry = SimpleNamespace(channel_ids=[channel.id], get=lambda channel_id: None)
+    return BacklogCatchup(bot, _Db(marks), registry, moderate, concurrency=4, rate=0, max_messages=max_messages)
+
+def test_mark_stops_before_a_failed_message():
+    async def moderate(message, policy):
+        # Later messages finish first, the failed one never does
+        await asyncio.sleep(0.001 * (20 - message.id))
+        if message.id == 13:
+            raise RuntimeError("analysis failed")
+
+    channel = _Channel(7, range(11, 18))
+    catchup = _catchup(channel, {7: 10}, moderate)
+
+    async def run():
+        catchup.schedule()
+        catchup.record(7, 10**18)  # a live message during catch-up
+        await catchup._catchup_task
+
+    asyncio.run(run())
+    assert catchup.db.marks[7] == 12
+
+def test_live_mark_applies_after_a_complete_catch_up():
+    async def moderate(message, policy):
+        await asyncio.sleep(0)
+
+    channel = _Channel(7, range(11, 18))
+    catchup = _catchup(channel, {7: 10}, moderate)
+
+    async def run():
+        catchup.schedule()
+        catchup.record(7, 10**18)
+        await catchup._catchup_task
+
+    asyncio.run(run())
+    assert catchup.db.marks[7] == 10**18
+
+def test_truncated_history_is_reported(caplog):
+    moderated = []
+
+    async def moderate(message, policy):
+        moderated.append(message.id)
+
+    channel = _Channel(7, range(11, 18))
+    catchup = _catchup(channel, {7: 10}, moderate, max_messages=3)
+
+    asyncio.run(catchup.catch_up())
+    assert moderated == [11, 12, 13]
+    assert catchup.db.marks[7] == 13
+    assert any("14.." in record.getMessage() for record in caplog.records)
@@ -0,0 +1,80 @@
+import asyncio
+import discord
+from discord import app_commands
+from utils.command_sync import command_tree_hash, sync_if_changed
+
+def _tree():
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
+    synced = []
+
+    async def sync():
+        synced.append(1)
+        return tree.get_commands()
+    tree.sync = sync
+
+    @tree.command(name="stats", description="Statistics")
+    async def stats(interaction: discord.Interaction):
+        pass
+    return tree, synced
+
+def test_sync_runs_only_when_the_definitions_change(tmp_path):
+    path = str(tmp_path / 'commands.sha256')
+    tree, synced = _tree()
+
+    assert asyncio.run(sync_if_changed(tree, path)) == 1
+    assert asyncio.run(sync_if_changed(tree, path)) is None
+    assert len(synced) == 1
+
+    @tree.command(name="usage", description="Usage")
+    async def usage(interaction: discord.Interaction):
+        pass
+    assert asyncio.run(sync_if_changed(tree, path)) == 2
+    assert len(synced) == 2
+
+def test_a_failed_sync_is_retried_next_start(tmp_path):
+    path = str(tmp_path / 'commands.sha256')
+    tree, _ = _tree()
+
+    async def failing_sync():
+        raise discord.HTTPException(type('Response', (), {'status': 429, 'reason': 'rate limited'})(), 'slow down')
+    tree.sync = failing_sync
+    try:
+        asyncio.run(sync_if_changed(tree, path))
+    except discord.HTTPException:
+        pass
+    assert not (tmp_path / 'commands.sha256').exists()
+
+def test_hash_does_not_depend_on_registration_order():
+    first, _ = _tree()
+    second = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
+
+    @second.command(name="usage", description="Usage")
+    async def usage(interaction: discord.Interaction):
+        pass
+
+    @first.command(name="usage", description="Usage")
+    async def usage_again(interaction: discord.Interaction):
+        pass
+
+    @second.command(name="stats", description="Statistics")
+    async def stats(interaction: discord.Interaction):
+        pass
+    assert command_tree_hash(first) == command_tree_hash(second)
+
+def test_startup_work_runs_once_across_reconnects(monkeypatch):
+    import main
+    calls = []
+
+    async def sync(tree, path):
+        calls.append('sync')
+        return None
+    monkeypatch.setattr(main, 'sync_if_changed', sync)
+    monkeypatch.setattr(main.db, 'cleanup_old_logs', lambda days: calls.append('cleanup'))
+    monkeypatch.setattr(main.db, 'cleanup_verdict_cache', lambda ttl: None)
+    monkeypatch.setattr(main.backlog_catchup, 'schedule', lambda: calls.append('catchup'))
+    monkeypatch.setattr(main.classifier_trainer, 'start', lambda: None)
+    monkeypatch.setitem(main.startup_state, 'done', False)
+
+    asyncio.run(main.on_ready())
+    asyncio.run(main.on_ready())
+    assert calls == ['cleanup', 'catchup', 'sync']
@@ -0,0 +1,84 @@
+import sqlite3
+import threading
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager, content_hash, decode_content
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    return DatabaseManager()
+
+def test_identical_texts_are_stored_once(db):
+    for message_id in ('1', '2', '3'):
+        db.log_message_event(message_id, 'u', 'user', 'c', 's', 'same spam', [], 'reject', 'No spam', 'deleted')
+
+    conn = sqlite3.connect(db.db_file)
+    contents = conn.execute("SELECT hash, data FROM contents ORDER BY id").fetchall()
+    ids = conn.execute("SELECT DISTINCT content_id, feedback_id FROM message_logs").fetchall()
+    conn.close()
+
+    assert [h for h, _ in contents] == [content_hash('same spam'), content_hash('No spam')]
+    assert decode_content(contents[0][1]) == 'same spam'
+    assert len(ids) == 1
+
+class _RacingCursor:
+    """Cursor whose first lookup misses, as if another process inserted the text right after it"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.missed = False
+
+    def execute(self, sql, params=()):
+        return self.cursor.execute(sql, params)
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if not self.missed:
+            self.missed = True
+            return None
+        return row
+
+def test_store_content_when_another_process_stored_it_first(db):
+    other = sqlite3.connect(db.db_file)
+    existing = DatabaseManager._store_content(other.cursor(), 'hello')
+    other.commit()
+    other.close()
+
+    conn = sqlite3.connect(db.db_file)
+    assert DatabaseManager._store_content(_RacingCursor(conn.cursor()), 'hello') == existing
+    conn.close()
+
+def test_none_is_not_stored(db):
+    conn = sqlite3.connect(db.db_file)
+    assert DatabaseManager._store_content(conn.cursor(), None) is None
+    conn.close()
+
+def test_cleanup_cannot_sweep_a_content_row_a_new_log_is_reusing(db, monkeypatch):
+    db.log_message_event('1', 'u', 'user', 'c', 's', 'old text', [], 'approve', None, 'none')
+    conn = sqlite3.connect(db.db_file)
+    conn.execute("UPDATE message_logs SET timestamp = datetime('now', '-2 days')")
+    conn.commit()
+    conn.close()
+
+    store = DatabaseManager._store_content
+    sweeper = []
+
+    def racing_store(cursor, text):
+        content_id = store(cursor, text)
+        if not sweeper:
+            # The sweep starts right after the lookup found the soon-to-be-orphaned row
+            sweeper.append(threading.Thread(target=db.cleanup_old_logs, args=(1,)))
+            sweeper[0].start()
+            sweeper[0].join(0.3)
+        return content_id
+    monkeypatch.setattr(DatabaseManager, '_store_content', staticmethod(racing_store))
+
+    db.log_message_event('2', 'u', 'user', 'c', 's', 'old text', [], 'approve', None, 'none')
+    sweeper[0].join()
+
+    conn = sqlite3.connect(db.db_file)
+    rows = conn.execute('''SELECT m.message_id, c.data FROM message_logs m
+                           LEFT JOIN contents c ON c.id = m.content_id''').fetchall()
+    conn.close()
+    assert [(message_id, decode_content(data)) for message_id, data in rows] == [('2', 'old text')]
@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+import discord
+from database import db_manager
+from database.db_manager import DatabaseManager
+from benchmarks import fake_gateway
+
+GUILD_ID, CHANNEL_ID = 10, 1
+
+@pytest.fixture
+def main(tmp_path, monkeypatch):
+    import main
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(main, 'db', DatabaseManager())
+    fake_gateway.install(main.bot, GUILD_ID, CHANNEL_ID)
+    moderated = []
+
+    async def moderate_message(message, policy, revision_of=None):
+        moderated.append((message.id, message.content, revision_of))
+    monkeypatch.setattr(main, 'moderate_message', moderate_message)
+    main.moderated = moderated
+    return main
+
+def _edit(main, message_id, content, bot=False):
+    """MESSAGE_UPDATE of a message that is not in the message cache"""
+    data = fake_gateway.message_payload(CHANNEL_ID, GUILD_ID, 1000, "user", content)
+    data["id"] = str(message_id)
+    data["author"]["bot"] = bot
+    state = main.bot._connection
+    message = discord.Message(state=state, channel=state._get_guild(GUILD_ID).get_channel(CHANNEL_ID), data=data)
+    asyncio.run(main.on_raw_message_edit(discord.RawMessageUpdateEvent(data, message)))
+
+def _log(main, message_id, content):
+    main.db.log_message_event(str(message_id), '1000', 'user', str(CHANNEL_ID), str(GUILD_ID),
+                              content, [], 'approve', '', 'approved')
+
+def test_uncached_edit_that_swaps_an_invite_is_re_moderated(main):
+    _log(main, 555, "join discord.gg/abc")
+    _edit(main, 555, "join discord.gg/xyz")
+    assert main.moderated == [(555, "join discord.gg/xyz", 1)]
+
+def test_trivial_edit_is_skipped(main):
+    _log(main, 556, "hello world")
+    _edit(main, 556, "Hello, world!")
+    assert main.moderated == []
+
+def test_edit_of_a_message_never_moderated_is_moderated(main):
+    _edit(main, 557, "posted before the bot started")
+    assert main.moderated == [(557, "posted before the bot started", None)]
+
+def test_bot_edits_are_ignored(main):
+    _edit(main, 558, "embed update", bot=True)
+    assert main.moderated == []
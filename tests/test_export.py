@@ -0,0 +1,56 @@
+import glob
+import gzip
+import json
+import os
+import subprocess
+import sys
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager
+from database.export import export
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    return DatabaseManager()
+
+def _log(db, message_id):
+    db.log_message_event(str(message_id), 'u', 'user', 'c', 's', f'text {message_id}', [], 'approve', '', 'approved')
+
+def _exported(out_dir):
+    rows = []
+    for path in sorted(glob.glob(os.path.join(out_dir, 'date=*', '*.jsonl.gz'))):
+        with gzip.open(path, 'rt', encoding='utf-8') as fp:
+            rows.extend(json.loads(line) for line in fp)
+    return rows
+
+def test_incremental_and_full_exports(db, tmp_path):
+    out_dir = str(tmp_path / 'exports')
+    for message_id in (1, 2):
+        _log(db, message_id)
+    assert export(db.db_file, out_dir, fmt='jsonl')['rows'] == 2
+
+    _log(db, 3)
+    assert export(db.db_file, out_dir, fmt='jsonl')['rows'] == 1
+    assert [row['content'] for row in _exported(out_dir)] == ['text 1', 'text 2', 'text 3']
+
+    # A stale part from an earlier layout must not survive a full export
+    stale = glob.glob(os.path.join(out_dir, 'date=*'))[0]
+    with gzip.open(os.path.join(stale, 'part-999999999999.jsonl.gz'), 'wt') as fp:
+        fp.write('{"id": 999}\n')
+
+    assert export(db.db_file, out_dir, fmt='jsonl', full=True)['rows'] == 3
+    assert [row['id'] for row in _exported(out_dir)] == [1, 2, 3]
+
+def test_cli_needs_no_bot_credentials(db, tmp_path):
+    _log(db, 1)
+    env = {key: value for key, value in os.environ.items()
+           if key not in ('DISCORD_TOKEN', 'CHANNEL_ID', 'OPENAI_API_KEY', 'ASSISTANT_ID')}
+    env['DB_FILE'] = db.db_file
+    completed = subprocess.run([sys.executable, '-m', 'database.export', str(tmp_path / 'out'), '--format', 'jsonl'],
+                               cwd=str(tmp_path), env={**env, 'PYTHONPATH': ROOT},
+                               capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
+    assert 'Exported rows: 1' in completed.stdout
@@ -0,0 +1,25 @@
+from utils.helpers import EMBED_CHAR_BUDGET, FEEDBACK_TITLE, MAX_DM_EMBEDS, feedback_embeds
+
+def test_ten_long_feedbacks_fit_discords_limit():
+    embeds = feedback_embeds(["x" * 5000] * MAX_DM_EMBEDS)
+
+    assert len(embeds) == MAX_DM_EMBEDS
+    # discord.Embed.__len__ counts title, description, fields and footer like Discord does
+    assert sum(len(embed) for embed in embeds) <= EMBED_CHAR_BUDGET
+    assert all(embed.description.endswith("...") for embed in embeds)
+
+def test_single_feedback_keeps_most_of_the_budget():
+    [embed] = feedback_embeds(["y" * 10000])
+
+    assert len(embed) <= EMBED_CHAR_BUDGET
+    assert len(embed.description) == EMBED_CHAR_BUDGET - len(FEEDBACK_TITLE)
+
+def test_short_and_missing_feedback_are_kept_as_is():
+    embeds = feedback_embeds(["Too short", None])
+
+    assert [embed.description for embed in embeds] == ["Too short", ""]
+    assert all(embed.title == FEEDBACK_TITLE for embed in embeds)
+
+def test_more_than_ten_feedbacks_are_capped():
+    assert len(feedback_embeds(["a"] * 15)) == MAX_DM_EMBEDS
+    assert feedback_embeds([]) == []
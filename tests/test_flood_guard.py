@@ -0,0 +1,106 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from discord.utils import time_snowflake
+from services.flood_guard import FloodGuard, RateWindow, _Raid, burst_signature
+
+def test_rate_window_counts_the_last_seconds():
+    window = RateWindow(10)
+    assert [window.add(100) for _ in range(3)] == [1, 2, 3]
+    assert window.add(105) == 4
+    assert window.count(109) == 4
+    # Second 100 leaves the window at 110, second 105 at 115
+    assert window.count(110) == 1
+    assert window.count(115) == 0
+
+def test_rate_window_clears_after_a_long_gap():
+    window = RateWindow(5)
+    for second in range(5):
+        window.add(second)
+    assert window.count(4) == 5
+    assert window.add(1000) == 1
+    assert sum(window.counts) == window.total == 1
+
+def test_late_events_count_in_the_newest_slot():
+    window = RateWindow(5)
+    window.add(50)
+    assert window.add(45) == 2
+    assert window.count(54) == 2
+    assert window.count(55) == 0
+
+def test_rate_window_matches_a_naive_count():
+    window = RateWindow(7)
+    events = []
+    for second in (1, 1, 2, 5, 8, 8, 9, 13, 14, 14, 20, 21, 30, 31, 31, 32):
+        events.append(second)
+        assert window.add(second) == sum(1 for s in events if second - 7 < s <= second)
+
+def test_burst_signature_ignores_noise_and_keeps_attachments():
+    assert burst_signature("Join <@123> now 42") == burst_signature("join <@456> NOW 7")
+    first = burst_signature("", (("https://cdn/1", "raid.png", 2048),))
+    assert first == burst_signature("", (("https://cdn/2", "RAID.png", 2048),))
+    assert first != burst_signature("", (("https://cdn/3", "raid.png", 4096),))
+    assert burst_signature("") == ""
+
+class _Job:
+    def __init__(self, message_id, user_id, content, attachments=()):
+        self.message_id = message_id
+        self.user_id = user_id
+        self.channel_id = 1
+        self.content = content
+        self.attachments = attachments
+
+def test_raid_groups_image_only_messages_by_image():
+    guard = FloodGuard(window=60, user_messages=0, raid_authors=2, cooldown=60, action='representative')
+    analysed = []
+
+    async def analyze(job):
+        analysed.append(job.message_id)
+        return {"status": "reject" if job.attachments[0][1] == "bad.png" else "approve", "feedback": ""}, 0.1
+
+    async def run():
+        base = time_snowflake(datetime.now(timezone.utc))
+        jobs = [_Job(base + i, 100 + i, "", (("u", name, 10),))
+                for i, name in enumerate(("a.png", "b.png", "bad.png", "good.png", "bad.png", "good.png"))]
+        return [await guard.analyze(job, analyze) for job in jobs]
+
+    results = asyncio.run(run())
+    # Raid mode starts with the second author; the repeated images share the earlier verdicts
+    assert [result["status"] for result, _ in results[2:]] == ["reject", "approve", "reject", "approve"]
+    assert [result["source"] for result, _ in results[4:]] == ["raid_burst", "raid_burst"]
+
+def test_raids_expire_without_new_messages():
+    guard = FloodGuard(raid_authors=2)
+    guard.EXPIRE_INTERVAL = 0.01
+
+    async def run():
+        guard.start()
+        guard.raids[1] = _Raid(time.monotonic(), time.monotonic() + 0.02)
+        await asyncio.sleep(0.1)
+        await guard.stop()
+
+    asyncio.run(run())
+    assert guard.raids == {}
+
+def test_authors_count_in_every_channel_they_post_in():
+    guard = FloodGuard(window=60, user_messages=0, raid_authors=3, cooldown=60)
+    now = time.monotonic()
+    # Three users move from channel 1 to channel 2 within one window
+    for channel_id in (1, 2):
+        raids = [guard.observe(user_id, channel_id, 1000.0 + channel_id, now)[1] for user_id in (10, 11, 12)]
+        assert raids[:2] == [None, None] and raids[2] is not None
+    # A repeat message in the same channel is not a new author
+    assert guard._channels[2].count(1002) == 3
+    guard.observe(10, 2, 1003.0, now)
+    assert guard._channels[2].count(1003) == 3
+    # Once outside the window the user counts again
+    guard.observe(10, 2, 1070.0, now)
+    assert guard._channels[2].count(1070) == 1
+
+def test_channel_authors_survive_a_restart():
+    guard = FloodGuard(window=60, user_messages=0, raid_authors=3, cooldown=60)
+    second = time.time()
+    guard.observe(10, 1, second, time.monotonic())
+    restored = FloodGuard(window=60, user_messages=0, raid_authors=3, cooldown=60)
+    restored.restore_state(memoryview(guard.dump_state()), time.time())
+    assert restored._authors == {(1, 10): int(second)}
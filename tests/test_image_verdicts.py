@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager
+from services import moderation_worker
+from services.moderation_worker import LocalModeration, ModerationJob
+from services.openai_service import OpenAIService
+from services.verdict_cache import VerdictCache
+from benchmarks.stub_openai import StubOpenAI, start_stub
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    return DatabaseManager()
+
+def _analyze(db, job):
+    async def run():
+        runner, base_url = await start_stub(StubOpenAI())
+        moderation = LocalModeration(db, OpenAIService(base_url=base_url), VerdictCache(db))
+        moderation.image_reposts.enabled = True
+
+        async def hash_images(attachments):
+            return [0x1234 + i for i, _ in enumerate(attachments)]
+        moderation.image_reposts.hash_images = hash_images
+        try:
+            result, _ = await moderation.analyze(job)
+            return result, moderation.image_reposts.index.lookup(0x1234)
+        finally:
+            await moderation.stop()
+            await runner.cleanup()
+    return asyncio.run(run())
+
+def _job(content):
+    return ModerationJob(1, 2, 3, 4, 'user', content,
+                         (('https://cdn.example/a.png', 'a.png', 100),), 'asst_test', None)
+
+def test_text_verdicts_are_not_remembered_for_images(db):
+    result, remembered = _analyze(db, _job('buy my spam'))
+    assert result['status'] == 'reject'
+    assert remembered is None
+
+def test_verdicts_about_the_text_are_not_remembered_for_images(db, monkeypatch):
+    monkeypatch.setattr(moderation_worker, 'OPENAI_IMAGE_INPUT', True)
+    result, remembered = _analyze(db, _job('buy my spam'))
+    assert result['status'] == 'reject'
+    assert remembered is None
+
+def test_verdicts_on_images_with_a_trivial_caption_are_remembered(db, monkeypatch):
+    monkeypatch.setattr(moderation_worker, 'OPENAI_IMAGE_INPUT', True)
+    result, remembered = _analyze(db, _job('👀 !!'))
+    assert remembered == {'status': result['status'], 'feedback': result['feedback']}
+
+def test_image_only_messages_are_not_downloaded_while_the_index_is_empty(db):
+    hashed = []
+
+    async def run():
+        moderation = LocalModeration(db, OpenAIService(base_url='http://127.0.0.1:9'), VerdictCache(db))
+        moderation.image_reposts.enabled = True
+
+        async def hash_images(attachments):
+            hashed.append(attachments)
+            return [0x1234]
+        moderation.image_reposts.hash_images = hash_images
+        try:
+            first, _ = await moderation.analyze(_job(''))
+            moderation.image_reposts.remember([0x1234], {'status': 'reject', 'feedback': 'spam'})
+            second, _ = await moderation.analyze(_job(''))
+            return first, second
+        finally:
+            await moderation.stop()
+
+    first, second = asyncio.run(run())
+    assert first['source'] == 'attachment_policy'
+    assert second['source'] == 'image_repost' and second['status'] == 'reject'
+    assert len(hashed) == 1
@@ -0,0 +1,69 @@
+import random
+import sqlite3
+from datetime import datetime, timedelta
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager
+from utils.latency_sketch import LatencySketch, MIN_SECONDS, RELATIVE_ACCURACY
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+def _sketch(values):
+    sketch = LatencySketch()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+def test_quantiles_are_within_the_relative_accuracy():
+    rng = random.Random(1)
+    values = [rng.lognormvariate(0, 1.5) for _ in range(20000)]
+    sketch = _sketch(values)
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99, 0.999):
+        exact = _exact_quantile(values, q)
+        assert sketch.quantile(q) == pytest.approx(exact, rel=RELATIVE_ACCURACY)
+    assert sketch.quantile(1.0) == max(values)
+    assert sketch.mean == pytest.approx(sum(values) / len(values))
+
+def test_merge_equals_one_sketch_of_all_values():
+    rng = random.Random(2)
+    first = [rng.expovariate(2) for _ in range(5000)]
+    second = [rng.expovariate(0.1) for _ in range(3000)]
+
+    merged = _sketch(first)
+    merged.merge(_sketch(second))
+    combined = _sketch(first + second)
+
+    assert merged.buckets == combined.buckets
+    assert merged.count == combined.count == 8000
+    assert merged.max == combined.max
+    for q in (0.5, 0.95, 0.99):
+        assert merged.quantile(q) == combined.quantile(q)
+
+def test_tiny_values_and_empty_sketches():
+    sketch = LatencySketch()
+    assert sketch.quantile(0.5) is None and sketch.mean is None
+    sketch.add(0.0)
+    sketch.add(MIN_SECONDS / 10)
+    assert sketch.quantile(0.99) == MIN_SECONDS
+
+def test_bytes_round_trip():
+    sketch = _sketch([0.05, 0.2, 0.2, 3.5, 120.0])
+    restored = LatencySketch.from_bytes(sketch.to_bytes())
+    assert restored.buckets == sketch.buckets
+    assert (restored.count, restored.total, restored.max) == (sketch.count, sketch.total, sketch.max)
+
+def test_cleanup_prunes_old_sketches(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    db = DatabaseManager()
+    data = _sketch([0.1]).to_bytes()
+    old = (datetime.now() - timedelta(days=31)).strftime('%Y-%m-%d %H:00')
+    recent = datetime.now().strftime('%Y-%m-%d %H:00')
+    db.save_latency_sketches([(old, 'openai', 1, data), (recent, 'openai', 1, data)])
+
+    db.cleanup_old_logs(30)
+
+    conn = sqlite3.connect(db.db_file)
+    assert conn.execute("SELECT hour FROM latency_sketches").fetchall() == [(recent,)]
+    conn.close()
@@ -0,0 +1,89 @@
+import math
+import os
+import pickle
+import random
+import pytest
+from services import local_classifier
+from services.local_classifier import LocalClassifier, NaiveBayesModel, train
+
+APPROVE_WORDS = "hello friends thanks great photo nice weekend meeting lunch question help".split()
+REJECT_WORDS = "buy cheap pills casino crypto discount free nitro click offer win".split()
+
+def _rows(n, rng, noise=False):
+    rows = []
+    for i in range(n):
+        status = 'reject' if rng.random() < 0.4 else 'approve'
+        words = REJECT_WORDS if status == 'reject' else APPROVE_WORDS
+        text = " ".join(rng.choice(words) for _ in range(6)) + f" n{i}"
+        if noise:
+            status = rng.choice(('approve', 'reject'))
+        rows.append((i + 1, text, status))
+    return rows
+
+@pytest.fixture(scope='module')
+def model():
+    return train(_rows(600, random.Random(1)), frozenset({'approve', 'reject'}), 0.95, min_rows=100)
+
+def test_calibrated_threshold_reaches_the_target_precision(model):
+    report = model.report
+    assert math.isfinite(model.threshold)
+    assert report['decided'] >= local_classifier.MIN_DECISIONS
+    assert report['precision'] >= 0.95
+    assert report['coverage'] > 0.5
+    assert model.max_row_id == 600
+
+def test_nothing_is_decided_when_no_threshold_reaches_the_precision(tmp_path):
+    noisy = train(_rows(600, random.Random(2), noise=True), frozenset({'approve', 'reject'}), 0.99, min_rows=100)
+    assert noisy.threshold == math.inf
+    assert noisy.report['decided'] == 0 and noisy.report['precision'] is None
+
+    path = str(tmp_path / 'model.pkl')
+    noisy.save(path)
+    classifier = LocalClassifier(path, enabled=True, labels=frozenset({'approve', 'reject'}))
+    classifier.reload()
+    assert classifier.predict(" ".join(REJECT_WORDS)) is None
+
+def test_training_needs_enough_distinct_messages():
+    rows = [(i, "same text", 'approve') for i in range(500)]
+    with pytest.raises(ValueError):
+        train(rows, min_rows=100)
+
+def test_only_confident_verdicts_of_allowed_labels_are_given(model, tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    model.save(path)
+    classifier = LocalClassifier(path, enabled=True, labels=frozenset({'approve'}))
+    classifier.reload()
+    assert classifier.predict("hello friends thanks great photo nice weekend")["status"] == 'approve'
+    # Confident, but 'reject' is not a label the bot lets the model decide
+    assert classifier.predict("buy cheap pills casino crypto discount free") is None
+
+def test_reload_skips_models_of_another_version(model, tmp_path):
+    path = str(tmp_path / 'model.pkl')
+    model.save(path)
+    classifier = LocalClassifier(path, enabled=True)
+    classifier.reload()
+    loaded = classifier.model
+    assert loaded is not None and loaded.threshold == model.threshold
+
+    with open(path, 'wb') as f:
+        pickle.dump({"version": local_classifier.MODEL_VERSION + 1, **model.__dict__}, f)
+    os.utime(path, (1, 1))
+    classifier.reload()
+    # The old model keeps answering
+    assert classifier.model is loaded
+    with pytest.raises(ValueError):
+        NaiveBayesModel.load(path)
+
+def test_reload_only_reads_a_changed_file(model, tmp_path, monkeypatch):
+    path = str(tmp_path / 'model.pkl')
+    model.save(path)
+    classifier = LocalClassifier(path, enabled=True)
+    loads = []
+    load = NaiveBayesModel.load
+    monkeypatch.setattr(NaiveBayesModel, 'load', classmethod(lambda cls, p: loads.append(p) or load(p)))
+    classifier.reload()
+    classifier.reload()
+    assert len(loads) == 1
+    os.utime(path, (2, 2))
+    classifier.reload()
+    assert len(loads) == 2
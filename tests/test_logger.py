@@ -0,0 +1,58 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import sys
+from utils import logger as log_module
+from utils.logger import JsonFormatter, _DeferredQueueHandler, _build_file_handler, _gzip_rotator
+
+def _record(msg, *args, exc_info=None, **extra):
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+def test_json_lines_carry_the_extra_fields():
+    line = JsonFormatter().format(_record("Message %s deleted", 42, message_id=42, processing_time=1.5,
+                                          unrelated='x'))
+    entry = json.loads(line)
+    assert entry['msg'] == "Message 42 deleted"
+    assert entry['message_id'] == 42 and entry['processing_time'] == 1.5
+    assert 'unrelated' not in entry and entry['level'] == 'INFO'
+
+def test_queue_handler_defers_formatting_to_the_listener():
+    records = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        handler.handle(_record("user %s", "anna", exc_info=sys.exc_info()))
+    record = records.get_nowait()
+    # Arguments are resolved on the caller, the traceback is formatted later on the listener thread
+    assert record.msg == "user anna" and record.args is None
+    assert record.exc_info is not None and record.exc_text is None
+
+def test_size_rotation_gzips_old_files(tmp_path, monkeypatch):
+    path = str(tmp_path / 'bot.log')
+    monkeypatch.setattr(log_module, 'LOG_FILE', path)
+    monkeypatch.setattr(log_module, 'LOG_ROTATION', 'size')
+    monkeypatch.setattr(log_module, 'LOG_MAX_BYTES', 200)
+    monkeypatch.setattr(log_module, 'LOG_BACKUP_COUNT', 2)
+    handler = _build_file_handler()
+    try:
+        for i in range(20):
+            handler.emit(_record(f"line {i} " + "x" * 40))
+    finally:
+        handler.close()
+
+    assert sorted(os.listdir(tmp_path)) == ['bot.log', 'bot.log.1.gz', 'bot.log.2.gz']
+    with gzip.open(path + '.1.gz', 'rt') as f:
+        assert 'line' in f.read()
+
+def test_gzip_rotator_replaces_the_source(tmp_path):
+    source = tmp_path / 'a.log'
+    source.write_text("hello\n")
+    _gzip_rotator(str(source), str(tmp_path / 'a.log.1.gz'))
+    assert not source.exists()
+    with gzip.open(tmp_path / 'a.log.1.gz', 'rt') as f:
+        assert f.read() == "hello\n"
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import pickle
+import subprocess
+import sys
+import types
+from services.moderation_worker import ModerationJob
+from services.policy_service import ChannelPolicy
+from utils.attachment_fetcher import AttachmentRef
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _message(attachments=()):
+    return types.SimpleNamespace(
+        id=10, content='hello', guild=types.SimpleNamespace(id=3, shard_id=0),
+        channel=types.SimpleNamespace(id=2), author=types.SimpleNamespace(id=4, name='user', bot=False),
+        attachments=[types.SimpleNamespace(url=url, filename=name, size=size) for url, name, size in attachments],
+    )
+
+def _policy():
+    return ChannelPolicy(2, 3, 'asst', 'be nice', None, frozenset({'delete'}), True)
+
+def test_job_keeps_only_what_moderation_needs():
+    job = ModerationJob.from_message(_message([('https://cdn.example/a.png', 'a.png', 100)]), _policy())
+
+    assert not hasattr(job, '__dict__')
+    assert job.attachments == (AttachmentRef('https://cdn.example/a.png', 'a.png', 100),)
+    assert job.attachment_urls == ['https://cdn.example/a.png']
+    assert (job.message_id, job.channel_id, job.guild_id, job.user_id) == (10, 2, 3, 4)
+    assert (job.assistant_id, job.rules) == ('asst', 'be nice')
+
+def test_job_round_trips_as_a_plain_tuple():
+    job = ModerationJob.from_message(_message([('https://cdn.example/a.png', 'a.png', 100)]), _policy())
+    values = pickle.loads(pickle.dumps(job.to_tuple()))
+    copy = ModerationJob.from_tuple(values)
+
+    assert copy.to_tuple() == job.to_tuple()
+    assert copy.attachments[0].filename == 'a.png'
+
+def _bot_options(tmp_path, **env):
+    script = (
+        "import json, main\n"
+        "state = main.bot._connection\n"
+        "print(json.dumps([main.bot.intents.value, state.max_messages, state.member_cache_flags.value, "
+        "state._chunk_guilds]))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, timeout=60,
+        env={**os.environ, 'DB_FILE': str(tmp_path / 'bot.db'), 'LOG_FILE': str(tmp_path / 'bot.log'),
+             'WARM_STATE_FILE': '', **env},
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_low_memory_profile_trims_intents_and_caches(tmp_path):
+    import discord
+    intents, max_messages, member_cache, chunk = _bot_options(
+        tmp_path, LOW_MEMORY='true', LOW_MEMORY_MAX_MESSAGES='25')
+
+    expected = discord.Intents.none()
+    expected.guilds = expected.guild_messages = expected.message_content = True
+    assert intents == expected.value
+    assert max_messages == 25
+    assert member_cache == discord.MemberCacheFlags.none().value
+    assert chunk is False
+
+    assert _bot_options(tmp_path, LOW_MEMORY='true', LOW_MEMORY_MAX_MESSAGES='0')[1] is None
+
+def test_default_profile_keeps_the_default_intents(tmp_path):
+    import discord
+    intents, max_messages, _, _ = _bot_options(tmp_path, LOW_MEMORY='false')
+
+    expected = discord.Intents.default()
+    expected.message_content = True
+    assert intents == expected.value
+    assert max_messages == 1000
+
+def test_low_memory_moderation_runs_detached_from_the_event(monkeypatch):
+    import main
+    state = {}
+
+    async def moderate():
+        await state['release'].wait()
+        state['moderated'] = True
+
+    async def process_commands(message):
+        pass
+
+    monkeypatch.setattr(main, 'LOW_MEMORY', True)
+    monkeypatch.setattr(main, 'policy_registry', types.SimpleNamespace(get=lambda channel_id: _policy()))
+    monkeypatch.setattr(main, 'moderate_message', lambda message, policy: moderate())
+    monkeypatch.setattr(main.bot, 'process_commands', process_commands)
+    monkeypatch.setattr(main.backlog_catchup, 'record', lambda channel_id, message_id: None)
+    monkeypatch.setitem(main.startup_state, 'first_moderated', True)
+
+    async def scenario():
+        state['release'] = asyncio.Event()
+        await main.on_message(_message())
+        pending = 10 in main.moderation_tasks and 'moderated' not in state
+        state['release'].set()
+        await main.moderation_tasks[10]
+        await asyncio.sleep(0)
+        return pending
+
+    assert asyncio.run(scenario())
+    assert state['moderated']
+    assert 10 not in main.moderation_tasks
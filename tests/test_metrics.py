@@ -0,0 +1,100 @@
+import asyncio
+import socket
+import aiohttp
+from utils import metrics
+from utils.metrics import Counter, Gauge, Histogram, MetricsRegistry, MetricsServer
+
+def _fresh_registry(monkeypatch):
+    registry = MetricsRegistry()
+    monkeypatch.setattr(metrics, 'registry', registry)
+    return registry
+
+def test_counter_and_gauge_render_in_exposition_format(monkeypatch):
+    registry = _fresh_registry(monkeypatch)
+    moderated = Counter('test_moderated_total', 'Moderated messages', ['status'])
+    moderated.inc(status='reject')
+    moderated.inc(2, status='reject')
+    moderated.inc(status='approve')
+    Gauge('test_queue_depth', 'Queue depth').set_function(lambda: 7)
+
+    text = registry.render()
+    assert '# TYPE test_moderated_total counter' in text
+    assert 'test_moderated_total{status="reject"} 3' in text
+    assert 'test_moderated_total{status="approve"} 1' in text
+    assert '# TYPE test_queue_depth gauge' in text
+    assert 'test_queue_depth 7.0' in text
+
+def test_histogram_buckets_are_cumulative(monkeypatch):
+    registry = _fresh_registry(monkeypatch)
+    latency = Histogram('test_latency_seconds', 'Latency', buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.5, 3):
+        latency.observe(value)
+
+    text = registry.render()
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 3' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 4' in text
+    assert 'test_latency_seconds_sum 4.05' in text
+    assert 'test_latency_seconds_count 4' in text
+
+def test_label_values_are_escaped(monkeypatch):
+    registry = _fresh_registry(monkeypatch)
+    Counter('test_errors_total', 'Errors', ['reason']).inc(reason='bad "quote"\n')
+    assert 'test_errors_total{reason="bad \\"quote\\"\\n"} 1' in registry.render()
+
+def test_worker_deltas_merge_into_the_parent(monkeypatch):
+    registry = _fresh_registry(monkeypatch)
+    seen = Counter('test_seen_total', 'Seen')
+    latency = Histogram('test_write_seconds', 'Writes', buckets=(1,))
+    seen.inc(4)
+    latency.observe(0.5)
+
+    deltas = registry.drain()
+    assert seen.collect() == []
+    registry.merge(deltas)
+    registry.merge(deltas)
+    assert seen.collect() == [({}, 8)]
+    assert ({}, 2, '_count') in latency.collect()
+
+def test_failing_collector_does_not_break_the_scrape(monkeypatch):
+    registry = _fresh_registry(monkeypatch)
+    Counter('test_ok_total', 'Still rendered').inc()
+
+    def broken():
+        raise RuntimeError('collector down')
+    registry.register_collector(broken)
+    registry.register_collector(lambda: [('test_raids', 'gauge', 'Raids', [({'channel': '1'}, 1)])])
+
+    text = registry.render()
+    assert 'test_ok_total 1' in text
+    assert 'test_raids{channel="1"} 1' in text
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def test_server_serves_the_registry(monkeypatch):
+    registry = _fresh_registry(monkeypatch)
+    Counter('test_scraped_total', 'Scraped').inc()
+    server = MetricsServer('127.0.0.1', _free_port())
+
+    async def scenario():
+        await server.start()
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f'http://127.0.0.1:{server.port}/metrics') as response:
+                    return response.status, response.content_type, await response.text()
+        finally:
+            await server.stop()
+
+    status, content_type, body = asyncio.run(scenario())
+    assert status == 200
+    assert content_type == 'text/plain'
+    assert body == registry.render()
+    assert 'test_scraped_total 1' in body
+
+def test_server_is_disabled_on_port_zero():
+    server = MetricsServer('127.0.0.1', 0)
+    asyncio.run(server.start())
+    assert server._runner is None
@@ -0,0 +1,92 @@
+import asyncio
+import types
+import pytest
+from services.moderation_worker import ModerationJob
+from services.policy_service import ChannelPolicy
+from utils.dm_outbox import DMOutbox
+
+class _SlowHelper:
+    """DM delivery that takes far longer than the moderation path may wait"""
+
+    def __init__(self, events):
+        self.events = events
+
+    async def send_feedback_dm(self, user, items):
+        await asyncio.sleep(0.5)
+        self.events.append("dm")
+        return "sent"
+
+class _Target:
+    def __init__(self, events):
+        self.events = events
+
+    async def delete(self):
+        self.events.append("delete")
+
+@pytest.fixture
+def main(monkeypatch):
+    import main
+    events = []
+
+    async def analyze(job, analyze, is_edit=False):
+        return {"status": "reject", "feedback": "no spam", "source": "openai"}, 0.1
+
+    async def send_log(*args):
+        events.append("webhook")
+
+    monkeypatch.setattr(main, 'flood_guard', types.SimpleNamespace(analyze=analyze, raids={}))
+    monkeypatch.setattr(main, 'webhook_logger', types.SimpleNamespace(send_log=send_log))
+    monkeypatch.setattr(main, 'moderation', types.SimpleNamespace(
+        analyze=None, log_message_event=lambda *a, **kw: events.append(("log", kw["action_taken"]))))
+    monkeypatch.setattr(main, 'dm_outbox', DMOutbox(_SlowHelper(events), coalesce_window=0.2))
+    main.events = events
+    return main
+
+def _run(main, actions):
+    job = ModerationJob(1, 2, 3, 4, "user", "buy my spam", (), "asst", None)
+    policy = ChannelPolicy(2, 3, "asst", None, "https://hook", frozenset(actions), True)
+    author = types.SimpleNamespace(id=4, name="user")
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        await main._moderate_job(job, author, _Target(main.events), policy)
+        elapsed = asyncio.get_running_loop().time() - started
+        await main.dm_outbox.stop()
+        return elapsed
+    return asyncio.run(run())
+
+def test_delete_and_log_do_not_wait_for_the_dm(main):
+    elapsed = _run(main, {"dm", "delete", "webhook"})
+    assert elapsed < 0.2
+    assert main.events == ["delete", "webhook", ("log", "DELETE:success, DM:queued"), "dm"]
+
+def test_full_outbox_is_logged_as_failed_dm(main):
+    main.dm_outbox.max_pending_users = 0
+    _run(main, {"dm"})
+    assert main.events == [("log", "DM:failed")]
+
+def test_delete_runs_before_any_dm_or_webhook_work(main, monkeypatch):
+    enqueue = main.dm_outbox.enqueue
+
+    def recording_enqueue(*args):
+        main.events.append("dm_queued")
+        return enqueue(*args)
+    monkeypatch.setattr(main.dm_outbox, 'enqueue', recording_enqueue)
+
+    _run(main, {"dm", "delete", "webhook"})
+    assert main.events[:3] == ["delete", "dm_queued", "webhook"]
+
+def test_dm_coalescing_and_delivery_time_are_exported(main):
+    from utils.metrics import registry
+    author = types.SimpleNamespace(id=4, name="user")
+
+    async def run():
+        main.dm_outbox.enqueue(author, "first", "a", ())
+        main.dm_outbox.enqueue(author, "second", "b", ())
+        await main.dm_outbox.stop()
+    asyncio.run(run())
+
+    text = registry.render()
+    assert 'quality_dm_coalesced_total 1' in text
+    assert main.dm_outbox.latency_quantiles((0.5,))[0][1] >= 0.5
+    assert 'quality_dm_delivery_seconds{quantile="0.5"}' in text
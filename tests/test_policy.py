@@ -0,0 +1,42 @@
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager
+from services import policy_service
+from services.policy_service import ChannelPolicy, PolicyRegistry
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(policy_service, 'CHANNEL_ID', 0)
+    monkeypatch.setattr(policy_service, 'CHANNELS_CONFIG', None)
+    monkeypatch.setattr(policy_service, 'WEBHOOK_URL', 'https://global-hook')
+    return PolicyRegistry(DatabaseManager(), refresh_interval=0)
+
+def test_missing_fields_use_defaults_but_empty_ones_stay_empty():
+    unset = ChannelPolicy.from_row({'channel_id': '1', 'actions': None, 'webhook_url': None})
+    assert unset.actions == {'dm', 'webhook'}
+    assert unset.webhook_url == policy_service.WEBHOOK_URL
+
+    empty = ChannelPolicy.from_row({'channel_id': '1', 'actions': '', 'webhook_url': ''})
+    assert empty.actions == frozenset()
+    assert empty.webhook_url is None
+
+def test_update_can_clear_rules_webhook_and_actions(registry):
+    policy = registry.update(5, rules='no ads', webhook_url='https://own-hook', actions='dm,delete')
+    assert (policy.rules, policy.webhook_url, policy.actions) == ('no ads', 'https://own-hook', {'dm', 'delete'})
+
+    # None leaves a field alone
+    policy = registry.update(5, enabled=True)
+    assert (policy.rules, policy.webhook_url) == ('no ads', 'https://own-hook')
+
+    policy = registry.update(5, rules='', webhook_url='', actions='')
+    assert (policy.rules, policy.webhook_url, policy.actions) == (None, None, frozenset())
+
+def test_import_keeps_an_empty_action_list(registry, tmp_path):
+    path = tmp_path / 'channels.json'
+    path.write_text('{"channels": [{"channel_id": 7, "actions": []}, {"channel_id": 8}]}')
+    registry.import_file(str(path))
+    registry.reload()
+    assert registry.get(7).actions == frozenset()
+    assert registry.get(8).actions == {'dm', 'webhook'}
+    assert registry.get(8).webhook_url == 'https://global-hook'
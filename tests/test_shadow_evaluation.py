@@ -0,0 +1,82 @@
+import asyncio
+import time
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager
+from services import openai_service
+from services.openai_service import OpenAIService
+from benchmarks.stub_openai import StubOpenAI, start_stub
+
+class _StrictStub(StubOpenAI):
+    def verdict_for(self, content: str) -> dict:
+        return {"status": "reject", "feedback": "Too short."}
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    return DatabaseManager()
+
+async def _with_backends(shadow_stub, scenario):
+    primary_runner, primary_url = await start_stub(StubOpenAI())
+    shadow_runner, shadow_url = await start_stub(shadow_stub)
+    try:
+        return await scenario(primary_url, shadow_url)
+    finally:
+        await primary_runner.cleanup()
+        await shadow_runner.cleanup()
+
+def _service(monkeypatch, db, primary_url, shadow_url, rate=1.0):
+    monkeypatch.setattr(openai_service, 'SHADOW_SAMPLE_RATE', rate)
+    monkeypatch.setattr(openai_service, 'SHADOW_BASE_URL', shadow_url)
+    return OpenAIService(db=db, base_url=primary_url)
+
+def test_shadow_verdict_is_recorded_without_delaying_the_primary(db, monkeypatch):
+    charged = []
+
+    async def scenario(primary_url, shadow_url):
+        service = _service(monkeypatch, db, primary_url, shadow_url)
+        service.usage_sink = lambda usage, source, channel_id: charged.append((source, channel_id))
+        start = time.monotonic()
+        result, _ = await service.analyze_message("hello", message_id=1, channel_id=7)
+        primary_elapsed = time.monotonic() - start
+        pending = set(service._shadow_tasks)
+        await asyncio.gather(*pending)
+        return result, primary_elapsed, pending
+
+    result, primary_elapsed, pending = asyncio.run(_with_backends(_StrictStub(latency=1), scenario))
+    assert result["status"] == "approve"
+    assert primary_elapsed < 1
+    assert len(pending) == 1
+    assert charged == [('shadow', 7)]
+
+    report = db.get_shadow_report()
+    assert report['total'] == 1
+    assert report['agreement'] == 0
+    assert report['pairs'] == {('approve', 'reject'): 1}
+    assert report['delta_p50'] > 0
+
+def test_unsampled_messages_skip_the_shadow(db, monkeypatch):
+    async def scenario(primary_url, shadow_url):
+        service = _service(monkeypatch, db, primary_url, shadow_url, rate=1e-9)
+        monkeypatch.setattr(openai_service.random, 'random', lambda: 0.5)
+        await service.analyze_message("hello", message_id=1)
+        return service._shadow_tasks
+
+    assert not asyncio.run(_with_backends(_StrictStub(), scenario))
+    assert db.get_shadow_report()['total'] == 0
+
+def test_stop_cancels_pending_shadows(db, monkeypatch):
+    async def scenario(primary_url, shadow_url):
+        service = _service(monkeypatch, db, primary_url, shadow_url)
+        await service.analyze_message("hello", message_id=1)
+        assert service._shadow_tasks
+        await service.stop()
+        return service._shadow_tasks
+
+    assert not asyncio.run(_with_backends(_StrictStub(latency=60), scenario))
+    assert db.get_shadow_report()['total'] == 0
+
+def test_no_shadow_without_a_database(monkeypatch):
+    monkeypatch.setattr(openai_service, 'SHADOW_SAMPLE_RATE', 1.0)
+    monkeypatch.setattr(openai_service, 'SHADOW_BASE_URL', 'http://127.0.0.1:1')
+    assert OpenAIService().shadow is None
@@ -0,0 +1,42 @@
+import types
+from database import db_manager
+from database.db_manager import DatabaseManager
+from services.verdict_cache import VerdictCache, verdict_cache_key
+from utils.shard_launcher import parse_shard_ids, split_shards
+from utils.shard_stats import ShardStats
+
+def test_shard_ids_parse_ranges_and_lists():
+    assert parse_shard_ids("0-3") == [0, 1, 2, 3]
+    assert parse_shard_ids("0, 2,5-6") == [0, 2, 5, 6]
+    assert parse_shard_ids("") is None
+
+def test_shards_are_split_into_even_ranges():
+    assert split_shards(10, 3) == ["0-3", "4-6", "7-9"]
+    assert split_shards(2, 4) == ["0-0", "1-1"]
+    ranges = split_shards(16, 4)
+    assert sum(len(parse_shard_ids(r)) for r in ranges) == 16
+
+def test_stats_are_kept_per_shard():
+    bot = types.SimpleNamespace(latencies=[(0, 0.05), (1, 0.12)])
+    stats = ShardStats(bot, interval=0)
+    for shard_id in (0, 1, 1, None):
+        stats.record_event(shard_id)
+    stats.record_message(1)
+    stats.record_reconnect(1)
+    stats._roll_window()
+
+    by_shard = {shard['shard_id']: shard for shard in stats.snapshot()}
+    assert by_shard[0]['events'] == 2 and by_shard[0]['latency_ms'] == 50.0
+    assert by_shard[1]['events'] == 2 and by_shard[1]['messages'] == 1 and by_shard[1]['reconnects'] == 1
+    assert by_shard[1]['events_per_sec'] > 0
+
+def test_shard_processes_share_verdicts_through_the_database(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    # Two shard processes: separate in-memory LRUs over one SQLite file
+    first, second = VerdictCache(DatabaseManager()), VerdictCache(DatabaseManager())
+    key = verdict_cache_key("buy now", "asst")
+    first.put(key, {"status": "reject", "feedback": "No ads"})
+
+    assert second.get(key) == {"status": "reject", "feedback": "No ads"}
+    assert second.stats["shared_hits"] == 1
+    assert second.get(key) is not None and second.stats["memory_hits"] == 1
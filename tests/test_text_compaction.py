@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager
+from services.moderation_worker import LocalModeration, ModerationJob
+from services.openai_service import OpenAIService
+from services.verdict_cache import VerdictCache
+from utils.text_compaction import compact_text
+from benchmarks.stub_openai import StubOpenAI, start_stub
+
+def test_character_runs_keep_three():
+    assert compact_text('heeeeeey!!!!!!!!') == 'heeey!!!'
+    assert compact_text('order 100000') == 'order 100000'
+
+def test_repeated_phrases_keep_the_count():
+    assert compact_text('buy now buy now buy now buy now') == 'buy now [×4]'
+    assert compact_text('spam spam') == 'spam spam'
+
+def test_tracking_parameters_are_dropped():
+    text = 'see https://shop.example/item?id=5&utm_source=x&fbclid=abc'
+    assert compact_text(text) == 'see https://shop.example/item?id=5'
+
+def test_invisible_characters_and_styled_letters_are_normalized():
+    assert compact_text('fr\u200bee\u2060 n\u00adit\u200cro') == 'free nitro'
+    assert compact_text('𝐟𝐫𝐞𝐞 𝐧𝐢𝐭𝐫𝐨') == 'free nitro'
+    # ZWJ inside an emoji sequence is kept
+    assert compact_text('\U0001F468\u200d\U0001F469\u200d\U0001F467') == '\U0001F468\u200d\U0001F469\u200d\U0001F467'
+
+def test_long_text_keeps_head_tail_and_the_links_between():
+    middle = 'lorem ipsum dolor ' * 200 + ' https://discord.gg/raid ' + 'sit amet ' * 200
+    text = 'HEAD ' + middle + ' TAIL'
+    compacted = compact_text(text, max_chars=300)
+
+    assert compacted.startswith('HEAD')
+    assert 'TAIL' in compacted
+    assert 'characters omitted' in compacted
+    assert compacted.endswith('[links/mentions in the omitted part: https://discord.gg/raid]')
+    assert len(compacted) < 400
+
+def test_compaction_is_deterministic():
+    text = 'WOW!!!!!! https://x.example/?utm_medium=a  \n\n\n\n wow wow wow'
+    assert compact_text(text) == compact_text(text)
+    assert compact_text('') == ''
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    return DatabaseManager()
+
+def test_texts_that_compact_alike_share_a_cached_verdict(db):
+    stub = StubOpenAI()
+
+    async def run():
+        runner, base_url = await start_stub(stub)
+        moderation = LocalModeration(db, OpenAIService(base_url=base_url), VerdictCache(db))
+        try:
+            results = []
+            for content in ('free nitro!!!!!!!!', 'free\u200b nitro!!!!'):
+                job = ModerationJob(1, 2, 3, 4, 'user', content, (), 'asst_test', None)
+                result, _ = await moderation.analyze(job)
+                results.append((result, stub.requests))
+            return results
+        finally:
+            await moderation.stop()
+            await runner.cleanup()
+
+    (first, first_requests), (second, second_requests) = asyncio.run(run())
+    assert first_requests > 0
+    assert first.get('source') != 'cache'
+    assert second['source'] == 'cache'
+    assert second['status'] == first['status']
+    assert second_requests == first_requests
@@ -0,0 +1,47 @@
+import random
+from utils.text_diff import bounded_edit_distance, is_trivial_edit, normalize_whitespace
+
+def levenshtein(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+def test_matches_full_levenshtein_within_the_band():
+    rng = random.Random(0)
+    for _ in range(500):
+        a = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 12)))
+        b = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 12)))
+        limit = rng.randint(0, 6)
+        exact = levenshtein(a, b)
+        assert bounded_edit_distance(a, b, limit) == (exact if exact <= limit else limit + 1), (a, b, limit)
+
+def test_known_distances():
+    assert bounded_edit_distance('kitten', 'sitting', 3) == 3
+    assert bounded_edit_distance('kitten', 'sitting', 2) == 3
+    assert bounded_edit_distance('', 'abc', 3) == 3
+    assert bounded_edit_distance('same', 'same', 0) == 0
+
+def test_length_difference_over_the_limit_short_circuits():
+    assert bounded_edit_distance('a', 'a' * 100, 5) == 6
+
+def test_trivial_edits():
+    assert normalize_whitespace('  hello \n  world ') == 'hello world'
+    assert is_trivial_edit('Hello   World', 'hello world', 0)
+    assert is_trivial_edit('Buy my stuf', 'Buy my stuff', 3)
+    assert not is_trivial_edit('Nice picture', 'Join discord.gg/spam now', 3)
+
+def test_link_invite_and_mention_changes_are_never_trivial():
+    assert not is_trivial_edit('join discord.gg/abc', 'join discord.gg/xyz', 3)
+    assert not is_trivial_edit('see https://a.example/x', 'see https://a.example/y', 3)
+    assert not is_trivial_edit('visit good.com', 'visit evil.com', 3)
+    assert not is_trivial_edit('hi <@123>', 'hi <@124>', 3)
+    assert not is_trivial_edit('hello', 'hello @everyone', 3)
+
+def test_punctuation_is_trivial_but_words_are_not_by_default():
+    assert is_trivial_edit('Hello, world!', 'hello world')
+    assert is_trivial_edit('e.g. this', 'eg this')
+    assert not is_trivial_edit('Buy my stuf', 'Buy my stuff')
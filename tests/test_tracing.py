@@ -0,0 +1,92 @@
+import asyncio
+import time
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager
+from utils import tracing
+from utils.tracing import current_spans, merge_spans, span, trace_message, traced
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(tracing, 'TRACING_ENABLED', True)
+
+def _stages(trace):
+    return [stage for stage, _, _ in trace.breakdown()]
+
+def test_disabled_tracing_records_nothing(monkeypatch):
+    monkeypatch.setattr(tracing, 'TRACING_ENABLED', False)
+    with trace_message(1) as trace:
+        with span('analysis'):
+            pass
+        assert trace is None
+        assert current_spans() == []
+
+def test_span_outside_a_trace_is_a_noop():
+    with span('analysis'):
+        pass
+    assert current_spans() == []
+
+def test_spans_are_recorded_in_start_order(enabled):
+    with trace_message(1) as trace:
+        with span('queue'):
+            time.sleep(0.01)
+        with span('analysis'):
+            pass
+    breakdown = trace.breakdown()
+    assert [stage for stage, _, _ in breakdown] == ['total', 'queue', 'analysis']
+    stages = {stage: (offset, duration) for stage, offset, duration in breakdown}
+    assert stages['queue'][1] >= 10
+    assert stages['analysis'][0] >= stages['queue'][0] + stages['queue'][1]
+    assert stages['total'][1] >= stages['queue'][1] + stages['analysis'][1]
+
+def test_traced_wraps_sync_and_async_functions(enabled):
+    @traced('hash')
+    def hash_image():
+        return 'h'
+
+    @traced('fetch')
+    async def fetch():
+        return 'f'
+
+    async def scenario():
+        with trace_message(1) as trace:
+            assert hash_image() == 'h'
+            assert await fetch() == 'f'
+        return trace
+
+    assert _stages(asyncio.run(scenario())) == ['total', 'hash', 'fetch']
+
+def test_background_tasks_inherit_the_trace(enabled):
+    async def webhook():
+        with span('webhook'):
+            await asyncio.sleep(0)
+
+    async def scenario():
+        with trace_message(1) as trace:
+            task = asyncio.create_task(webhook())
+        await task
+        return trace
+
+    assert 'webhook' in _stages(asyncio.run(scenario()))
+
+def test_worker_spans_merge_into_the_current_trace(enabled):
+    start = time.perf_counter()
+    worker_spans = [('worker_analysis', start, start + 0.02)]
+    with trace_message(1) as trace:
+        merge_spans(worker_spans)
+    stage, _, duration = [row for row in trace.breakdown() if row[0] == 'worker_analysis'][0]
+    assert duration == pytest.approx(20)
+    merge_spans(worker_spans)
+    assert current_spans() == []
+
+def test_breakdown_is_saved_and_read_back(enabled, tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    db = DatabaseManager()
+    with trace_message(42) as trace:
+        with span('analysis'):
+            pass
+    db.save_message_spans('42', trace.breakdown())
+    saved = db.get_message_spans('42')
+    assert [stage for stage, _, _ in saved] == ['total', 'analysis']
+    db.save_message_spans('43', [])
+    assert db.get_message_spans('43') == []
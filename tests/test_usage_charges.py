@@ -0,0 +1,67 @@
+import asyncio
+import aiohttp
+from datetime import datetime
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager
+from services.openai_service import OpenAIService
+from benchmarks.stub_openai import StubOpenAI, start_stub
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    return DatabaseManager()
+
+def test_failed_run_tokens_reach_the_sink():
+    charged = []
+
+    async def run():
+        runner, base_url = await start_stub(StubOpenAI(fail_rate=1.0))
+        try:
+            service = OpenAIService(base_url=base_url)
+            service.usage_sink = lambda usage, source, channel_id: charged.append((usage, source, channel_id))
+            return await service.analyze_message("hello", channel_id=42)
+        finally:
+            await runner.cleanup()
+
+    result, _ = asyncio.run(run())
+    assert result is None
+    assert [(source, channel_id) for _, source, channel_id in charged] == [('openai_failed', 42)]
+    assert charged[0][0]['prompt_tokens'] > 0
+
+def test_charges_are_rolled_up_per_source(db):
+    db.log_message_event('1', 'u', 'user', '7', 's', 'hello', [], 'approve', '', 'approved',
+                         prompt_tokens=100, completion_tokens=10, cost=0.5, verdict_source='openai')
+    db.record_usage('7', 200, 0, 1.0, 'openai_failed')
+    db.record_usage('7', 50, 5, 0.25, 'shadow')
+    db.record_usage('7', 50, 5, 0.25, 'shadow')
+
+    report = db.get_usage_report()
+    assert {source: (calls, cost) for source, calls, _, cost in report['sources']} == {
+        'openai': (1, 0.5), 'openai_failed': (1, 1.0), 'shadow': (2, 0.5)
+    }
+    assert report['channels'][0][1:3] == (1, 4)
+    assert db.get_usage_cost(datetime(2000, 1, 1)) == pytest.approx(2.0)
+
+def test_timed_out_run_is_charged_once_the_cancel_has_finished():
+    charged = []
+
+    async def run():
+        stub = StubOpenAI(latency=60)
+        stub.cancel_delay = 0.05
+        runner, base_url = await start_stub(stub)
+        try:
+            service = OpenAIService(base_url=base_url)
+            service.CANCEL_POLL_INTERVAL = 0.02
+            service.usage_sink = lambda usage, source, channel_id: charged.append((usage, source, channel_id))
+            async with aiohttp.ClientSession() as session:
+                run = await (await session.post(f"{base_url}/threads/runs", json={
+                    "assistant_id": "asst", "thread": {"messages": [{"role": "user", "content": "hi"}]}})).json()
+                return await service._wait_for_completion(session, {}, run["thread_id"], run["id"],
+                                                          channel_id=42, max_polls=0)
+        finally:
+            await runner.cleanup()
+
+    assert asyncio.run(run()) is None
+    assert [(source, channel_id) for _, source, channel_id in charged] == [('openai_timeout', 42)]
+    assert charged[0][0]['prompt_tokens'] > 0
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import threading
+import time
+import pytest
+from database import db_manager
+from database.db_manager import DatabaseManager
+from services.flood_guard import FloodGuard
+from services.verdict_cache import VerdictCache, verdict_cache_key
+from utils.image_hash import PerceptualHashIndex
+from utils import warm_state, image_hash
+from services import flood_guard, verdict_cache
+from utils.warm_state import WarmState, write_snapshot
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_manager, 'DB_FILE', str(tmp_path / 'test.db'))
+    return DatabaseManager()
+
+def _components(db):
+    return VerdictCache(db, ttl=3600), PerceptualHashIndex(100, 6), FloodGuard(window=60, raid_authors=3)
+
+def _warm_state(path, cache, index, guard):
+    state = WarmState(path, interval=0)
+    state.register('VCAC', 1, cache.dump_state, cache.restore_state)
+    state.register('IMGH', 1, index.dump_state, index.restore_state)
+    state.register('FLOD', 2, guard.dump_state, guard.restore_state)
+    return state
+
+def test_round_trip(db, tmp_path):
+    path = str(tmp_path / 'warm.bin')
+    cache, index, guard = _components(db)
+    key = verdict_cache_key('hello', 'asst')
+    cache.put(key, {"status": "reject", "feedback": "No spam"})
+    index.add(0xDEADBEEF, {"status": "approve", "feedback": ""})
+    now = int(time.time())
+    guard.observe(1, 10, now, time.monotonic())
+    guard.observe(2, 10, now, time.monotonic())
+    asyncio.run(_warm_state(path, cache, index, guard).stop())
+
+    cache2, index2, guard2 = _components(db)
+    restored = _warm_state(path, cache2, index2, guard2).restore()
+
+    assert restored == {'VCAC': 1, 'IMGH': 1, 'FLOD': 5}
+    assert cache2._entries[key][1] == {"status": "reject", "feedback": "No spam"}
+    assert index2.lookup(0xDEADBEEF)["status"] == "approve"
+    assert guard2._channels[10].count(now) == 2
+
+def test_truncated_file_is_ignored(db, tmp_path):
+    path = str(tmp_path / 'warm.bin')
+    cache, index, guard = _components(db)
+    cache.put(verdict_cache_key('hello', 'asst'), {"status": "approve", "feedback": ""})
+    asyncio.run(_warm_state(path, cache, index, guard).save())
+
+    with open(path, 'r+b') as fp:
+        fp.truncate(os.path.getsize(path) - 1)
+
+    assert _warm_state(path, *_components(db)).restore() == {}
+
+def test_unreadable_section_starts_cold_alone(db, tmp_path):
+    path = str(tmp_path / 'warm.bin')
+    cache, index, guard = _components(db)
+    index.add(0xDEADBEEF, {"status": "reject", "feedback": "x"})
+    # A verdict cache section cut in the middle of its first record
+    write_snapshot(path, [(b'VCAC', 1, b'\x00' * 10), (b'IMGH', 1, index.dump_state())])
+
+    cache2, index2, guard2 = _components(db)
+    assert _warm_state(path, cache2, index2, guard2).restore() == {'IMGH': 1}
+    assert not cache2._entries
+
+def test_changed_section_version_starts_cold(db, tmp_path):
+    path = str(tmp_path / 'warm.bin')
+    cache, index, guard = _components(db)
+    index.add(1, {"status": "approve", "feedback": ""})
+    write_snapshot(path, [(b'IMGH', 2, index.dump_state())])
+    assert _warm_state(path, *_components(db)).restore() == {}
+
+def test_periodic_save_runs_off_the_loop(db, tmp_path, monkeypatch):
+    path = str(tmp_path / 'warm.bin')
+    threads = []
+    write = warm_state.write_snapshot
+
+    def recording_write(*args):
+        threads.append(threading.current_thread() is threading.main_thread())
+        write(*args)
+    monkeypatch.setattr(warm_state, 'write_snapshot', recording_write)
+
+    async def run():
+        state = _warm_state(path, *_components(db))
+        state.interval = 0.01
+        state.start()
+        await asyncio.sleep(0.05)
+        await state.stop()
+
+    asyncio.run(run())
+    assert threads and not any(threads)
+    assert os.path.exists(path) and not os.path.exists(path + '.tmp')
+
+def test_section_truncated_after_its_first_record_restores_nothing(db, tmp_path):
+    path = str(tmp_path / 'warm.bin')
+    cache, index, guard = _components(db)
+    cache.put(verdict_cache_key('one', 'asst'), {"status": "approve", "feedback": ""})
+    cache.put(verdict_cache_key('two', 'asst'), {"status": "reject", "feedback": "No spam"})
+    index.add(1, {"status": "approve", "feedback": ""})
+    index.add(2, {"status": "reject", "feedback": "spam"})
+    now = time.time()
+    guard.observe(1, 10, now, time.monotonic())
+    guard.observe(2, 10, now, time.monotonic())
+
+    # Each section keeps its first record whole and a few bytes of the second
+    first_window = flood_guard._STATE_HEADER.size + flood_guard._WINDOW_RECORD.size + 2 * guard.window
+    write_snapshot(path, [
+        (b'VCAC', 1, cache.dump_state()[:verdict_cache._RECORD.size + 3]),
+        (b'IMGH', 1, index.dump_state()[:image_hash._RECORD.size + len("approve") + 3]),
+        (b'FLOD', 2, guard.dump_state()[:first_window + 3]),
+    ])
+
+    cache2, index2, guard2 = _components(db)
+    assert _warm_state(path, cache2, index2, guard2).restore() == {}
+    assert not cache2._entries
+    assert len(index2) == 0
+    assert not guard2._users and not guard2._channels and not guard2._authors
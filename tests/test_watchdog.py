@@ -0,0 +1,42 @@
+import asyncio
+import time
+from utils.watchdog import LoopWatchdog
+
+def _block_the_loop_in_a_sync_call():
+    time.sleep(0.4)
+
+async def _run(watchdog: LoopWatchdog, blocking: bool):
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.1)
+        if blocking:
+            _block_the_loop_in_a_sync_call()
+        await asyncio.sleep(0.3)
+    finally:
+        await watchdog.stop()
+
+def test_blocking_call_is_reported_once_with_its_stack():
+    watchdog = LoopWatchdog(interval=0.02, stall_threshold=0.1)
+    asyncio.run(_run(watchdog, blocking=True))
+
+    assert len(watchdog.stalls) == 1
+    stall = watchdog.stalls[0]
+    assert stall["duration"] >= 0.3
+    assert "_block_the_loop_in_a_sync_call" in stall["stack"]
+    assert watchdog.max_lag >= 0.3
+
+def test_idle_loop_has_no_stalls():
+    watchdog = LoopWatchdog(interval=0.02, stall_threshold=0.1)
+    asyncio.run(_run(watchdog, blocking=False))
+
+    assert not watchdog.stalls
+    assert watchdog.max_lag < 0.1
+
+def test_zero_interval_disables_the_watchdog():
+    watchdog = LoopWatchdog(interval=0, stall_threshold=0.1)
+
+    async def scenario():
+        watchdog.start()
+        return watchdog._task, watchdog._thread
+
+    assert asyncio.run(scenario()) == (None, None)
@@ -0,0 +1,78 @@
+import asyncio
+from aiohttp import web
+from utils.webhook_dispatcher import WebhookDispatcher, MAX_EMBEDS_PER_MESSAGE
+
+async def _start_webhooks(received):
+    """`/webhooks/slow/...` is always rate limited, every other webhook accepts"""
+    async def receive(request):
+        if request.match_info['webhook_id'] == 'slow':
+            return web.json_response({"retry_after": 5, "global": False}, status=429)
+        payload = await request.json()
+        received.setdefault(request.match_info['webhook_id'], []).extend(payload['embeds'])
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_post('/webhooks/{webhook_id}/{token}', receive)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/webhooks/{{}}/token"
+
+def _embed(i):
+    return {"title": f"embed {i}", "description": ""}
+
+def test_a_rate_limited_webhook_does_not_hold_back_the_others():
+    received = {}
+
+    async def run():
+        runner, url = await _start_webhooks(received)
+        dispatcher = WebhookDispatcher(flush_interval=0.01, drain_timeout=0.2, max_retries=3)
+        dispatcher.start()
+        try:
+            dispatcher.enqueue(url.format('slow'), _embed(0))
+            await asyncio.sleep(0.05)
+            dispatcher.enqueue(url.format('fast'), _embed(1))
+            await asyncio.sleep(0.3)
+            return dict(received)
+        finally:
+            await dispatcher.stop()
+            await runner.cleanup()
+            assert dispatcher.dropped == {"shutdown": 1}
+            assert dispatcher.queue_depth == 0
+
+    assert asyncio.run(run()) == {'fast': [_embed(1)]}
+
+def test_batches_keep_order_per_webhook():
+    received = {}
+
+    async def run():
+        runner, url = await _start_webhooks(received)
+        dispatcher = WebhookDispatcher(flush_interval=10)
+        try:
+            for i in range(MAX_EMBEDS_PER_MESSAGE + 3):
+                dispatcher.enqueue(url.format('a' if i % 2 else 'b'), _embed(i))
+            await dispatcher.stop()
+        finally:
+            await runner.cleanup()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert [e['title'] for e in received['a']] == [f"embed {i}" for i in range(1, 13, 2)]
+    assert [e['title'] for e in received['b']] == [f"embed {i}" for i in range(0, 13, 2)]
+    assert dispatcher.stats['sent_embeds'] == 13
+
+def test_every_dropped_embed_is_counted():
+    async def run():
+        dispatcher = WebhookDispatcher(max_queue=3)
+        dispatcher.enqueue('https://a', _embed(0))
+        dispatcher.enqueue('https://a', _embed(1))
+        dispatcher.enqueue('https://b', _embed(2))
+        dispatcher.record_approval('https://c', 'user')
+        # The approval summary needs room too: the longest queue gives up its oldest embed
+        dispatcher._queue_summaries()
+        assert dispatcher.dropped == {"queue_full": 1}
+        assert [e['title'] for e in dispatcher._queues['https://a']] == ["embed 1"]
+        assert dispatcher.queue_depth == 3
+    asyncio.run(run())
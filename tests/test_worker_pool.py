@@ -0,0 +1,88 @@
+import asyncio
+import queue
+from services.moderation_worker import ModerationJob, WorkerPool, _Worker
+
+def _job(message_id):
+    return ModerationJob(message_id, 2, 3, 4, 'user', 'hello', (), 'asst_test', None)
+
+class _Queue(queue.Queue):
+    def cancel_join_thread(self):
+        pass
+
+    def close(self):
+        pass
+
+class _Process:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.name = 'fake-worker'
+        self.exitcode = None if alive else -9
+
+    def is_alive(self):
+        return self.alive
+
+def _pool_with(workers, **kwargs):
+    pool = WorkerPool(len(workers), **kwargs)
+    pool._workers = [_Worker(_Process(alive), _Queue()) for alive in workers]
+    return pool
+
+def test_jobs_go_to_the_least_loaded_worker():
+    pool = _pool_with([True, True], timeout=0.01)
+
+    async def run():
+        await asyncio.gather(*(pool.analyze(_job(i)) for i in range(4)))
+    asyncio.run(run())
+    assert [w.queue.qsize() for w in pool._workers] == [2, 2]
+
+def test_timed_out_jobs_are_bounded(monkeypatch):
+    monkeypatch.setattr(WorkerPool, 'MAX_TIMED_OUT', 3)
+    pool = _pool_with([True], timeout=0.01)
+
+    async def run():
+        return [await pool.analyze(_job(i)) for i in range(5)]
+    assert asyncio.run(run()) == [(None, 0.0)] * 5
+    assert list(pool._timed_out) == [2, 3, 4]
+    assert pool.queue_depth == 0
+
+def test_dead_worker_fails_its_jobs_and_is_replaced(monkeypatch):
+    pool = _pool_with([True, True], timeout=30)
+    spawned = []
+
+    def spawn(index):
+        spawned.append(index)
+        return _Worker(_Process(), _Queue())
+    monkeypatch.setattr(pool, '_spawn', spawn)
+
+    async def run():
+        jobs = [asyncio.create_task(pool.analyze(_job(i))) for i in range(2)]
+        await asyncio.sleep(0)
+        dying = pool._workers[0]
+        dying.process.alive = False
+        assert pool.check_workers() == 1
+        # The dead worker's job fails at once; the other one keeps waiting
+        done, pending = await asyncio.wait(jobs, timeout=0.1)
+        assert [task.result() for task in done] == [(None, 0.0)]
+        assert len(pending) == 1
+        assert pool._workers[0] is not dying
+        for task in pending:
+            task.cancel()
+    asyncio.run(run())
+    assert spawned == [0]
+    assert pool.check_workers() == 0
+
+def test_killed_worker_process_is_restarted(tmp_path, monkeypatch):
+    monkeypatch.setenv('DB_FILE', str(tmp_path / 'test.db'))
+    pool = WorkerPool(1, timeout=30)
+
+    async def run():
+        pool.start()
+        try:
+            first = pool._workers[0].process
+            first.kill()
+            await asyncio.get_running_loop().run_in_executor(None, first.join, 10)
+            assert pool.check_workers() == 1
+            assert pool._workers[0].process is not first
+            assert pool._workers[0].process.is_alive()
+        finally:
+            await pool.stop()
+    asyncio.run(run())
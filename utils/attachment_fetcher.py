@@ -0,0 +1,103 @@
+import asyncio
+import aiohttp
+import tempfile
+from collections import namedtuple
+from typing import List, Optional, Tuple, IO, Any
+from utils.logger import setup_logger
+from config.settings import (
+    ATTACHMENT_CONCURRENCY, ATTACHMENT_SPOOL_THRESHOLD,
+    ATTACHMENT_MAX_BYTES, DM_ATTACHMENT_BUDGET
+)
+
+logger = setup_logger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# What fetching needs from a discord.Attachment, without the rest of the object
+AttachmentRef = namedtuple('AttachmentRef', ('url', 'filename', 'size'))
+
+class AttachmentFetcher:
+    """Parallel, size-capped attachment downloader sharing one pooled session"""
+
+    def __init__(self, concurrency: int = ATTACHMENT_CONCURRENCY,
+                 spool_threshold: int = ATTACHMENT_SPOOL_THRESHOLD,
+                 max_file_bytes: int = ATTACHMENT_MAX_BYTES,
+                 budget_bytes: int = DM_ATTACHMENT_BUDGET):
+        self.concurrency = concurrency
+        self.spool_threshold = spool_threshold
+        self.max_file_bytes = max_file_bytes
+        self.budget_bytes = budget_bytes
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Ընդհանուր session-ը ստանալ (ստեղծել առաջին անգամ)"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=60)
+            )
+        return self._session
+
+    async def close(self):
+        """Session-ը փակել"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def fetch_all(self, attachments: List[Any]) -> List[Tuple[str, IO[bytes]]]:
+        """Attachment-ները զուգահեռ ներբեռնել՝ ընդհանուր բյուջեի սահմաններում
+
+        Each attachment needs `url`, `filename` and `size` attributes. Returns
+        (filename, file object) pairs in the original order; the caller owns
+        (and must close) the returned files.
+        """
+        planned = []
+        remaining = self.budget_bytes
+        for attachment in attachments:
+            size = attachment.size or 0
+            if size > self.max_file_bytes or size > remaining:
+                logger.warning(f"Skipping attachment {attachment.filename} ({size} bytes): over size budget")
+                continue
+            remaining -= size
+            planned.append(attachment)
+
+        results = await asyncio.gather(
+            *(self._fetch_one(attachment) for attachment in planned)
+        )
+        return [
+            (attachment.filename, fp)
+            for attachment, fp in zip(planned, results)
+            if fp is not None
+        ]
+
+    async def _fetch_one(self, attachment: Any) -> Optional[IO[bytes]]:
+        """Մեկ attachment ներբեռնել spooled ֆայլի մեջ"""
+        # Never read more than Discord reported (plus the per-file cap)
+        limit = min(attachment.size or self.max_file_bytes, self.max_file_bytes)
+        spool = tempfile.SpooledTemporaryFile(max_size=self.spool_threshold)
+
+        try:
+            async with self._semaphore:
+                async with self._get_session().get(attachment.url) as resp:
+                    if resp.status != 200:
+                        logger.error(f"Error downloading attachment {attachment.filename}: HTTP {resp.status}")
+                        spool.close()
+                        return None
+
+                    written = 0
+                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                        written += len(chunk)
+                        if written > limit:
+                            logger.warning(f"Attachment {attachment.filename} exceeded {limit} bytes, dropped")
+                            spool.close()
+                            return None
+                        spool.write(chunk)
+
+            spool.seek(0)
+            logger.debug(f"Attachment downloaded: {attachment.filename} ({written} bytes)")
+            return spool
+
+        except Exception as e:
+            logger.error(f"Error downloading attachment {attachment.filename}: {e}")
+            spool.close()
+            return None
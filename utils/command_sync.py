@@ -0,0 +1,46 @@
+import hashlib
+import json
+import os
+from typing import Optional
+from discord import app_commands
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def command_tree_hash(tree: app_commands.CommandTree) -> str:
+    """Slash command-ների սահմանումների hash-ը"""
+    definitions = []
+    for command in tree.get_commands():
+        try:
+            definitions.append(command.to_dict(tree))
+        except TypeError:
+            # discord.py < 2.4: to_dict() takes no tree argument
+            definitions.append(command.to_dict())
+    definitions.sort(key=lambda d: (d.get('type', 1), d['name']))
+    payload = json.dumps(definitions, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+async def sync_if_changed(tree: app_commands.CommandTree, hash_path: str) -> Optional[int]:
+    """Sync անել միայն եթե command-ները փոխվել են վերջին sync-ից հետո
+
+    Returns the number of synced commands, or None when the sync was skipped.
+    """
+    current = command_tree_hash(tree)
+
+    stored = None
+    if os.path.exists(hash_path):
+        with open(hash_path, encoding='utf-8') as f:
+            stored = f.read().strip()
+
+    if stored == current:
+        logger.info("Slash commands unchanged - skipping sync")
+        return None
+
+    synced = await tree.sync()
+
+    # Only remember the hash once Discord accepted the new definitions
+    tmp_path = hash_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(current)
+    os.replace(tmp_path, hash_path)
+    return len(synced)
@@ -0,0 +1,130 @@
+import asyncio
+import time
+import discord
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+from utils.logger import setup_logger
+from utils.helpers import MessageHelper, MAX_DM_EMBEDS
+from config.settings import DM_COALESCE_WINDOW, DM_RATE_PER_SECOND, DM_MAX_PENDING_USERS
+
+logger = setup_logger(__name__)
+
+class _PendingDM:
+    """Feedback waiting to be sent to one user"""
+
+    __slots__ = ('user', 'items', 'futures', 'created_at', 'timer')
+
+    def __init__(self, user: discord.abc.User):
+        self.user = user
+        self.items = []
+        self.futures: List[asyncio.Future] = []
+        self.created_at = time.monotonic()
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class DMOutbox:
+    """Per-user coalescing DM queue with a global DMs-per-second budget"""
+
+    def __init__(self, helper: MessageHelper,
+                 coalesce_window: float = DM_COALESCE_WINDOW,
+                 rate_per_second: float = DM_RATE_PER_SECOND,
+                 max_pending_users: int = DM_MAX_PENDING_USERS):
+        self.helper = helper
+        self.coalesce_window = coalesce_window
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.max_pending_users = max_pending_users
+
+        self._pending: Dict[int, _PendingDM] = {}
+        self._next_slot = 0.0
+        self._rate_lock = asyncio.Lock()
+        self._tasks = set()
+
+        self.stats = {"delivered": 0, "coalesced": 0}
+        self.dropped: Dict[str, int] = defaultdict(int)
+        # Recent delivery latencies (enqueue -> sent), seconds
+        self.latencies: Deque[float] = deque(maxlen=1000)
+
+    @property
+    def pending_users(self) -> int:
+        return len(self._pending)
+
+    def latency_quantiles(self, quantiles: Sequence[float]) -> List[Tuple[float, float]]:
+        """Վերջին DM-ների ուղարկման ժամանակի quantile-ները (վայրկյան)"""
+        if not self.latencies:
+            return []
+        ordered = sorted(self.latencies)
+        return [(q, ordered[min(int(q * len(ordered)), len(ordered) - 1)]) for q in quantiles]
+
+    def enqueue(self, user: discord.abc.User, feedback_text: str,
+                original_content: str, original_attachments: List) -> Optional[asyncio.Future]:
+        """Feedback-ը հերթ դնել՝ առանց ուղարկմանը սպասելու (None՝ եթե հերթը լիքն է)"""
+        pending = self._pending.get(user.id)
+
+        if pending is None:
+            if len(self._pending) >= self.max_pending_users:
+                self.dropped["queue_full"] += 1
+                logger.warning(f"DM outbox full, dropping feedback for {user.name}")
+                return None
+            pending = _PendingDM(user)
+            self._pending[user.id] = pending
+            pending.timer = asyncio.get_running_loop().call_later(
+                self.coalesce_window, self._schedule_flush, user.id
+            )
+        else:
+            self.stats["coalesced"] += 1
+
+        future = asyncio.get_running_loop().create_future()
+        pending.items.append((feedback_text, original_content, original_attachments))
+        pending.futures.append(future)
+
+        # A full DM does not need to wait for the window to close
+        if len(pending.items) >= MAX_DM_EMBEDS:
+            pending.timer.cancel()
+            self._schedule_flush(user.id)
+
+        return future
+
+    async def send(self, user: discord.abc.User, feedback_text: str,
+                   original_content: str, original_attachments: List) -> bool:
+        """Feedback-ը հերթ դնել և սպասել DM-ի ուղարկմանը"""
+        future = self.enqueue(user, feedback_text, original_content, original_attachments)
+        return await future if future is not None else False
+
+    def _schedule_flush(self, user_id: int):
+        pending = self._pending.pop(user_id, None)
+        if pending is None:
+            return
+        task = asyncio.create_task(self._deliver(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _wait_for_slot(self):
+        """Գլոբալ DM/վայրկյան բյուջեի սպասում"""
+        async with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _deliver(self, pending: _PendingDM):
+        """Կուտակված feedback-ը մեկ DM-ով ուղարկել"""
+        await self._wait_for_slot()
+        result = await self.helper.send_feedback_dm(pending.user, pending.items)
+
+        if result == "sent":
+            self.stats["delivered"] += 1
+            self.latencies.append(time.monotonic() - pending.created_at)
+        else:
+            self.dropped[result] += len(pending.items)
+
+        for future in pending.futures:
+            if not future.done():
+                future.set_result(result == "sent")
+
+    async def stop(self):
+        """Սպասող DM-ները անմիջապես ուղարկել"""
+        for user_id in list(self._pending):
+            self._pending[user_id].timer.cancel()
+            self._schedule_flush(user_id)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
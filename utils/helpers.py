@@ -1,69 +1,108 @@
 import discord
-import aiohttp
-import io
-from typing import List
+from typing import List, Optional, Tuple
 from utils.logger import setup_logger
+from utils.attachment_fetcher import AttachmentFetcher
+from utils.webhook_dispatcher import WebhookDispatcher
+from utils.tracing import span, traced
 
 logger = setup_logger(__name__)
 
+# Discord allows 10 embeds and 6000 embed characters per message (titles included)
+MAX_DM_EMBEDS = 10
+EMBED_CHAR_BUDGET = 6000
+FEEDBACK_TITLE = "⚠️ Հաղորդագրությունը չի համապատասխանում ալիքի կանոններին"
+
+def feedback_embeds(feedbacks: List[Optional[str]]) -> List[discord.Embed]:
+    """Մեկ կարմիր embed ամեն feedback-ի համար՝ միասին 6000 նիշի սահմանում"""
+    feedbacks = feedbacks[:MAX_DM_EMBEDS]
+    if not feedbacks:
+        return []
+    # Titles count towards the limit too; the descriptions share what is left
+    per_embed = (EMBED_CHAR_BUDGET - len(FEEDBACK_TITLE) * len(feedbacks)) // len(feedbacks)
+    embeds = []
+    for feedback_text in feedbacks:
+        feedback_text = feedback_text or ""
+        if len(feedback_text) > per_embed:
+            feedback_text = feedback_text[:per_embed - 3] + "..."
+        embeds.append(discord.Embed(title=FEEDBACK_TITLE, description=feedback_text, color=0xFF0000))
+    return embeds
+
 class MessageHelper:
     """Message handling utilities"""
     
-    @staticmethod
-    async def send_dm_with_feedback(user: discord.User, feedback_text: str, 
+    def __init__(self, fetcher: Optional[AttachmentFetcher] = None):
+        self.fetcher = fetcher or AttachmentFetcher()
+    
+    async def send_dm_with_feedback(self, user: discord.User, feedback_text: str, 
                                   original_content: str, original_attachments: List[discord.Attachment]):
         """Օգտատիրոջը DM ուղարկել feedback-ով"""
+        result = await self.send_feedback_dm(
+            user, [(feedback_text, original_content, original_attachments)]
+        )
+        return result == "sent"
+    
+    async def send_feedback_dm(self, user: discord.User,
+                               items: List[Tuple[str, str, List[discord.Attachment]]]) -> str:
+        """Մեկ կամ մի քանի feedback մեկ DM-ով ուղարկել
+
+        `items` are (feedback, original content, attachments) tuples. Returns
+        "sent", "dm_disabled" or "error".
+        """
+        items = items[:MAX_DM_EMBEDS]
+        downloaded = []
         try:
-            # Red embed with feedback
-            embed = discord.Embed(
-                title="⚠️ Հաղորդագրությունը չի համապատասխանում ալիքի կանոններին",
-                description=feedback_text,
-                color=0xFF0000
-            )
+            embeds = feedback_embeds([feedback_text for feedback_text, _, _ in items])
+            
+            content = "\n\n".join(text for _, text, _ in items if text)
+            if len(content) > 2000:
+                content = content[:1997] + "..."
             
-            # Download all attachments
-            files = []
-            for attachment in original_attachments:
-                try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.get(attachment.url) as resp:
-                            if resp.status == 200:
-                                data = await resp.read()
-                                file = discord.File(
-                                    fp=io.BytesIO(data),
-                                    filename=attachment.filename
-                                )
-                                files.append(file)
-                                logger.debug(f"Attachment downloaded: {attachment.filename}")
-                except Exception as e:
-                    logger.error(f"Error downloading attachment {attachment.filename}: {e}")
+            # Same attachment reposted in several messages is uploaded once
+            attachments = list({att.url: att for _, _, atts in items for att in atts}.values())
+            
+            # Download all attachments (parallel, spooled, within the DM byte budget)
+            async with span("dm_attachments"):
+                downloaded = await self.fetcher.fetch_all(attachments)
+            files = [discord.File(fp=fp, filename=filename) for filename, fp in downloaded]
             
             # Send everything in one message
-            await user.send(
-                content=original_content or "",
-                embed=embed,
-                files=files if files else None
-            )
+            async with span("dm_send"):
+                await user.send(
+                    content=content,
+                    embeds=embeds,
+                    files=files if files else None
+                )
             
-            logger.info(f"DM sent successfully to {user.name} ({len(files)} attachments)")
-            return True
+            logger.info(f"DM sent successfully to {user.name} ({len(embeds)} feedback, {len(files)} attachments)")
+            return "sent"
             
         except discord.Forbidden:
             logger.warning(f"Cannot send DM to {user.name} (DMs disabled)")
-            return False
+            return "dm_disabled"
         except Exception as e:
             logger.error(f"Error sending DM to {user.name}: {e}")
-            return False
+            return "error"
+        finally:
+            # discord.File does not close file objects it was given
+            for _, fp in downloaded:
+                fp.close()
 
 class WebhookLogger:
     """Webhook logging utilities"""
     
-    @staticmethod
-    async def send_log(webhook_url: str, message_id: str, channel_id: str, 
+    def __init__(self, dispatcher: Optional[WebhookDispatcher] = None):
+        self.dispatcher = dispatcher or WebhookDispatcher()
+    
+    @traced("webhook_log")
+    async def send_log(self, webhook_url: str, message_id: str, channel_id: str, 
                       username: str, status: str, feedback: str = None, content: str = None):
-        """Webhook-ով log ուղարկել"""
+        """Webhook-ով log ուղարկել (հերթի միջոցով)"""
         if not webhook_url:
             return
+        
+        if status == "approve" and self.dispatcher.aggregate_approvals:
+            self.dispatcher.record_approval(webhook_url, username)
+            return
             
         try:
             status_config = {
@@ -93,6 +132,10 @@ class WebhookLogger:
                 "timestamp": discord.utils.utcnow().isoformat()
             }
             
+            # Batched webhook messages carry no per-embed content, so the original text goes in the description
+            if content:
+                embed["description"] = content if len(content) <= 2000 else content[:1997] + "..."
+            
             # Add feedback if provided
             if feedback:
                 if len(feedback) <= 1024:
@@ -112,20 +155,7 @@ class WebhookLogger:
                             "inline": False
                         })
             
-            payload = {
-                "content": content,
-                "embeds": [embed],
-                "username": "Moderation Bot",
-                "avatar_url": "https://cdn.discordapp.com/embed/avatars/0.png"
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(webhook_url, json=payload) as resp:
-                    if resp.status == 204:
-                        logger.debug(f"Webhook log sent successfully for message {message_id}")
-                    else:
-                        error_text = await resp.text()
-                        logger.error(f"Webhook failed: {resp.status} - {error_text}")
+            self.dispatcher.enqueue(webhook_url, embed)
                         
         except Exception as e:
-            logger.error(f"Error sending webhook log: {e}")
\ No newline at end of file
+            logger.error(f"Error building webhook log: {e}")
\ No newline at end of file
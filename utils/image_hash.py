@@ -0,0 +1,137 @@
+import io
+import struct
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+from config.settings import IMAGE_MAX_PIXELS
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: without it images are not hashed
+    Image = None
+
+HASH_BITS = 64
+# 8 bands of 8 bits: two hashes within distance 7 share at least one band exactly
+BANDS = 8
+BAND_BITS = HASH_BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+# Warm state record: hash, status length, feedback length (+ status and feedback bytes)
+_RECORD = struct.Struct('<QBI')
+
+def hashing_available() -> bool:
+    return Image is not None
+
+def dhash(data: bytes, max_pixels: int = IMAGE_MAX_PIXELS) -> Optional[int]:
+    """64-bit difference hash (dHash) of an image, or None if it can't be decoded
+
+    CPU-bound: call it from an executor. JPEGs are decoded at reduced scale
+    via draft(); images over `max_pixels` are rejected before decoding.
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            if width * height > max_pixels:
+                return None
+            # Only the first frame of animated images; JPEG decodes straight to grayscale at 1/8 scale
+            image.draft('L', (64, 64))
+            small = image.convert('L').resize((9, 8), Image.BILINEAR)
+            pixels = small.tobytes()
+    except Exception:
+        return None
+
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+class PerceptualHashIndex:
+    """Bounded LRU of image hash -> verdict with near-duplicate lookup
+
+    Lookups use band buckets (multi-index hashing), so only candidates that
+    share an 8-bit band are compared instead of the whole index.
+    """
+
+    def __init__(self, max_size: int, max_distance: int):
+        if max_distance >= BANDS:
+            raise ValueError(f"max_distance must be below {BANDS}")
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self._verdicts: "OrderedDict[int, Dict]" = OrderedDict()
+        self._bands: Tuple[Dict[int, Set[int]], ...] = tuple({} for _ in range(BANDS))
+
+    def __len__(self) -> int:
+        return len(self._verdicts)
+
+    @staticmethod
+    def _band_keys(value: int) -> Iterable[Tuple[int, int]]:
+        for band in range(BANDS):
+            yield band, (value >> (band * BAND_BITS)) & BAND_MASK
+
+    def lookup(self, value: int) -> Optional[Dict]:
+        """Ամենամոտ նախկին verdict-ը (`max_distance`-ի սահմաններում)"""
+        best, best_distance = None, self.max_distance + 1
+        seen = set()
+        for band, key in self._band_keys(value):
+            for candidate in self._bands[band].get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = hamming(value, candidate)
+                if distance < best_distance:
+                    best, best_distance = candidate, distance
+        if best is None:
+            return None
+        self._verdicts.move_to_end(best)
+        return self._verdicts[best]
+
+    def add(self, value: int, verdict: Dict):
+        if value in self._verdicts:
+            self._verdicts[value] = verdict
+            self._verdicts.move_to_end(value)
+            return
+        self._verdicts[value] = verdict
+        for band, key in self._band_keys(value):
+            self._bands[band].setdefault(key, set()).add(value)
+        while len(self._verdicts) > self.max_size:
+            old, _ = self._verdicts.popitem(last=False)
+            for band, key in self._band_keys(old):
+                bucket = self._bands[band][key]
+                bucket.discard(old)
+                if not bucket:
+                    del self._bands[band][key]
+
+    def dump_state(self) -> bytes:
+        """Index-ը warm state-ի համար (հնից նոր)"""
+        parts = []
+        for value, verdict in self._verdicts.items():
+            status = verdict["status"].encode('utf-8')
+            feedback = (verdict.get("feedback") or "").encode('utf-8')
+            parts.append(_RECORD.pack(value, len(status), len(feedback)))
+            parts.append(status)
+            parts.append(feedback)
+        return b''.join(parts)
+
+    def restore_state(self, data: memoryview, saved_at: float) -> int:
+        """Warm state-ից index-ը վերականգնել"""
+        offset = 0
+        # Decoded in full first, so a section that fails halfway leaves the index untouched
+        records = []
+        while offset < len(data):
+            value, status_length, feedback_length = _RECORD.unpack_from(data, offset)
+            offset += _RECORD.size
+            if offset + status_length + feedback_length > len(data):
+                raise ValueError("truncated image hash record")
+            status = bytes(data[offset:offset + status_length]).decode('utf-8')
+            offset += status_length
+            feedback = bytes(data[offset:offset + feedback_length]).decode('utf-8')
+            offset += feedback_length
+            records.append((value, {"status": status, "feedback": feedback}))
+        for value, verdict in records:
+            self.add(value, verdict)
+        return len(self)
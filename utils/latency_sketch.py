@@ -0,0 +1,163 @@
+import asyncio
+import math
+import struct
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from utils.logger import setup_logger
+from config.settings import LATENCY_FLUSH_INTERVAL
+
+logger = setup_logger(__name__)
+
+# Bucket bounds grow by GAMMA, so any quantile is within RELATIVE_ACCURACY of the true value
+RELATIVE_ACCURACY = 0.01
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+# Values at or below MIN_SECONDS share bucket 0; ~1000 buckets reach MAX_SECONDS
+MIN_SECONDS = 1e-4
+MAX_SECONDS = 1e4
+MAX_INDEX = math.ceil(math.log(MAX_SECONDS / MIN_SECONDS) / _LOG_GAMMA)
+
+_HEADER = struct.Struct('<BIdd')
+SKETCH_VERSION = 1
+
+class LatencySketch:
+    """Mergeable log-bucketed latency histogram (HDR/DDSketch style)
+
+    `add` is one dict update; quantiles walk the non-empty buckets (at most
+    MAX_INDEX + 1). Sketches of different processes and hours merge by
+    adding bucket counts.
+    """
+
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        if seconds <= MIN_SECONDS:
+            index = 0
+        else:
+            index = min(MAX_INDEX, math.ceil(math.log(seconds / MIN_SECONDS) / _LOG_GAMMA))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other: 'LatencySketch'):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """`q` քվանտիլը (վայրկյաններով), None եթե դատարկ է"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                if index == 0:
+                    return MIN_SECONDS
+                # Middle of the bucket (MIN * GAMMA^(i-1), MIN * GAMMA^i], never above the real max
+                return min(self.max, MIN_SECONDS * GAMMA ** index * 2 / (GAMMA + 1))
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_bytes(self) -> bytes:
+        indexes = array('H', sorted(self.buckets))
+        counts = array('I', (self.buckets[i] for i in indexes))
+        return _HEADER.pack(SKETCH_VERSION, len(indexes), self.total, self.max) + indexes.tobytes() + counts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'LatencySketch':
+        version, size, total, max_value = _HEADER.unpack_from(data)
+        if version != SKETCH_VERSION:
+            raise ValueError(f"unknown sketch version {version}")
+        offset = _HEADER.size
+        indexes = array('H')
+        indexes.frombytes(data[offset:offset + 2 * size])
+        counts = array('I')
+        counts.frombytes(data[offset + 2 * size:offset + 6 * size])
+
+        sketch = cls()
+        sketch.buckets = dict(zip(indexes, counts))
+        sketch.count = sum(counts)
+        sketch.total = total
+        sketch.max = max_value
+        return sketch
+
+def hour_label(hour: int) -> str:
+    """Epoch ժամը usage_rollups-ի ձևաչափով (տեղական ժամանակ)"""
+    return datetime.fromtimestamp(hour * 3600).strftime('%Y-%m-%d %H:00')
+
+class LatencyRecorder:
+    """Per-hour latency sketches, flushed to the latency_sketches table
+
+    Sketches are flushed (and reset) every `flush_interval` seconds and on
+    stop; an hour may have several rows (per flush and per process), which
+    are merged when read.
+    """
+
+    def __init__(self, db, flush_interval: float = LATENCY_FLUSH_INTERVAL):
+        self.db = db
+        self.flush_interval = flush_interval
+        self._sketches: Dict[Tuple[int, str], LatencySketch] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, name: str, seconds: float):
+        key = (int(time.time() // 3600), name)
+        sketch = self._sketches.get(key)
+        if sketch is None:
+            sketch = self._sketches[key] = LatencySketch()
+        sketch.add(seconds)
+
+    def flush(self):
+        """Կուտակված sketch-երը DB-ում պահել"""
+        sketches, self._sketches = self._sketches, {}
+        rows = [(hour_label(hour), name, sketch.count, sketch.to_bytes())
+                for (hour, name), sketch in sketches.items() if sketch.count]
+        if not rows:
+            return
+        try:
+            self.db.save_latency_sketches(rows)
+        except Exception as e:
+            logger.error(f"Latency sketch flush failed: {e}")
+
+    def summary(self, hours: int, names: Iterable[str]) -> Dict[str, LatencySketch]:
+        """Վերջին `hours` ժամի sketch-երը՝ միավորված (DB + դեռ չպահվածները)"""
+        since = int(time.time() // 3600) - hours + 1
+        merged = {name: LatencySketch() for name in names}
+        for name, data in self.db.get_latency_sketches(hour_label(since)):
+            if name in merged:
+                merged[name].merge(LatencySketch.from_bytes(data))
+        for (hour, name), sketch in self._sketches.items():
+            if hour >= since and name in merged:
+                merged[name].merge(sketch)
+        return merged
+
+    def start(self):
+        if self.flush_interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
@@ -1,35 +1,157 @@
+import atexit
+import gzip
+import json
 import logging
+import logging.handlers
+import multiprocessing
 import os
-from config.settings import LOG_LEVEL, LOG_FILE
+import queue
+import shutil
+from datetime import datetime, timezone
+from typing import Optional
+from config.settings import (
+    LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_ROTATION,
+    LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATION_WHEN
+)
+
+# Extra fields copied into JSON lines when passed via `extra=`
+JSON_EXTRA_FIELDS = ('message_id', 'channel_id', 'user_id', 'status', 'processing_time', 'elapsed_ms',
+                     'stall_seconds')
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_listener: Optional[logging.handlers.QueueListener] = None
+# Parent side: records sent by worker processes, handed to this process's listener
+_worker_listener: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in JSON_EXTRA_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve %-args here; the record is consumed in-process, so
+        # exc_info and extras can travel as-is and be formatted off-loop
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def _gzip_rotator(source: str, dest: str):
+    """Ռոտացված ֆայլը gzip-ով սեղմել"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+def _build_file_handler() -> logging.Handler:
+    """LOG_ROTATION-ին համապատասխան file handler ստեղծել"""
+    rotation = LOG_ROTATION.lower()
+
+    if rotation == 'size':
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    elif rotation == 'time':
+        handler = logging.handlers.TimedRotatingFileHandler(
+            LOG_FILE, when=LOG_ROTATION_WHEN, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'
+        )
+    else:
+        return logging.FileHandler(LOG_FILE, encoding='utf-8')
+
+    handler.namer = lambda name: name + '.gz'
+    handler.rotator = _gzip_rotator
+    return handler
+
+def _start_listener():
+    """Background thread-ը գործարկել (մեկ անգամ ամբողջ պրոցեսի համար)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    if LOG_FORMAT.lower() == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+
+    # Console handler
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
+
+    # Worker processes never open LOG_FILE themselves: two rotating handlers on one
+    # file race on rotation. They log to stderr until init_worker_logging()
+    if multiprocessing.parent_process() is None:
+        file_handler = _build_file_handler()
+        file_handler.setFormatter(formatter)
+        handlers.insert(0, file_handler)
+
+    _listener = logging.handlers.QueueListener(
+        _log_queue, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(stop_logging)
+
+def worker_log_queue(ctx) -> multiprocessing.Queue:
+    """Worker պրոցեսների log-երի հերթը (ծնողը դրանք գրում է իր handler-ներով)"""
+    global _worker_listener
+    _start_listener()
+    if _worker_listener is None:
+        log_queue = ctx.Queue()
+        _worker_listener = logging.handlers.QueueListener(log_queue, _DeferredQueueHandler(_log_queue))
+        _worker_listener.start()
+    return _worker_listener.queue
+
+def init_worker_logging(log_queue: multiprocessing.Queue):
+    """Worker պրոցեսում log-երը ուղարկել ծնողին (stderr-ի փոխարեն)"""
+    _start_listener()
+    # QueueHandler.prepare() formats the message and drops exc_info, so records pickle
+    _listener.handlers = (logging.handlers.QueueHandler(log_queue),)
+
+def stop_logging():
+    """Հերթում մնացած գրառումները գրել և thread-ը կանգնեցնել"""
+    global _listener, _worker_listener
+    if _worker_listener is not None:
+        _worker_listener.stop()
+        _worker_listener = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
 def setup_logger(name: str = __name__) -> logging.Logger:
     """Logger-ը կարգավորել"""
-    
+
     # Logs directory ստեղծել եթե չկա
     log_dir = os.path.dirname(LOG_FILE)
     if log_dir and not os.path.exists(log_dir):
         os.makedirs(log_dir)
-    
+
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, LOG_LEVEL.upper()))
-    
+
     # Avoid duplicate handlers
     if logger.handlers:
         return logger
-    
-    # Formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
-    # File handler
-    file_handler = logging.FileHandler(LOG_FILE, encoding='utf-8')
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+
+    # Formatting and I/O happen on the listener thread
+    _start_listener()
+    logger.addHandler(_DeferredQueueHandler(_log_queue))
+
+    return logger
@@ -0,0 +1,262 @@
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from aiohttp import web
+from utils.logger import setup_logger
+from config.settings import METRICS_HOST, METRICS_PORT
+
+logger = setup_logger(__name__)
+
+# (labels, value) pairs of one metric family
+Samples = List[Tuple[Dict[str, str], float]]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, object]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+class Counter(_Metric):
+    """Monotonic counter"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> Samples:
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+    def drain(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[Tuple[str, ...], float]):
+        with self._lock:
+            for key, value in values.items():
+                self._values[key] = self._values.get(key, 0) + value
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be computed at scrape time"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(self.labelnames, labels)] = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Արժեքը հաշվել scrape-ի պահին"""
+        self._function = function
+
+    def collect(self) -> Samples:
+        if self._function is not None:
+            return [({}, float(self._function()))]
+        with self._lock:
+            return [(dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def drain(self) -> Dict[Tuple[str, ...], List[float]]:
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[Tuple[str, ...], List[float]]):
+        with self._lock:
+            for key, counts in values.items():
+                row = self._values.get(key)
+                if row is None:
+                    self._values[key] = list(counts)
+                else:
+                    for i, count in enumerate(counts):
+                        row[i] += count
+
+    def collect(self) -> Samples:
+        samples = []
+        with self._lock:
+            rows = [(key, list(row)) for key, row in self._values.items()]
+        for key, row in rows:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                samples.append(({**labels, 'le': repr(float(bound))}, cumulative, '_bucket'))
+            cumulative += row[len(self.buckets)]
+            samples.append(({**labels, 'le': '+Inf'}, cumulative, '_bucket'))
+            samples.append((labels, row[-1], '_sum'))
+            samples.append((labels, cumulative, '_count'))
+        return samples
+
+class MetricsRegistry:
+    """All metrics of this process plus scrape-time collectors"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]):
+        """Collector-ը վերադարձնում է (name, kind, help, samples) ընտանիքներ"""
+        self._collectors.append(collector)
+
+    def drain(self) -> Dict[str, Dict]:
+        """Counter/histogram արժեքները վերցնել և զրոյացնել (worker -> ծնող)"""
+        deltas = {}
+        for metric in self._metrics:
+            if isinstance(metric, (Counter, Histogram)):
+                values = metric.drain()
+                if values:
+                    deltas[metric.name] = values
+        return deltas
+
+    def merge(self, deltas: Dict[str, Dict]):
+        """Worker-ի `drain()`-ը գումարել այս պրոցեսի արժեքներին"""
+        by_name = {metric.name: metric for metric in self._metrics}
+        for name, values in deltas.items():
+            metric = by_name.get(name)
+            if isinstance(metric, (Counter, Histogram)):
+                metric.merge(values)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample in metric.collect():
+                labels, value = sample[0], sample[1]
+                suffix = sample[2] if len(sample) > 2 else ''
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {value}")
+
+        for collector in self._collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+        return '\n'.join(lines) + '\n'
+
+registry = MetricsRegistry()
+
+# Pipeline metrics
+MESSAGES_SEEN = Counter('quality_messages_seen_total', 'Messages received in moderated channels')
+MESSAGES_MODERATED = Counter('quality_messages_moderated_total', 'Moderated messages by verdict', ['status'])
+OPENAI_LATENCY = Histogram('quality_openai_latency_seconds', 'OpenAI end-to-end analysis time')
+OPENAI_POLLS = Histogram('quality_openai_polls', 'Run status polls per OpenAI analysis',
+                         buckets=(1, 2, 3, 5, 8, 13, 21, 30))
+OPENAI_ERRORS = Counter('quality_openai_errors_total', 'Failed OpenAI analyses')
+OPENAI_TOKENS = Counter('quality_openai_tokens_total', 'OpenAI tokens used', ['kind'])
+OPENAI_COST = Counter('quality_openai_cost_usd_total', 'Estimated OpenAI spend in USD')
+DB_WRITE_LATENCY = Histogram('quality_db_write_seconds', 'SQLite message log write time')
+LOOP_LAG = Histogram('quality_event_loop_lag_seconds', 'Event loop scheduling lag',
+                     buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+LOOP_STALLS = Counter('quality_event_loop_stalls_total', 'Callbacks that blocked the event loop past the watchdog threshold')
+IMAGE_HASHES = Counter('quality_image_hashes_total', 'Image attachments downloaded and hashed')
+IMAGE_REPOSTS = Counter('quality_image_reposts_total', 'Messages given an earlier verdict of a reposted image', ['status'])
+LOCAL_MODEL_DECISIONS = Counter('quality_local_model_decisions_total', 'Messages decided by the local classifier', ['status'])
+LOCAL_MODEL_HOLDOUT = Gauge('quality_local_model_holdout', 'Held-out precision, coverage and threshold of the loaded local classifier', ['measure'])
+FLOOD_DECISIONS = Counter('quality_flood_decisions_total', 'Messages decided by the flood/raid guard without analysis', ['kind'])
+RAIDS = Counter('quality_raids_total', 'Times a channel entered raid mode')
+WORKER_RESTARTS = Counter('quality_worker_restarts_total', 'Moderation worker processes restarted after dying')
+
+VERDICT_STATUSES = ('approve', 'reject', 'needs_edit')
+
+def _cost_per_verdict() -> float:
+    verdicts = sum(value for labels, value in MESSAGES_MODERATED.collect() if labels['status'] in VERDICT_STATUSES)
+    cost = sum(value for _, value in OPENAI_COST.collect())
+    return cost / verdicts if verdicts else 0.0
+
+COST_PER_VERDICT = Gauge('quality_cost_per_verdict_usd', 'OpenAI spend per verdict, cache hits included')
+COST_PER_VERDICT.set_function(_cost_per_verdict)
+
+class MetricsServer:
+    """Local aiohttp endpoint serving /metrics"""
+
+    def __init__(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.port > 0
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    async def start(self):
+        """Endpoint-ը գործարկել (METRICS_PORT=0 դեպքում անջատված է)"""
+        if not self.enabled or self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Metrics endpoint on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
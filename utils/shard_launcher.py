@@ -0,0 +1,90 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List, Optional
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def parse_shard_ids(value: Optional[str]) -> Optional[List[int]]:
+    """"0-3" կամ "0,2,5" ձևաչափից shard ID-ների ցուցակ"""
+    if not value:
+        return None
+    shard_ids = []
+    for part in value.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-', 1)
+            shard_ids.extend(range(int(start), int(end) + 1))
+        elif part:
+            shard_ids.append(int(part))
+    return shard_ids
+
+def recommended_shard_count(token: str) -> int:
+    """Discord-ի խորհուրդ տրված shard-երի քանակը"""
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}", "User-Agent": "QualityBot (shard launcher)"}
+    )
+    with urllib.request.urlopen(request, timeout=15) as resp:
+        return int(json.load(resp)["shards"])
+
+def split_shards(shard_count: int, processes: int) -> List[str]:
+    """Shard-երը հավասար ընդգրկույթների բաժանել"""
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges, start = [], 0
+    for i in range(processes):
+        size = base + (1 if i < extra else 0)
+        ranges.append(f"{start}-{start + size - 1}")
+        start += size
+    return ranges
+
+def run_shard_processes(token: str, processes: int, shard_count: Optional[int] = None):
+    """Յուրաքանչյուր shard ընդգրկույթի համար առանձին բոտի պրոցես գործարկել և վերահսկել"""
+    if not shard_count:
+        shard_count = recommended_shard_count(token)
+
+    ranges = split_shards(shard_count, processes)
+    script = os.path.abspath(sys.argv[0])
+    children = {}
+    stopping = False
+
+    def spawn(shard_range: str) -> subprocess.Popen:
+        env = dict(os.environ, SHARD_MODE='auto', SHARD_IDS=shard_range, SHARD_COUNT=str(shard_count))
+        logger.info(f"Starting shard process for shards {shard_range}/{shard_count}")
+        return subprocess.Popen([sys.executable, script], env=env)
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for shard_range in ranges:
+        children[shard_range] = (spawn(shard_range), time.monotonic())
+
+    while not stopping:
+        time.sleep(1)
+        for shard_range, (proc, started_at) in list(children.items()):
+            if proc.poll() is None:
+                continue
+            logger.error(f"Shard process {shard_range} exited with code {proc.returncode}")
+            # Back off when a child crashes right after starting
+            if time.monotonic() - started_at < 30:
+                time.sleep(5)
+            children[shard_range] = (spawn(shard_range), time.monotonic())
+
+    for proc, _ in children.values():
+        proc.terminate()
+    for proc, _ in children.values():
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+    logger.info("All shard processes stopped")
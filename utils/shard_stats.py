@@ -0,0 +1,86 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from discord.ext import commands
+from utils.logger import setup_logger
+from config.settings import SHARD_METRICS_INTERVAL
+
+logger = setup_logger(__name__)
+
+class ShardStats:
+    """Per-shard gateway latency and event rate"""
+
+    def __init__(self, bot: commands.Bot, interval: float = SHARD_METRICS_INTERVAL):
+        self.bot = bot
+        self.interval = interval
+        self.events: Dict[int, int] = defaultdict(int)
+        self.messages: Dict[int, int] = defaultdict(int)
+        self.reconnects: Dict[int, int] = defaultdict(int)
+        self._window_start = time.monotonic()
+        self._window_events: Dict[int, int] = defaultdict(int)
+        self.event_rates: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record_event(self, shard_id: Optional[int]):
+        """Gateway event հաշվել"""
+        shard_id = shard_id or 0
+        self.events[shard_id] += 1
+        self._window_events[shard_id] += 1
+
+    def record_message(self, shard_id: Optional[int]):
+        """Մոդերացվող նամակ հաշվել"""
+        self.messages[shard_id or 0] += 1
+
+    def record_reconnect(self, shard_id: Optional[int]):
+        self.reconnects[shard_id or 0] += 1
+
+    def latencies(self) -> Dict[int, float]:
+        """Shard -> heartbeat latency (վայրկյաններով)"""
+        latencies = getattr(self.bot, 'latencies', None)
+        if latencies is None:
+            return {0: self.bot.latency}
+        return {shard_id: latency for shard_id, latency in latencies}
+
+    def snapshot(self) -> List[Dict]:
+        """Բոլոր shard-երի ընթացիկ ցուցանիշները"""
+        latencies = self.latencies()
+        shard_ids = sorted(set(latencies) | set(self.events))
+        return [
+            {
+                "shard_id": shard_id,
+                "latency_ms": round(latencies.get(shard_id, float('nan')) * 1000, 1),
+                "events_per_sec": round(self.event_rates.get(shard_id, 0.0), 2),
+                "events": self.events.get(shard_id, 0),
+                "messages": self.messages.get(shard_id, 0),
+                "reconnects": self.reconnects.get(shard_id, 0),
+            }
+            for shard_id in shard_ids
+        ]
+
+    def _roll_window(self):
+        now = time.monotonic()
+        elapsed = max(now - self._window_start, 1e-9)
+        self.event_rates = {sid: count / elapsed for sid, count in self._window_events.items()}
+        self._window_events = defaultdict(int)
+        self._window_start = now
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._report_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self._roll_window()
+            for shard in self.snapshot():
+                logger.info(
+                    f"Shard {shard['shard_id']}: latency {shard['latency_ms']}ms, "
+                    f"{shard['events_per_sec']} events/s, {shard['messages']} messages, "
+                    f"{shard['reconnects']} reconnects"
+                )
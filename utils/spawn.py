@@ -0,0 +1,23 @@
+import contextlib
+import sys
+
+@contextlib.contextmanager
+def without_main_module():
+    """Spawn-ով պրոցեսներ գործարկել առանց ծնողի __main__ script-ը child-ում կրկնելու
+
+    A spawned child re-imports the parent's __main__ script before running
+    its target; for main.py that builds the bot, database, services and log
+    listener a second time. Worker targets live in importable modules, so
+    the script path is hidden while start() records what the child prepares.
+    """
+    main = sys.modules['__main__']
+    path = getattr(main, '__file__', None)
+    # `python -m pkg.module` is re-imported by name; that path is left alone
+    if path is None or getattr(main, '__spec__', None) is not None:
+        yield
+        return
+    del main.__file__
+    try:
+        yield
+    finally:
+        main.__file__ = path
@@ -0,0 +1,113 @@
+import re
+import unicodedata
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from config.settings import COMPACT_MAX_CHARS
+
+# Invisible characters used for padding and filter evasion. ZWJ (U+200D) is
+# handled separately: it is part of emoji sequences.
+_INVISIBLE = re.compile('[\u00ad\u180e\u200b\u200c\u2060-\u2064\ufeff\u202a-\u202e\u2066-\u2069]')
+_ZWJ_IN_WORD = re.compile(r'(?<=\w)\u200d|\u200d(?=\w)')
+
+_URL = re.compile(r'https?://[^\s<>]+', re.IGNORECASE)
+_TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'igshid', 'igsh',
+    'mc_cid', 'mc_eid', '_hsenc', '_hsmi', 'ref_src', 'ref_url', 'si', 'spm', 'feature',
+    'share_id', 'srsltid', 'mkt_tok', 'oly_anon_id', 'oly_enc_id', 'vero_id', 'trk',
+})
+MAX_URL_CHARS = 200
+
+# A letter or symbol repeated more than three times ("!!!!!!", "heeeeey", emoji runs); digits are left alone
+_CHAR_RUN = re.compile(r'([^\w\s]|[^\W\d_])\1{3,}')
+# One to five words repeated three or more times in a row
+_PHRASE_RUN = re.compile(r'(?<!\S)(\S+(?!\S)(?:[ \t]+\S+(?!\S)){0,4}?)(?:\s+\1(?!\S)){2,}')
+_SPACES = re.compile(r'[ \t\u00a0\u3000]+')
+_BLANK_LINES = re.compile(r'\n\s*\n\s*\n+')
+
+# Kept from the omitted middle of long texts: links, invites and mentions decide many verdicts
+_FEATURES = re.compile(r'https?://\S+|discord(?:\.gg|(?:app)?\.com/invite)/\S+|<@[!&]?\d+>|@everyone|@here',
+                       re.IGNORECASE)
+MAX_KEPT_FEATURES = 10
+
+# Text longer than SCAN_FACTOR * max_chars is cut before normalization
+SCAN_FACTOR = 2
+# Marks where text was cut (NUL is removed from the input first)
+_CUT = '\x00'
+
+def _strip_tracking(match: re.Match) -> str:
+    url = match.group(0)
+    try:
+        parts = urlsplit(url)
+        query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                 if not k.lower().startswith('utm_') and k.lower() not in _TRACKING_PARAMS]
+        url = urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+    except ValueError:
+        pass
+    if len(url) > MAX_URL_CHARS:
+        url = url[:MAX_URL_CHARS] + '…'
+    return url
+
+def _collapse_phrase(match: re.Match) -> str:
+    phrase = match.group(1)
+    count = len(match.group(0).split()) // len(phrase.split())
+    return f"{phrase} [×{count}]"
+
+def _kept_features(text: str, features: list) -> list:
+    for feature in _FEATURES.findall(text):
+        if len(features) >= MAX_KEPT_FEATURES:
+            break
+        if feature not in features:
+            features.append(feature)
+    return features
+
+def _head_tail(text: str, max_chars: int):
+    """(head, omitted middle, tail) with a 2:1 head/tail split"""
+    head_chars = max_chars * 2 // 3
+    tail_chars = max_chars - head_chars
+    return text[:head_chars], text[head_chars:len(text) - tail_chars], text[len(text) - tail_chars:]
+
+def compact_text(text: str, max_chars: int = COMPACT_MAX_CHARS) -> str:
+    """Մոդերացիայի համար նամակի կոմպակտ տարբերակը
+
+    NFKC-normalizes (styled letters become plain ones), drops invisible
+    characters and URL tracking parameters, collapses character runs and
+    repeated phrases (keeping the count) and whitespace, then caps the length
+    with head/tail sampling. Links and mentions from the omitted middle are
+    listed at the end. The same text always gives the same result, so it
+    doubles as the verdict cache key.
+    """
+    if not text:
+        return ''
+
+    text = text.replace(_CUT, '')
+    omitted = 0
+    features = []
+    # Bound the regex work on pasted walls: far more text than can survive the cap is cut first
+    if max_chars > 0 and len(text) > SCAN_FACTOR * max_chars:
+        head, middle, tail = _head_tail(text, SCAN_FACTOR * max_chars)
+        omitted = len(middle)
+        _kept_features(middle, features)
+        text = f"{head}\n{_CUT}\n{tail}"
+
+    text = unicodedata.normalize('NFKC', text)
+    text = _INVISIBLE.sub('', text)
+    text = _ZWJ_IN_WORD.sub('', text)
+    text = _URL.sub(_strip_tracking, text)
+    text = _CHAR_RUN.sub(lambda m: m.group(1) * 3, text)
+    text = _PHRASE_RUN.sub(_collapse_phrase, text)
+    text = _SPACES.sub(' ', text)
+    text = _BLANK_LINES.sub('\n\n', text)
+    text = '\n'.join(line.strip() for line in text.split('\n')).strip()
+
+    if max_chars > 0 and len(text) > max_chars:
+        head, middle, tail = _head_tail(text, max_chars)
+        omitted += len(middle.replace(_CUT, ''))
+        _kept_features(middle, features)
+        text = f"{head}{_CUT}{tail}"
+
+    if not omitted:
+        return text.replace(_CUT, '')
+
+    text = text.replace(_CUT, f"\n[… {omitted} characters omitted …]\n", 1).replace(_CUT, '')
+    if features:
+        text += "\n[links/mentions in the omitted part: " + " ".join(features) + "]"
+    return text
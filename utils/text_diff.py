@@ -0,0 +1,64 @@
+import re
+
+_WHITESPACE = re.compile(r'\s+')
+# Everything but letters and digits: what is left after dropping whitespace and punctuation
+_NOT_WORD = re.compile(r'[\W_]+')
+# URLs, bare domains, Discord invites, user/role/channel mentions and mass pings
+_LINKS = re.compile(
+    r'https?://\S+|(?:discord(?:app)?\.com/invite|discord\.gg)/\S+|\b[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}(?:/\S*)?'
+    r'|<[@#][!&]?\d+>|@everyone|@here',
+    re.IGNORECASE
+)
+
+def normalize_whitespace(text: str) -> str:
+    """Բացատները միավորել և եզրերից հեռացնել"""
+    return _WHITESPACE.sub(' ', text or '').strip()
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, computed only inside a band of width `limit`
+
+    Returns `limit + 1` as soon as the distance is known to exceed `limit`,
+    so the cost is O(len * limit) instead of O(len * len).
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        lo = max(1, i - limit)
+        hi = min(len(b), i + limit)
+        row_min = current[0]
+        for j in range(lo, hi + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value if value <= limit else over
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return over
+        previous = current
+    return previous[len(b)]
+
+def links(text: str) -> list:
+    """Տեքստի URL-ները, invite-ները և mention-ները (հերթականությամբ, առանց փոփոխության)"""
+    return _LINKS.findall(text or '')
+
+def is_trivial_edit(old: str, new: str, max_distance: int = 0) -> bool:
+    """Խմբագրումը աննշան է (բացատներ, մեծատառեր, կետադրություն, ըստ ցանկության՝ տառասխալներ)
+
+    An edit that adds, removes or changes any URL, invite or mention is
+    never trivial: swapping one link for another is the abuse edits are
+    re-moderated for. Typos up to `max_distance` count only in the rest.
+    """
+    if links(old) != links(new):
+        return False
+    old = _NOT_WORD.sub('', _LINKS.sub(' ', old or '')).casefold()
+    new = _NOT_WORD.sub('', _LINKS.sub(' ', new or '')).casefold()
+    if old == new:
+        return True
+    return max_distance > 0 and bounded_edit_distance(old, new, max_distance) <= max_distance
@@ -0,0 +1,124 @@
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+from config.settings import TRACING_ENABLED
+
+# (stage, start, end) in time.perf_counter() seconds; the clock is system-wide,
+# so spans recorded in worker processes line up with the gateway's
+Span = Tuple[str, float, float]
+
+class Trace:
+    """Stage timings of one moderated message"""
+
+    __slots__ = ('message_id', 'started', 'spans')
+
+    def __init__(self, message_id: int):
+        self.message_id = message_id
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def breakdown(self) -> List[Tuple[str, float, float]]:
+        """(stage, offset_ms, duration_ms) ըստ սկզբի ժամանակի"""
+        return [
+            (stage, (start - self.started) * 1000, (end - start) * 1000)
+            for stage, start, end in sorted(self.spans, key=lambda span: span[1])
+        ]
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar('quality_trace', default=None)
+
+class _Span:
+    __slots__ = ('trace', 'stage', 'start')
+
+    def __init__(self, trace: Trace, stage: str):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.spans.append((self.stage, self.start, time.perf_counter()))
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, *exc):
+        return self.__exit__(*exc)
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+_NOOP_SPAN = _NoopSpan()
+
+def span(stage: str):
+    """Stage-ի ժամանակը գրանցել ընթացիկ trace-ում (trace չկա՝ ոչինչ չանել)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, stage)
+
+def traced(stage: str):
+    """Decorator-ային տարբերակը `span`-ի (sync և async ֆունկցիաների համար)"""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _current_trace.get() is None:
+                    return await func(*args, **kwargs)
+                with span(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return func(*args, **kwargs)
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def trace_message(message_id: int) -> Iterator[Optional[Trace]]:
+    """Նամակի trace-ը սկսել ընթացիկ context-ում (TRACING_ENABLED=false՝ None)
+
+    Tasks created inside the block (and timers scheduled from it) inherit the
+    trace, so stages run by background tasks are attributed to the message too.
+    """
+    if not TRACING_ENABLED:
+        yield None
+        return
+    trace = Trace(message_id)
+    token = _current_trace.set(trace)
+    try:
+        with _Span(trace, 'total'):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+
+def current_spans() -> List[Span]:
+    trace = _current_trace.get()
+    return list(trace.spans) if trace is not None else []
+
+def merge_spans(spans: List[Span]):
+    """Այլ պրոցեսում գրանցված span-երը ավելացնել ընթացիկ trace-ին"""
+    trace = _current_trace.get()
+    if trace is not None and spans:
+        trace.spans.extend(spans)
@@ -0,0 +1,186 @@
+import asyncio
+import mmap
+import os
+import struct
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.logger import setup_logger
+from config.settings import WARM_STATE_INTERVAL
+
+logger = setup_logger(__name__)
+
+MAGIC = b'QWS\x00'
+FORMAT_VERSION = 1
+# magic, format version, section count, saved at (epoch seconds)
+_HEADER = struct.Struct('<4sHHd')
+# tag, section version, offset, length
+_SECTION = struct.Struct('<4sHQQ')
+
+Dump = Callable[[], bytes]
+Restore = Callable[[memoryview, float], int]
+
+class Snapshot:
+    """Read-only, memory-mapped view of a snapshot file
+
+    Opening only validates the header and the section table; section bytes
+    are paged in when a component decodes them.
+    """
+
+    def __init__(self, path: str, fp, data: mmap.mmap, saved_at: float, sections: Dict[bytes, Tuple[int, int, int]]):
+        self.path = path
+        self.saved_at = saved_at
+        self._fp = fp
+        self._data = data
+        self._sections = sections
+
+    @classmethod
+    def open(cls, path: str) -> Optional['Snapshot']:
+        """Snapshot-ը բացել; None եթե ֆայլ չկա կամ ձևաչափը անծանոթ է"""
+        try:
+            fp = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            fp.close()
+            return None
+
+        try:
+            magic, version, count, saved_at = _HEADER.unpack_from(data)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"format {magic!r} v{version}, expected {MAGIC!r} v{FORMAT_VERSION}")
+            sections = {}
+            for i in range(count):
+                tag, section_version, offset, length = _SECTION.unpack_from(data, _HEADER.size + i * _SECTION.size)
+                if offset + length > len(data):
+                    raise ValueError(f"section {tag!r} is truncated")
+                sections[tag] = (section_version, offset, length)
+        except (struct.error, ValueError) as e:
+            logger.warning(f"Ignoring warm state snapshot {path}: {e}")
+            data.close()
+            fp.close()
+            return None
+        return cls(path, fp, data, saved_at, sections)
+
+    def section(self, tag: bytes, version: int) -> Optional[memoryview]:
+        entry = self._sections.get(tag)
+        if entry is None:
+            return None
+        section_version, offset, length = entry
+        if section_version != version:
+            logger.info(f"Warm state section {tag.decode()} has version {section_version}, "
+                        f"expected {version}; starting it cold")
+            return None
+        return memoryview(self._data)[offset:offset + length]
+
+    def close(self):
+        self._data.close()
+        self._fp.close()
+
+def write_snapshot(path: str, sections: List[Tuple[bytes, int, bytes]], saved_at: Optional[float] = None):
+    """Section-ները ատոմար գրել (tmp ֆայլ + os.replace)"""
+    offset = _HEADER.size + len(sections) * _SECTION.size
+    table = []
+    for tag, version, payload in sections:
+        table.append(_SECTION.pack(tag, version, offset, len(payload)))
+        offset += len(payload)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as fp:
+        fp.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(sections), saved_at or time.time()))
+        fp.writelines(table)
+        fp.writelines(payload for _, _, payload in sections)
+        fp.flush()
+        os.fsync(fp.fileno())
+    os.replace(tmp, path)
+
+class WarmState:
+    """Periodic and shutdown snapshots of in-memory state, restored on startup
+
+    Components register a tag with a dump function (state -> bytes) and a
+    restore function (bytes, snapshot time -> entries restored). Each section
+    carries its own version, so a component whose encoding changed starts
+    cold while the others still warm up.
+    """
+
+    def __init__(self, path: str, interval: float = WARM_STATE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._components: List[Tuple[bytes, int, Dump, Restore]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._writing: Optional[asyncio.Future] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def register(self, tag: str, version: int, dump: Dump, restore: Restore):
+        self._components.append((tag.encode('ascii'), version, dump, restore))
+
+    def restore(self) -> Dict[str, int]:
+        """Snapshot-ից վիճակը վերականգնել; վերադարձնում է վերականգնվածների քանակը ըստ tag-ի"""
+        if not self.enabled:
+            return {}
+        started = time.perf_counter()
+        snapshot = Snapshot.open(self.path)
+        if snapshot is None:
+            return {}
+
+        restored = {}
+        try:
+            for tag, version, _, restore in self._components:
+                view = snapshot.section(tag, version)
+                if view is None:
+                    continue
+                try:
+                    restored[tag.decode()] = restore(view, snapshot.saved_at)
+                except (struct.error, ValueError, IndexError) as e:
+                    logger.warning(f"Warm state section {tag.decode()} is unreadable, starting it cold: {e}")
+                finally:
+                    view.release()
+        finally:
+            snapshot.close()
+
+        logger.info(f"Warm state restored in {(time.perf_counter() - started) * 1000:.0f}ms from a "
+                    f"{time.time() - snapshot.saved_at:.0f}s old snapshot: "
+                    + ", ".join(f"{tag}={count}" for tag, count in restored.items()))
+        return restored
+
+    async def save(self):
+        """Ընթացիկ վիճակը snapshot ֆայլում պահել"""
+        if not self.enabled:
+            return
+        started = time.perf_counter()
+        try:
+            # Components are dumped on the loop, where their state is consistent;
+            # writing and fsync run in a thread so they don't stall the gateway
+            sections = [(tag, version, dump()) for tag, version, dump, _ in self._components]
+            self._writing = asyncio.ensure_future(asyncio.to_thread(write_snapshot, self.path, sections))
+            # A cancelled save loop leaves the write running; stop() waits for it
+            await asyncio.shield(self._writing)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Warm state snapshot failed: {e}")
+            return
+        logger.debug(f"Warm state saved in {(time.perf_counter() - started) * 1000:.0f}ms "
+                     f"({sum(len(payload) for _, _, payload in sections)} bytes)")
+
+    def start(self):
+        if self.enabled and self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._save_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._writing is not None and not self._writing.done():
+            # Both writes use the same temporary file
+            await asyncio.wait([self._writing])
+        await self.save()
+
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.save()
@@ -0,0 +1,105 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, Optional
+from utils.logger import setup_logger
+from utils.metrics import LOOP_LAG, LOOP_STALLS
+from config.settings import WATCHDOG_INTERVAL, WATCHDOG_STALL_THRESHOLD
+
+logger = setup_logger(__name__)
+
+class LoopWatchdog:
+    """Measures event loop lag and reports callbacks that block the loop
+
+    An asyncio task records a heartbeat every `interval` seconds and the
+    scheduling lag of each tick. A daemon thread checks the heartbeat; when it
+    is older than `stall_threshold` the loop is stuck in a callback, so the
+    thread snapshots the loop thread's stack to show the offender.
+    """
+
+    def __init__(self, interval: float = WATCHDOG_INTERVAL,
+                 stall_threshold: float = WATCHDOG_STALL_THRESHOLD, max_stalls: int = 50):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+
+        self.max_lag = 0.0
+        # Recent stalls: {"duration": s, "stack": str, "at": wall clock}
+        self.stalls: Deque[Dict] = deque(maxlen=max_stalls)
+
+        self._beat = time.monotonic()
+        self._peak_lag = 0.0
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def start(self):
+        """Heartbeat task-ը և ստուգող thread-ը գործարկել"""
+        if not self.enabled or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        if self.stall_threshold > 0:
+            self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - start - self.interval)
+            # Updated before the beat so the monitor thread sees the stall's lag
+            self._peak_lag = max(self._peak_lag, lag)
+            self._beat = now
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+
+    def _monitor(self):
+        """Heartbeat-ը ուշանում է՝ loop thread-ի stack-ը վերցնել (մեկ անգամ ամեն կանգի համար)"""
+        reported_beat = None
+        stall = None
+        while not self._stopped.wait(self.stall_threshold / 2):
+            beat = self._beat
+            blocked_for = time.monotonic() - beat
+
+            if stall is not None and beat != reported_beat:
+                # The loop is running again: the stall is over
+                stall["duration"] = self._peak_lag
+                self._report(stall)
+                stall = None
+
+            if stall is None and blocked_for > self.stall_threshold + self.interval and beat != reported_beat:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is None:
+                    continue
+                reported_beat = beat
+                self._peak_lag = 0.0
+                stall = {
+                    "at": time.time(),
+                    "stack": "".join(traceback.format_stack(frame)),
+                }
+
+    def _report(self, stall: Dict):
+        self.stalls.append(stall)
+        LOOP_STALLS.inc()
+        logger.warning(
+            f"Event loop blocked for {stall['duration']:.3f}s (threshold {self.stall_threshold}s); "
+            f"stack at detection:\n{stall['stack']}",
+            extra={"stall_seconds": round(stall["duration"], 3)}
+        )
@@ -0,0 +1,285 @@
+import asyncio
+import time
+import aiohttp
+import discord
+from collections import deque, defaultdict
+from typing import Deque, Dict, List, Optional
+from utils.logger import setup_logger
+from config.settings import (
+    WEBHOOK_QUEUE_SIZE, WEBHOOK_FLUSH_INTERVAL, WEBHOOK_MAX_RETRIES,
+    WEBHOOK_AGGREGATE_APPROVALS, WEBHOOK_SUMMARY_INTERVAL, WEBHOOK_DRAIN_TIMEOUT
+)
+
+logger = setup_logger(__name__)
+
+# Discord limits per webhook message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+def embed_size(embed: Dict) -> int:
+    """Embed-ի նիշերի քանակը՝ Discord-ի 6000 նիշի սահմանաչափի համար"""
+    size = len(embed.get("title", "")) + len(embed.get("description", ""))
+    size += len(embed.get("footer", {}).get("text", ""))
+    for field in embed.get("fields", []):
+        size += len(field["name"]) + len(field["value"])
+    return size
+
+class WebhookDispatcher:
+    """Background webhook sender: batches embeds and honours Discord rate limits
+
+    Every webhook URL has its own queue and its own sender task, so one URL's
+    429 backoff does not hold back the others.
+    """
+
+    def __init__(self, max_queue: int = WEBHOOK_QUEUE_SIZE,
+                 flush_interval: float = WEBHOOK_FLUSH_INTERVAL,
+                 max_retries: int = WEBHOOK_MAX_RETRIES,
+                 aggregate_approvals: bool = WEBHOOK_AGGREGATE_APPROVALS,
+                 summary_interval: float = WEBHOOK_SUMMARY_INTERVAL,
+                 drain_timeout: float = WEBHOOK_DRAIN_TIMEOUT):
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.drain_timeout = drain_timeout
+        self.max_retries = max_retries
+        self.aggregate_approvals = aggregate_approvals
+        self.summary_interval = summary_interval
+
+        # Bounded in total: when full, the oldest embed of the longest queue is dropped
+        self._queues: Dict[str, Deque[Dict]] = {}
+        self._size = 0
+        self._senders: Dict[str, asyncio.Task] = {}
+        self._approvals: Dict[str, List[str]] = defaultdict(list)
+        self._approval_counts: Dict[str, int] = defaultdict(int)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        # webhook url -> monotonic time before which we must not post
+        self._blocked_until: Dict[str, float] = {}
+        self._last_summary = time.monotonic()
+
+        self.stats = {"sent_messages": 0, "sent_embeds": 0, "retries": 0}
+        self.dropped: Dict[str, int] = defaultdict(int)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._size
+
+    def enqueue(self, webhook_url: str, embed: Dict):
+        """Embed-ը հերթ դնել (չի սպասում ուղարկմանը)"""
+        queue = self._push(webhook_url, embed)
+        if len(queue) >= MAX_EMBEDS_PER_MESSAGE:
+            self._wakeup.set()
+
+    def _push(self, webhook_url: str, embed: Dict) -> Deque[Dict]:
+        if self._size >= self.max_queue:
+            longest = max(self._queues.values(), key=len)
+            longest.popleft()
+            self._size -= 1
+            self.dropped["queue_full"] += 1
+        queue = self._queues.get(webhook_url)
+        if queue is None:
+            queue = self._queues[webhook_url] = deque()
+        queue.append(embed)
+        self._size += 1
+        return queue
+
+    def record_approval(self, webhook_url: str, username: str):
+        """Հաստատումը հաշվել ամփոփ embed-ի համար"""
+        self._approval_counts[webhook_url] += 1
+        names = self._approvals[webhook_url]
+        if username not in names and len(names) < 20:
+            names.append(username)
+
+    def start(self):
+        """Background task-ը գործարկել"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Մնացած log-երը ուղարկել և կանգնեցնել"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        self._queue_summaries()
+        try:
+            # A 429 storm must not hold up shutdown
+            await asyncio.wait_for(self._drain(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except Exception as e:
+            logger.error(f"Webhook dispatcher error: {e}")
+        # Senders cut off by the timeout put their batch back, so it is counted below
+        for task in list(self._senders.values()):
+            task.cancel()
+        if self._senders:
+            await asyncio.gather(*self._senders.values(), return_exceptions=True)
+        if self._size:
+            logger.warning(f"Webhook dispatcher stopped with {self._size} embeds unsent")
+            self.dropped["shutdown"] += self._size
+            self._queues.clear()
+            self._size = 0
+
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            if self.aggregate_approvals and time.monotonic() - self._last_summary >= self.summary_interval:
+                self._queue_summaries()
+
+            self._start_senders()
+
+    def _start_senders(self):
+        """Ամեն ոչ դատարկ հերթի համար sender task գործարկել (եթե արդեն չկա)"""
+        for webhook_url, queue in self._queues.items():
+            if queue and webhook_url not in self._senders:
+                task = asyncio.create_task(self._drain_url(webhook_url))
+                self._senders[webhook_url] = task
+                task.add_done_callback(lambda _, url=webhook_url: self._senders.pop(url, None))
+
+    async def _drain(self):
+        self._start_senders()
+        while self._senders:
+            await asyncio.gather(*self._senders.values(), return_exceptions=True)
+
+    async def _drain_url(self, webhook_url: str):
+        try:
+            while self._queues.get(webhook_url):
+                await self._flush_batch(webhook_url)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Webhook dispatcher error: {e}")
+        finally:
+            if not self._queues.get(webhook_url, True):
+                del self._queues[webhook_url]
+
+    def _queue_summaries(self):
+        """Կուտակված հաստատումները ամփոփ embed-ներով հերթ դնել"""
+        self._last_summary = time.monotonic()
+        for webhook_url, count in self._approval_counts.items():
+            if not count:
+                continue
+            names = self._approvals[webhook_url]
+            more = count - len(names)
+            users = ", ".join(names) + (f" (+{more})" if more > 0 else "")
+            self._push(webhook_url, {
+                "title": f"✅ Հաստատված × {count}",
+                "color": 0x00ff00,
+                "description": users[:1000],
+                "timestamp": discord.utils.utcnow().isoformat()
+            })
+        self._approval_counts.clear()
+        self._approvals.clear()
+
+    def _take_batch(self, webhook_url: str) -> List[Dict]:
+        """Webhook-ի հերթից մինչև 10 embed վերցնել (6000 նիշի սահմանում)"""
+        queue = self._queues[webhook_url]
+        embeds = [queue.popleft()]
+        total = embed_size(embeds[0])
+
+        while queue and len(embeds) < MAX_EMBEDS_PER_MESSAGE:
+            size = embed_size(queue[0])
+            if total + size > MAX_EMBED_CHARS_PER_MESSAGE:
+                break
+            embeds.append(queue.popleft())
+            total += size
+
+        self._size -= len(embeds)
+        return embeds
+
+    async def _flush_batch(self, webhook_url: str):
+        embeds = self._take_batch(webhook_url)
+        payload = {
+            "embeds": embeds,
+            "username": "Moderation Bot",
+            "avatar_url": "https://cdn.discordapp.com/embed/avatars/0.png"
+        }
+
+        try:
+            sent = await self._post(webhook_url, payload)
+        except asyncio.CancelledError:
+            # Stopped mid-send: put the batch back so stop() sends or counts it
+            self._queues.setdefault(webhook_url, deque()).extendleft(reversed(embeds))
+            self._size += len(embeds)
+            raise
+        except Exception as e:
+            logger.error(f"Webhook batch dropped: {e}")
+            self.dropped["error"] += len(embeds)
+            return
+
+        if sent:
+            self.stats["sent_messages"] += 1
+            self.stats["sent_embeds"] += len(embeds)
+        else:
+            self.dropped["retries_exhausted"] += len(embeds)
+
+    async def _post(self, webhook_url: str, payload: Dict) -> bool:
+        """Մեկ webhook հարցում՝ rate limit-երի հաշվառմամբ"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+
+        for attempt in range(self.max_retries + 1):
+            wait = self._blocked_until.get(webhook_url, 0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            try:
+                async with self._session.post(webhook_url, json=payload) as resp:
+                    self._update_rate_limit(webhook_url, resp.headers)
+
+                    if resp.status in (200, 204):
+                        logger.debug(f"Webhook batch sent ({len(payload['embeds'])} embeds)")
+                        return True
+
+                    if resp.status == 429:
+                        retry_after = await self._retry_after(resp)
+                        self._blocked_until[webhook_url] = time.monotonic() + retry_after
+                        logger.warning(f"Webhook rate limited, retrying in {retry_after:.2f}s")
+                    elif resp.status >= 500:
+                        await asyncio.sleep(min(2 ** attempt, 30))
+                    else:
+                        error_text = await resp.text()
+                        logger.error(f"Webhook failed: {resp.status} - {error_text}")
+                        return False
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Error sending webhook log: {e!r}")
+                await asyncio.sleep(min(2 ** attempt, 30))
+
+            self.stats["retries"] += 1
+
+        logger.error(f"Webhook batch dropped after {self.max_retries} retries")
+        return False
+
+    def _update_rate_limit(self, webhook_url: str, headers):
+        """X-RateLimit-* header-ներից հաջորդ թույլատրելի պահը հաշվել"""
+        if headers.get("X-RateLimit-Remaining") == "0":
+            try:
+                reset_after = float(headers.get("X-RateLimit-Reset-After", 1))
+            except ValueError:
+                reset_after = 1.0
+            self._blocked_until[webhook_url] = time.monotonic() + reset_after
+
+    @staticmethod
+    async def _retry_after(resp: aiohttp.ClientResponse) -> float:
+        """429 պատասխանից սպասման ժամանակը (վայրկյաններով)"""
+        try:
+            data = await resp.json(content_type=None)
+            return float(data.get("retry_after", 1))
+        except Exception:
+            pass
+        try:
+            return float(resp.headers.get("Retry-After", 1))
+        except ValueError:
+            return 1.0